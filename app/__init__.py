@@ -34,10 +34,46 @@ def create_app(config_name='development'):
     # Setup logging
     setup_logging(app)
     
+    from app.ml_models.predictor import prediction_cache
+    prediction_cache.resize(app.config['PREDICTION_CACHE_SIZE'])
+    
+    from app.services.admin_stats import stats_cache
+    stats_cache.ttl = app.config['ADMIN_STATS_TTL']
+    
+    if app.config['PREDICT_MICROBATCH']:
+        from app.ml_models.predictor import enable_batching
+        enable_batching(
+            window=app.config['PREDICT_MICROBATCH_WINDOW_MS'] / 1000.0,
+            max_batch=app.config['PREDICT_MICROBATCH_MAX_SIZE']
+        )
+        app.logger.info("Prediction micro-batching enabled")
+    
+    if app.config['INFERENCE_SOCKET']:
+        from app.ml_models.loader import registry
+        from app.ml_models.inference import use_inference_server
+        use_inference_server(registry, app.config['INFERENCE_SOCKET'], app.config['INFERENCE_TIMEOUT'])
+        app.logger.info(f"Serving models from inference server at {app.config['INFERENCE_SOCKET']}")
+    
+    if app.config['METRICS_DIR']:
+        from app.ml_models.metrics import enable
+        enable(app.config['METRICS_DIR'])
+        app.logger.info(f"Recording model metrics in {app.config['METRICS_DIR']}")
+    
+    preload_models(app)
+    
+    #with an inference server the models (and their reloads) live in that process
+    if app.config['MODEL_RELOAD_INTERVAL'] > 0 and not app.config['INFERENCE_SOCKET']:
+        from app.ml_models.loader import watch_releases
+        watch_releases(app.config['MODEL_RELOAD_INTERVAL'])
+        app.logger.info(f"Watching for model releases every {app.config['MODEL_RELOAD_INTERVAL']:g}s")
+    
     
     #Register blueprints
     register_blueprints(app)
     
+    from app.commands import register_commands
+    register_commands(app)
+    
     app.logger.info(f"Application started in {config_name} mode")
     
     return app
@@ -64,6 +100,29 @@ def setup_logging(app):
 
 
 
+def preload_models(app):
+    """Start loading the configured models in the background"""
+    preload = app.config['MODEL_PRELOAD'].strip().lower()
+    if not preload or preload == 'none':
+        return None
+
+    from app.ml_models.predictor import registry, SERVING_SET
+    if preload == 'all':
+        names = registry.names()
+    elif preload == 'serving':
+        names = SERVING_SET
+    else:
+        names = [name.strip() for name in preload.split(',') if name.strip()]
+
+    unknown = [name for name in names if name not in registry]
+    if unknown:
+        app.logger.warning(f"MODEL_PRELOAD: unknown entries {unknown} ignored")
+        names = [name for name in names if name in registry]
+
+    app.logger.info(f"Preloading models: {', '.join(names)}")
+    return registry.preload(names, background=True)
+
+
 def register_blueprints(app):  
     # Register blueprints
     from app.routes import auth, patient, doctor, admin, diagnosis, medical_tests, general
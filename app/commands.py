@@ -0,0 +1,71 @@
+import sys
+import time
+
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('score')
+@click.argument('test', type=click.Choice(['diabetes', 'heart', 'kidney']))
+@click.argument('input_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('-o', '--output', 'output_file', type=click.File('w'), default='-',
+              help='Where to write the scored CSV (default: stdout).')
+@click.option('--chunk-size', default=5000, show_default=True, help='Rows per chunk.')
+@click.option('--workers', default=0, help='Scoring processes (default: one per core).')
+@click.option('--save', is_flag=True, help='Also insert the results into the test table.')
+@click.option('--doctor', default='batch', show_default=True, help='Doctor recorded on saved results.')
+@with_appcontext
+def score_command(test, input_file, output_file, chunk_size, workers, save, doctor):
+    """Score a CSV of patients with the diabetes, heart or kidney model."""
+    from app.ml_models.loader import model_version
+    from app.ml_models.scoring import score_file
+    from app.services.test_results import save_results
+
+    version = model_version()
+    saved = {'rows': 0}
+
+    def store(chunk):
+        saved['rows'] += save_results(test, chunk.records, doctor, version)
+
+    start = time.perf_counter()
+    try:
+        totals = score_file(test, input_file, output_file, chunk_size=chunk_size,
+                            workers=workers or None, on_chunk=store if save else None)
+    except ValueError as err:
+        raise click.ClickException(str(err))
+    elapsed = time.perf_counter() - start
+
+    click.echo(f"Scored {totals['rows']} rows ({totals['invalid']} invalid) in {elapsed:.2f}s, "
+               f"{totals['rows'] / elapsed if elapsed else 0:.0f} rows/s, model {version}", err=True)
+    if save:
+        click.echo(f"Saved {saved['rows']} results to the {test} test table", err=True)
+
+
+@click.command('export')
+@click.argument('name', type=click.Choice(['self_diagnosis', 'diabetes', 'heart', 'kidney', 'appointments']))
+@click.option('-o', '--output', 'output_file', type=click.File('wb'), default='-',
+              help='Where to write the export (default: stdout).')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default='csv', show_default=True)
+@click.option('--gzip', 'compress', is_flag=True, help='Gzip the output.')
+@click.option('--start', type=click.DateTime(['%Y-%m-%d']), help='First day to include (YYYY-MM-DD).')
+@click.option('--end', type=click.DateTime(['%Y-%m-%d']), help='Last day to include (YYYY-MM-DD).')
+@click.option('--batch-size', default=0, help='Rows per database fetch (default: EXPORT_BATCH_SIZE).')
+@with_appcontext
+def export_command(name, output_file, fmt, compress, start, end, batch_size):
+    """Stream a table of diagnosis, test or appointment records as CSV or NDJSON."""
+    from flask import current_app
+    from app.services.exports import parse_date, iter_export, encode
+
+    batch_size = batch_size or current_app.config['EXPORT_BATCH_SIZE']
+    began = time.perf_counter()
+    size = 0
+    for data in encode(iter_export(name, fmt, parse_date(start), parse_date(end), batch_size), compress):
+        output_file.write(data)
+        size += len(data)
+    output_file.flush()
+    click.echo(f"Exported {name} ({size} bytes) in {time.perf_counter() - began:.2f}s", err=True)
+
+
+def register_commands(app):
+    app.cli.add_command(score_command)
+    app.cli.add_command(export_command)
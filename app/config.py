@@ -24,6 +24,35 @@ class Config:
     MODELS_PATH = os.path.join(os.path.dirname(__file__), '..', 'models')
     DATASETS_PATH = os.path.join(os.path.dirname(__file__), '..', 'datasets')
     
+    #Prediction
+    PREDICT_BATCH_LIMIT = int(os.environ.get('PREDICT_BATCH_LIMIT', 1000))
+    #Rows scored (and inserted) per chunk by the doctor CSV upload
+    BATCH_TEST_CHUNK_SIZE = int(os.environ.get('BATCH_TEST_CHUNK_SIZE', 2000))
+    #Micro-batch concurrent /medical_test/predict calls (useful with threaded workers)
+    PREDICT_MICROBATCH = os.environ.get('PREDICT_MICROBATCH', 'false').lower() == 'true'
+    PREDICT_MICROBATCH_WINDOW_MS = float(os.environ.get('PREDICT_MICROBATCH_WINDOW_MS', 3))
+    PREDICT_MICROBATCH_MAX_SIZE = int(os.environ.get('PREDICT_MICROBATCH_MAX_SIZE', 64))
+    PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+    #Models/indexes loaded in the background at startup: '', 'serving', 'all' or a comma list
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', '')
+    #Unix socket of the shared inference server (python -m app.ml_models.inference); empty = in-process models
+    INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET', '')
+    INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 5))
+    #Seconds between checks of models/manifest.json for a new release (0 = off)
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 0))
+    #Directory shared by all workers for model latency metrics served on /metrics (empty = off)
+    METRICS_DIR = os.environ.get('METRICS_DIR', '')
+    
+    #Rows per page of the record listings (?limit= can ask for up to RECORDS_PAGE_MAX)
+    RECORDS_PAGE_SIZE = int(os.environ.get('RECORDS_PAGE_SIZE', 50))
+    RECORDS_PAGE_MAX = int(os.environ.get('RECORDS_PAGE_MAX', 200))
+    
+    #Rows fetched per server-side cursor batch by the record exports
+    EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', 1000))
+    
+    #Seconds the admin dashboard counts are reused (inserts/deletes in this worker refresh them sooner; 0 = off)
+    ADMIN_STATS_TTL = float(os.environ.get('ADMIN_STATS_TTL', 30))
+    
     #Logging
     LOG_LEVEL = 'INFO'
     LOG_FILE = 'logs/app.log'
@@ -53,6 +82,8 @@ class ProductionConfig(Config):
     SESSION_COOKIE_SECURE = True
     PREFERRED_URL_SCHEME = 'https'
     LOG_LEVEL = 'WARNING'
+    MODEL_PRELOAD = os.environ.get('MODEL_PRELOAD', 'serving')
+    MODEL_RELOAD_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
     
     #Connection pooling
     SQLALCHEMY_ENGINE_OPTIONS = {
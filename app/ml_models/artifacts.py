@@ -0,0 +1,155 @@
+"""Memory-mapped model artifacts.
+
+Each serving model is stored as a directory of raw .npy arrays plus a
+meta.json describing how to rebuild it. Loading them with mmap_mode='r'
+maps the files read-only, so every gunicorn worker on the node shares the
+same page-cache pages instead of holding a private unpickled copy (and
+none of them has to import sklearn at all).
+
+Convert the pickles in models/ with:  python -m app.ml_models.artifacts
+"""
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+import numpy as np
+
+from .native import NativeLogistic, NativeSVC, check_parity, to_native
+
+NATIVE_KINDS = {
+    NativeSVC.kind: NativeSVC,
+    NativeLogistic.kind: NativeLogistic,
+}
+
+# artifact name -> pickle it is converted from
+MODEL_FILES = {
+    'svc': 'svc.pkl',
+    'heart': 'heart.pkl',
+    'kidney': 'kidney.pkl',
+    'diabetes': 'diabetes.sav',
+}
+
+ARTIFACT_DIR = 'mmap'
+META_FILE = 'meta.json'
+
+#bumped when the saved arrays change; older artifacts count as stale (2: SVC support vectors)
+ARTIFACT_FORMAT = 2
+
+
+def artifact_path(models_dir, name):
+    return os.path.join(models_dir, ARTIFACT_DIR, name)
+
+
+def save_artifact(native, directory, source=None):
+    os.makedirs(directory, exist_ok=True)
+    for name, array in native.arrays().items():
+        np.save(os.path.join(directory, f"{name}.npy"), np.ascontiguousarray(array))
+
+    meta = {'kind': native.kind, 'format': ARTIFACT_FORMAT, 'arrays': sorted(native.arrays())}
+    if source:
+        meta['source'] = {'file': os.path.basename(source), 'sha256': file_digest(source)}
+
+    #meta.json is written last, so a directory without it is never loaded
+    tmp = os.path.join(directory, META_FILE + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(directory, META_FILE))
+
+
+def file_digest(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def read_meta(directory):
+    with open(os.path.join(directory, META_FILE)) as f:
+        return json.load(f)
+
+
+def load_artifact(directory, mmap_mode='r'):
+    meta = read_meta(directory)
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+              for name in meta['arrays']}
+    return NATIVE_KINDS[meta['kind']].from_arrays(arrays)
+
+
+def has_artifact(models_dir, name):
+    return os.path.exists(os.path.join(artifact_path(models_dir, name), META_FILE))
+
+
+def is_current(models_dir, name):
+    #an artifact converted from an older pickle than the one on disk is stale
+    source = os.path.join(models_dir, MODEL_FILES[name])
+    if not has_artifact(models_dir, name):
+        return False
+    meta = read_meta(artifact_path(models_dir, name))
+    if meta.get('format') != ARTIFACT_FORMAT:
+        return False
+    if not os.path.exists(source):
+        return True
+    return meta.get('source', {}).get('sha256') == file_digest(source)
+
+
+def load_model(models_dir, name, model_format='auto'):
+    """Load a serving model: mmap artifact when available, pickle otherwise.
+
+    model_format is 'mmap' (artifact required), 'pickle' (ignore artifacts)
+    or 'auto' (use the artifact only if it matches the pickle on disk).
+    """
+    if model_format == 'mmap' or (model_format == 'auto' and is_current(models_dir, name)):
+        return load_artifact(artifact_path(models_dir, name))
+    with open(os.path.join(models_dir, MODEL_FILES[name]), 'rb') as f:
+        return pickle.load(f)
+
+
+def _parity_features(project_root):
+    #rows each model was trained on, used to check the conversion is exact
+    import pandas as pd
+
+    datasets = os.path.join(project_root, "datasets")
+    training = pd.read_csv(os.path.join(datasets, "Training.csv"))
+    heart = pd.read_csv(os.path.join(datasets, "heart_disease_data.csv"))
+    kidney = pd.read_csv(os.path.join(datasets, "kidney Dataset.csv"))
+    diabetes = pd.read_csv(os.path.join(datasets, "diabetes.csv"))
+    #the training rows are answered by the exact-match table, so the model mostly sees unseen combinations
+    X = training.drop(columns=['prognosis']).values
+    unseen = (np.random.default_rng(0).random((20000, X.shape[1])) < 0.03).astype(X.dtype)
+    return {
+        'svc': np.vstack([X, unseen]),
+        'heart': heart.drop(columns=['target']).values,
+        'kidney': kidney.iloc[:, :24].values,
+        'diabetes': diabetes.drop(columns=['Outcome']).values,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..')
+    models_dir = argv[0] if argv else os.path.join(project_root, 'models')
+    features = _parity_features(project_root)
+
+    failed = False
+    for name, filename in MODEL_FILES.items():
+        source = os.path.join(models_dir, filename)
+        with open(source, 'rb') as f:
+            model = pickle.load(f)
+
+        native = to_native(model)
+        X = features[name].astype(np.float64)
+        mismatches = check_parity(native, model, X)
+        if len(mismatches):
+            print(f"{name}: {len(mismatches)} of {len(X)} rows disagree, not exported")
+            failed = True
+            continue
+
+        save_artifact(native, artifact_path(models_dir, name), source=source)
+        print(f"{name}: parity verified on {len(X)} rows, wrote {artifact_path(models_dir, name)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
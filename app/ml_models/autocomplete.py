@@ -0,0 +1,89 @@
+"""Symptom autocomplete: prefix trie plus co-occurrence re-ranking.
+
+The trie is keyed on every word start of every symptom ("pain" finds
+"back_pain" as well as "pain_behind_the_eyes"), and each node keeps the
+ids that complete it, so a keystroke costs one walk down the typed prefix.
+Matches are then ordered by how often they co-occur with the symptoms
+already entered, using a sparse symptom x symptom count matrix.
+"""
+import hashlib
+
+import numpy as np
+from scipy import sparse
+
+from .resolver import normalize_symptom
+
+
+def symptom_label(symptom):
+    return " ".join(normalize_symptom(symptom).split('_'))
+
+
+def build_cooccurrence(matrices, n_symptoms):
+    """Sparse co-occurrence counts from 0/1 (rows x symptoms) matrices"""
+    counts = sparse.csr_matrix((n_symptoms, n_symptoms), dtype=np.float64)
+    for X in matrices:
+        X = sparse.csr_matrix(np.asarray(X) != 0, dtype=np.float64)
+        counts = counts + X.T @ X
+    return counts.tocsr()
+
+
+class SymptomAutocomplete:
+
+    def __init__(self, symptoms, cooccurrence, limit=10):
+        self.limit = limit
+        self.symptoms = list(symptoms)
+        self.labels = [symptom_label(symptom) for symptom in self.symptoms]
+        self.ids = {symptom: symptoms[symptom] for symptom in self.symptoms}
+
+        self.cooccurrence = cooccurrence
+        self.frequency = cooccurrence.diagonal()
+
+        #popularity order used when nothing has been entered yet
+        self._popular = sorted(range(len(self.symptoms)),
+                               key=lambda i: (-self.frequency[self.ids[self.symptoms[i]]], self.labels[i]))
+        rank = {i: position for position, i in enumerate(self._popular)}
+
+        self._root = {}
+        for i, label in enumerate(self.labels):
+            words = label.split()
+            for start in range(len(words)):
+                node = self._root
+                for char in " ".join(words[start:]):
+                    node = node.setdefault(char, {})
+                    node.setdefault('', set()).add(i)
+
+        #freeze every node's match set in popularity order
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if '' in node:
+                node[''] = tuple(sorted(node[''], key=rank.__getitem__))
+            stack.extend(child for key, child in node.items() if key)
+
+        digest = hashlib.sha1(repr((self.symptoms, cooccurrence.data.tolist())).encode())
+        self.version = digest.hexdigest()[:12]
+
+    def matches(self, prefix):
+        node = self._root
+        for char in symptom_label(prefix):
+            node = node.get(char)
+            if node is None:
+                return ()
+        return node.get('', ())
+
+    def suggest(self, prefix, selected=(), limit=None):
+        limit = limit or self.limit
+        chosen = [self.ids[symptom] for symptom in selected if symptom in self.ids]
+        candidates = self.matches(prefix) if symptom_label(prefix) else self._popular
+        candidates = [i for i in candidates if self.ids[self.symptoms[i]] not in chosen]
+
+        if chosen:
+            #add the chosen CSR rows directly; scipy's row slicing costs far more here
+            scores = np.zeros(len(self.frequency))
+            indptr, indices, data = self.cooccurrence.indptr, self.cooccurrence.indices, self.cooccurrence.data
+            for row in chosen:
+                scores[indices[indptr[row]:indptr[row + 1]]] += data[indptr[row]:indptr[row + 1]]
+            #stable sort keeps popularity order between equal co-occurrence counts
+            candidates.sort(key=lambda i: -scores[self.ids[self.symptoms[i]]])
+
+        return [{'symptom': self.symptoms[i], 'label': self.labels[i]} for i in candidates[:limit]]
@@ -0,0 +1,83 @@
+"""Compact bitset encoding of symptom sets.
+
+The 132 symptoms fit in three 64-bit words. A set is encoded as one Python
+int (bit i set when symptom i is present), which hashes cheaply and works
+as a dict key. Training rows are encoded word by word in NumPy.
+"""
+import numpy as np
+
+WORD_BITS = 64
+N_WORDS = 3
+
+_WORD_WEIGHTS = np.left_shift(np.uint64(1), np.arange(WORD_BITS, dtype=np.uint64))
+
+
+def encode_indices(indices):
+    """Bitset for an iterable of symptom indices"""
+    mask = 0
+    for i in indices:
+        mask |= 1 << i
+    return mask
+
+
+def encode_matrix(X):
+    """Bitsets for every row of a 0/1 symptom matrix, as an (n, N_WORDS) uint64 array"""
+    X = np.asarray(X)
+    words = np.zeros((X.shape[0], N_WORDS), dtype=np.uint64)
+    for w in range(N_WORDS):
+        block = X[:, w * WORD_BITS:(w + 1) * WORD_BITS] != 0
+        words[:, w] = block.astype(np.uint64) @ _WORD_WEIGHTS[:block.shape[1]]
+    return words
+
+
+def words_to_int(words):
+    mask = 0
+    for w, word in enumerate(words):
+        mask |= int(word) << (w * WORD_BITS)
+    return mask
+
+
+class ExactMatchTable:
+    """Hash table from training-set symptom bitsets to their class label.
+
+    Symptom combinations seen in training are answered without touching
+    the model; combinations that appear with more than one label are left
+    out so the classifier decides them.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_training(cls, X, labels):
+        table = {}
+        conflicts = set()
+        for words, label in zip(encode_matrix(X), labels):
+            key = words_to_int(words)
+            if table.setdefault(key, label) != label:
+                conflicts.add(key)
+        for key in conflicts:
+            del table[key]
+        return cls(table)
+
+    def get(self, mask):
+        label = self.table.get(mask)
+        if label is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return label
+
+    def __len__(self):
+        return len(self.table)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.table),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
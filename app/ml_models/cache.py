@@ -0,0 +1,87 @@
+import threading
+from collections import OrderedDict
+
+
+def symptom_key(symptoms):
+    #the same symptoms in any order (or repeated) give the same key
+    return tuple(sorted(set(symptoms)))
+
+
+class PredictionCache:
+    """Size-bounded LRU cache of prediction bundles keyed on a symptom set.
+
+    Entries are tied to a model version token; when `validate` sees a new
+    token (a new model release went live) every cached prediction is dropped.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def validate(self, version):
+        #True when a new model version replaced an earlier one
+        with self._lock:
+            if version == self.version:
+                return False
+            changed = self.version is not None
+            if changed:
+                self.invalidations += 1
+            self._data.clear()
+            self.version = version
+            return changed
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, version=None):
+        #a bundle computed for an earlier version than the current one is not kept
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if version is not None and version != self.version:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, maxsize):
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > max(maxsize, 0):
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'version': self.version
+            }
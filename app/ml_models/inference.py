@@ -0,0 +1,361 @@
+"""Shared local inference server.
+
+One process on the node holds the serving models; gunicorn workers send it
+feature rows over a Unix domain socket instead of loading their own copies.
+Single-row requests from every worker go through one MicroBatcher per
+model, so concurrent traffic is scored in shared batches.
+
+Wire format (network byte order headers, little-endian arrays):
+
+    request   op:u8 model:u8 encoding:u8 k:u16 rows:u32 cols:u16, then
+              rows*cols float64 (ENCODING_DENSE) or rows*3 uint64 symptom
+              bitsets (ENCODING_BITS, see bitset.py)
+    response  status:u8 length:u32, then `length` bytes:
+              PREDICT  rows int64 labels
+              RANK     rows*k int64 labels, rows*k float64 scores, rows*k int64 votes
+              PROBA    c int64 classes, rows*c float64 probabilities
+              VERSION / STATS  UTF-8 JSON (the active model release / batch stats)
+              status != 0: UTF-8 error message; STATUS_UNSUPPORTED when the
+              model lacks the op (PROBA on a model without probabilities)
+
+Run the server with:  python -m app.ml_models.inference [socket_path]
+(gunicorn starts it itself when INFERENCE_SOCKET is set).
+"""
+import json
+import os
+import signal
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .bitset import N_WORDS, WORD_BITS, encode_matrix
+from .scheduler import MicroBatcher
+
+OP_PREDICT = 1
+OP_RANK = 2
+OP_VERSION = 3
+OP_STATS = 4
+OP_PROBA = 5
+
+ENCODING_DENSE = 0
+ENCODING_BITS = 1
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_UNSUPPORTED = 2
+
+REQUEST = struct.Struct('!BBBHIH')
+RESPONSE = struct.Struct('!BI')
+
+#models served remotely, by wire id; the names are registry entries
+REMOTE_MODELS = ['svc_native', 'model', 'kidney_model', 'classifier']
+MODEL_IDS = {name: i for i, name in enumerate(REMOTE_MODELS)}
+
+#a symptom-set cache only needs to notice a model swap within a second or so
+VERSION_TTL = 1.0
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+class UnsupportedOperation(InferenceError, NotImplementedError):
+    """The served model has no such method, e.g. predict_proba on an SVC without probabilities"""
+
+
+def _recv_exact(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    while size:
+        n = sock.recv_into(view, size)
+        if not n:
+            raise ConnectionError("inference socket closed")
+        view = view[n:]
+        size -= n
+    return bytes(buf)
+
+
+def encode_rows(X, bits=False):
+    """Payload bytes and encoding for a feature matrix"""
+    if bits and X.shape[1] <= N_WORDS * WORD_BITS and np.isin(X, (0, 1)).all():
+        return ENCODING_BITS, encode_matrix(X).astype('<u8').tobytes()
+    return ENCODING_DENSE, X.astype('<f8').tobytes()
+
+
+def decode_rows(encoding, payload, rows, cols):
+    if encoding == ENCODING_BITS:
+        words = np.frombuffer(payload, dtype='<u8').reshape(rows, N_WORDS)
+        bits = np.unpackbits(words.view(np.uint8), axis=1, bitorder='little')
+        return bits[:, :cols].astype(np.float64)
+    return np.frombuffer(payload, dtype='<f8').reshape(rows, cols)
+
+
+def payload_size(encoding, rows, cols):
+    return rows * (N_WORDS if encoding == ENCODING_BITS else cols) * 8
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves the registry's models to local clients, batching single rows"""
+
+    daemon_threads = True
+
+    def __init__(self, path, registry, window=0.0, max_batch=64):
+        self.registry = registry
+        self.window = window
+        self.max_batch = max_batch
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        super().__init__(path, InferenceHandler)
+
+    def batcher(self, name, op, k):
+        #one batcher per (model, op, k), created on first use
+        key = (name, op, k)
+        with self._lock:
+            if key not in self._batchers:
+                if op == OP_RANK:
+                    fn = lambda X: list(zip(*self.registry.get(name).rank(X, k)))
+                else:
+                    fn = lambda X: self.registry.get(name).predict(X)
+                self._batchers[key] = MicroBatcher(fn, window=self.window, max_batch=self.max_batch)
+            return self._batchers[key]
+
+    def predict(self, name, X):
+        if len(X) == 1:
+            return np.array([self.batcher(name, OP_PREDICT, 0).predict(X[0])])
+        return self.registry.get(name).predict(X)
+
+    def rank(self, name, X, k):
+        if len(X) == 1:
+            labels, scores, votes = self.batcher(name, OP_RANK, k).predict(X[0])
+            return labels[np.newaxis], scores[np.newaxis], votes[np.newaxis]
+        return self.registry.get(name).rank(X, k)
+
+    def predict_proba(self, name, X):
+        #what-if curves send many rows at once, so there is nothing to batch
+        model = self.registry.get(name)
+        if not hasattr(model, 'predict_proba'):
+            raise NotImplementedError(f"{name} has no predict_proba")
+        return model.classes_, model.predict_proba(X)
+
+    def stats(self):
+        with self._lock:
+            return {f"{name}/{'rank' if op == OP_RANK else 'predict'}/{k}": batcher.stats()
+                    for (name, op, k), batcher in self._batchers.items()}
+
+
+class InferenceHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        from .loader import model_version
+
+        while True:
+            try:
+                op, model_id, encoding, k, rows, cols = REQUEST.unpack(_recv_exact(self.request, REQUEST.size))
+                payload = _recv_exact(self.request, payload_size(encoding, rows, cols)) if rows else b''
+            except ConnectionError:
+                return
+
+            try:
+                if op == OP_VERSION:
+                    body = json.dumps(model_version()).encode()
+                elif op == OP_STATS:
+                    body = json.dumps(self.server.stats()).encode()
+                else:
+                    name = REMOTE_MODELS[model_id]
+                    X = decode_rows(encoding, payload, rows, cols)
+                    if op == OP_RANK:
+                        labels, scores, votes = self.server.rank(name, X, k)
+                        body = (np.asarray(labels, dtype='<i8').tobytes()
+                                + np.asarray(scores, dtype='<f8').tobytes()
+                                + np.asarray(votes, dtype='<i8').tobytes())
+                    elif op == OP_PROBA:
+                        classes, proba = self.server.predict_proba(name, X)
+                        body = np.asarray(classes, dtype='<i8').tobytes() + np.asarray(proba, dtype='<f8').tobytes()
+                    else:
+                        body = np.asarray(self.server.predict(name, X), dtype='<i8').tobytes()
+                status = STATUS_OK
+            except NotImplementedError as err:
+                status, body = STATUS_UNSUPPORTED, str(err).encode()
+            except Exception as err:
+                status, body = STATUS_ERROR, f"{type(err).__name__}: {err}".encode()
+
+            self.request.sendall(RESPONSE.pack(status, len(body)) + body)
+
+
+class InferenceClient:
+    """Blocking client with one connection per thread (and per forked process)"""
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._version = None
+        self._version_at = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(self.timeout)
+        conn.connect(self.path)
+        self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _reset(self):
+        conn, self._local.conn = getattr(self._local, 'conn', None), None
+        if conn is not None and getattr(self._local, 'pid', None) == os.getpid():
+            conn.close()
+
+    def call(self, op, model=0, X=None, k=0, bits=False):
+        if X is None:
+            encoding, payload, rows, cols = ENCODING_DENSE, b'', 0, 0
+        else:
+            rows, cols = X.shape
+            encoding, payload = encode_rows(X, bits)
+        request = REQUEST.pack(op, model, encoding, k, rows, cols) + payload
+
+        #one retry on a fresh connection covers a restarted server
+        for attempt in (0, 1):
+            try:
+                conn = self._connection()
+                conn.sendall(request)
+                status, length = RESPONSE.unpack(_recv_exact(conn, RESPONSE.size))
+                body = _recv_exact(conn, length)
+                break
+            except OSError as err:
+                self._reset()
+                if attempt:
+                    raise InferenceError(f"inference server at {self.path} unavailable: {err}") from err
+
+        if status == STATUS_UNSUPPORTED:
+            raise UnsupportedOperation(body.decode())
+        if status != STATUS_OK:
+            raise InferenceError(body.decode())
+        return body
+
+    def predict(self, name, X):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        body = self.call(OP_PREDICT, MODEL_IDS[name], X, bits=name == 'svc_native')
+        return np.frombuffer(body, dtype='<i8')
+
+    def rank(self, name, X, k=5):
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        body = self.call(OP_RANK, MODEL_IDS[name], X, k=k, bits=name == 'svc_native')
+        n = len(body) // 24
+        shape = (len(X), n // len(X))
+        return (np.frombuffer(body, dtype='<i8', count=n).reshape(shape),
+                np.frombuffer(body, dtype='<f8', count=n, offset=n * 8).reshape(shape),
+                np.frombuffer(body, dtype='<i8', count=n, offset=n * 16).reshape(shape))
+
+    def predict_proba(self, name, X):
+        """(classes, probabilities) for the rows of X"""
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        body = self.call(OP_PROBA, MODEL_IDS[name], X)
+        n_classes = len(body) // 8 // (len(X) + 1)
+        return (np.frombuffer(body, dtype='<i8', count=n_classes),
+                np.frombuffer(body, dtype='<f8', offset=n_classes * 8).reshape(len(X), n_classes))
+
+    def model_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._version_at > VERSION_TTL:
+            self._version = json.loads(self.call(OP_VERSION))
+            self._version_at = now
+        return self._version
+
+    def stats(self):
+        return json.loads(self.call(OP_STATS))
+
+
+class RemoteModel:
+    """Stands in for a registry model; predict, rank and predict_proba run in the inference server"""
+
+    kind = 'remote'
+
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def predict(self, X):
+        return self.client.predict(self.name, X)
+
+    def rank(self, X, k=5):
+        return self.client.rank(self.name, X, k)
+
+    def predict_proba(self, X):
+        #classes_ follows the served model, as sensitivity.score_matrix expects; raises
+        #UnsupportedOperation (a NotImplementedError) when that model has no probabilities
+        self.classes_, proba = self.client.predict_proba(self.name, X)
+        return proba
+
+    def model_version(self):
+        return self.client.model_version()
+
+
+def use_inference_server(registry, path, timeout=5.0):
+    """Point the registry's serving models at the inference server on `path`"""
+    client = InferenceClient(path, timeout)
+    for name in REMOTE_MODELS:
+        registry.put(name, RemoteModel(client, name))
+    return client
+
+
+def wait_for_server(path, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(path)
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else os.environ.get('INFERENCE_SOCKET', '/tmp/medical_diagnosis_inference.sock')
+
+    from .loader import registry
+    registry.preload(REMOTE_MODELS, background=False)
+    if os.environ.get('METRICS_DIR'):
+        from .metrics import enable
+        enable(os.environ['METRICS_DIR'])
+
+    server = InferenceServer(
+        path, registry,
+        #requests queued by other workers meanwhile already form batches; a
+        #window only adds latency unless the node has cores to spare
+        window=float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', 0)) / 1000.0,
+        max_batch=int(os.environ.get('INFERENCE_BATCH_MAX_SIZE', 64))
+    )
+    interval = float(os.environ.get('MODEL_RELOAD_INTERVAL', 30))
+    if interval > 0:
+        from .loader import watch_releases
+        watch_releases(interval)
+
+    print(f"inference server listening on {path}", flush=True)
+    #gunicorn stops the server with SIGTERM; exit through the cleanup below
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
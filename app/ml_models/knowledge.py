@@ -0,0 +1,74 @@
+import ast
+from types import MappingProxyType
+from typing import NamedTuple, Tuple
+
+
+# Disease names are spelt slightly differently across the datasets
+# (double spaces, trailing spaces, 'diseae' vs 'disease'), so every table
+# is keyed on the same normalised name.
+_NAME_FIXES = {
+    'peptic ulcer diseae': 'peptic ulcer disease',
+}
+
+
+def normalize_disease(name):
+    key = " ".join(str(name).split()).lower()
+    return _NAME_FIXES.get(key, key)
+
+
+class DiseaseInfo(NamedTuple):
+    """Precomputed knowledge for a single disease"""
+    name: str
+    description: str
+    precautions: Tuple[str, ...]
+    medications: Tuple[str, ...]
+    diet: Tuple[str, ...]
+    workout: Tuple[str, ...]
+
+
+def _parse_list(value):
+    #medications and diets are stored as python list literals
+    if not isinstance(value, str):
+        return ()
+    return tuple(ast.literal_eval(value))
+
+
+def build_knowledge_index(description, precaution, medication, diet, workout):
+    """Build an immutable disease -> DiseaseInfo mapping from the datasets"""
+    names = {}
+    descriptions = {}
+    for dis, descr in zip(description['Disease'], description['Description']):
+        key = normalize_disease(dis)
+        names.setdefault(key, " ".join(dis.split()))
+        descriptions.setdefault(key, []).append(descr)
+
+    prec_cols = ['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']
+    precautions = {}
+    for dis, *values in precaution[['Disease'] + prec_cols].itertuples(index=False):
+        precautions[normalize_disease(dis)] = tuple(v for v in values if isinstance(v, str) and v)
+
+    medications = {normalize_disease(dis): _parse_list(med)
+                   for dis, med in zip(medication['Disease'], medication['Medication'])}
+    diets = {normalize_disease(dis): _parse_list(die)
+             for dis, die in zip(diet['Disease'], diet['Diet'])}
+
+    workouts = {}
+    for dis, work in zip(workout['disease'], workout['workout']):
+        workouts.setdefault(normalize_disease(dis), []).append(work)
+
+    index = {}
+    for key, descr in descriptions.items():
+        index[key] = DiseaseInfo(
+            name=names[key],
+            description=" ".join(descr),
+            precautions=precautions.get(key, ()),
+            medications=medications.get(key, ()),
+            diet=diets.get(key, ()),
+            workout=tuple(workouts.get(key, ())),
+        )
+    return MappingProxyType(index)
+
+
+def lookup(index, dis):
+    """Return the DiseaseInfo for a predicted disease name"""
+    return index[normalize_disease(dis)]
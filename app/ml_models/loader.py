@@ -1,27 +1,117 @@
 import os
-import pandas as pd
-import pickle
+
+from .knowledge import build_knowledge_index
+from .native import NativeSVC
+from .artifacts import load_model
+from .registry import ModelRegistry
+from .releases import ModelWatcher, active_release
 
 # Get the base directory
 base_dir = os.path.dirname(os.path.abspath(__file__))
 project_root = os.path.join(base_dir, '..', '..')
 
+# Models and datasets are loaded on first use (or preloaded, see create_app),
+# so importing this module costs nothing. Attribute access such as
+# loader.svc still works and goes through the registry.
+registry = ModelRegistry()
+
+
+def _csv(filename):
+    def load():
+        import pandas as pd
+        return pd.read_csv(os.path.join(project_root, "datasets", filename))
+    return load
+
+
 # Load datasets with proper paths
-symptoms = pd.read_csv(os.path.join(project_root, "datasets/symtoms_df.csv"))
-precaution = pd.read_csv(os.path.join(project_root, "datasets/precautions_df.csv"))
-workout = pd.read_csv(os.path.join(project_root, "datasets/workout_df.csv"))
-description = pd.read_csv(os.path.join(project_root, "datasets/description.csv"))
-medication = pd.read_csv(os.path.join(project_root, "datasets/medications.csv"))
-diet = pd.read_csv(os.path.join(project_root, "datasets/diets.csv"))
-diabetes = pd.read_csv(os.path.join(project_root, "datasets/diabetes.csv"))
-heart_data = pd.read_csv(os.path.join(project_root, "datasets/heart_disease_data.csv"))
-kidney_data = pd.read_csv(os.path.join(project_root, "datasets/kidney Dataset.csv"))
-
-# Load models with proper paths
-svc = pickle.load(open(os.path.join(project_root, "models/svc.pkl"), 'rb'))
-model = pickle.load(open(os.path.join(project_root, "models/heart.pkl"), 'rb'))
-kidney_model = pickle.load(open(os.path.join(project_root, "models/kidney.pkl"), 'rb'))
-classifier = pickle.load(open(os.path.join(project_root, "models/diabetes.sav"), 'rb'))
+DATASETS = {
+    'symptoms': "symtoms_df.csv",
+    'precaution': "precautions_df.csv",
+    'workout': "workout_df.csv",
+    'description': "description.csv",
+    'medication': "medications.csv",
+    'diet': "diets.csv",
+    'diabetes': "diabetes.csv",
+    'heart_data': "heart_disease_data.csv",
+    'kidney_data': "kidney Dataset.csv",
+    'training': "Training.csv",
+}
+for _name, _filename in DATASETS.items():
+    registry.register(_name, _csv(_filename))
+
+# Disease knowledge is indexed once so predictions never scan the frames
+registry.register('knowledge_index', lambda: build_knowledge_index(
+    registry.get('description'), registry.get('precaution'), registry.get('medication'),
+    registry.get('diet'), registry.get('workout')
+))
+
+# Load models with proper paths. Memory-mapped artifacts (see artifacts.py) are
+# shared between workers through the page cache; pickles are the fallback.
+# MODEL_FORMAT=pickle|mmap forces one or the other. Models come from the
+# release named in models/manifest.json, or from models/ itself (releases.py).
+models_dir = os.path.join(project_root, "models")
+model_format = os.environ.get('MODEL_FORMAT', 'auto').lower()
+
+registry.register('model_release', lambda: active_release(models_dir))
+
+MODELS = {
+    'svc': 'svc',
+    'model': 'heart',
+    'kidney_model': 'kidney',
+    'classifier': 'diabetes',
+}
+for _name, _artifact in MODELS.items():
+    registry.register(_name, lambda artifact=_artifact: load_model(
+        registry.get('model_release').directory, artifact, model_format
+    ))
+
+
+# Plain NumPy copy of the symptom SVC used for serving (see native.py)
+def _native(svc):
+    return svc if isinstance(svc, NativeSVC) else NativeSVC.from_svc(svc)
+
+
+registry.register('svc_native', lambda: _native(registry.get('svc')))
+
+#entries computed from svc_native, as name -> build(svc_native); filled in by predictor.py
+MODEL_DEPENDENTS = {}
+
+
+def load_release(release):
+    #new copies of the models this process has loaded, for ModelWatcher to swap in
+    models = {name: load_model(release.directory, artifact, model_format)
+              for name, artifact in MODELS.items()
+              if registry.is_loaded(name) or (name == 'svc' and registry.is_loaded('svc_native'))}
+    if 'svc' in models and registry.is_loaded('svc_native'):
+        models['svc_native'] = _native(models['svc'])
+
+        #built from the new model here, so they go live in the same swap as it
+        for name, build in MODEL_DEPENDENTS.items():
+            if registry.is_loaded(name):
+                models[name] = build(models['svc_native'])
+    return models
+
+
+def watch_releases(interval):
+    """Poll the model manifest every `interval` seconds and hot-swap new releases"""
+    return ModelWatcher(registry, models_dir, load_release, interval).start()
+
+
+def model_version():
+    #release the serving models came from, recorded on results and used to invalidate cached predictions
+    svc_native = registry.get('svc_native')
+    if hasattr(svc_native, 'model_version'):
+        #served by the inference server, which owns the model files
+        return svc_native.model_version()
+    return registry.get('model_release').version
+
+
+def __getattr__(name):
+    #module-level access to registry entries, e.g. loader.classifier
+    if name in registry:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 diabetes_remedies = [
     "Diet: Balanced diet",
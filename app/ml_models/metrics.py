@@ -0,0 +1,212 @@
+"""Latency, call, batch size and error metrics for the serving models.
+
+Off unless METRICS_DIR is set, and then nothing is wrapped, so serving
+pays nothing for it. enable(directory) wraps the registry's serving models
+and predictor.helper(). Each process (every gunicorn worker, the inference
+server) then adds its observations to its own memory-mapped file in
+`directory`, and /metrics sums the files of all processes into the
+Prometheus text format:
+
+    model_inference_seconds      histogram  {model, method}
+    model_inference_batch_rows   histogram  {model, method}
+    model_inference_errors_total counter    {model, method}
+
+The directory is emptied when gunicorn starts, so its files always describe
+the current server. Files of workers that have since exited are still
+counted, which keeps the counters monotonic.
+"""
+import bisect
+import glob
+import mmap
+import os
+import threading
+import time
+
+import numpy as np
+
+#registry entries timed on every call, and the methods timed on them
+MODELS = ['svc_native', 'model', 'kidney_model', 'classifier']
+METHODS = ['predict', 'predict_proba', 'rank']
+
+SERIES = [(model, method) for model in MODELS for method in METHODS] + [('knowledge_index', 'helper')]
+SERIES_INDEX = {series: i for i, series in enumerate(SERIES)}
+
+LATENCY_BUCKETS = [0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+BATCH_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096]
+
+#per series: calls, errors, latency sum, rows sum, then one count per bucket (+Inf last)
+CALLS, ERRORS, SECONDS, ROWS = range(4)
+LATENCY_OFFSET = 4
+BATCH_OFFSET = LATENCY_OFFSET + len(LATENCY_BUCKETS) + 1
+WIDTH = BATCH_OFFSET + len(BATCH_BUCKETS) + 1
+FILE_SIZE = len(SERIES) * WIDTH * 8
+
+FILE_PATTERN = 'metrics-*.bin'
+
+
+class MetricsFile:
+    """This process's counters, as float64 slots in a shared file mapping"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._slots = None
+        self._lock = threading.Lock()
+        #a forked worker must not add to its parent's file
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def _open(self):
+        path = os.path.join(self.directory, f"metrics-{os.getpid()}.bin")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, FILE_SIZE)
+            self._slots = memoryview(mmap.mmap(fd, FILE_SIZE)).cast('d')
+        finally:
+            os.close(fd)
+        return self._slots
+
+    def observe(self, series, seconds, rows, failed=False):
+        slots = self._slots or self._open()
+        base = series * WIDTH
+        latency = base + LATENCY_OFFSET + bisect.bisect_left(LATENCY_BUCKETS, seconds)
+        batch = base + BATCH_OFFSET + bisect.bisect_left(BATCH_BUCKETS, rows)
+        with self._lock:
+            slots[base + CALLS] += 1
+            slots[base + SECONDS] += seconds
+            slots[base + ROWS] += rows
+            slots[latency] += 1
+            slots[batch] += 1
+            if failed:
+                slots[base + ERRORS] += 1
+
+
+def _rows(X):
+    shape = getattr(X, 'shape', None)
+    if shape is not None:
+        return shape[0] if len(shape) > 1 else 1
+    return len(X) if len(X) and isinstance(X[0], (list, tuple)) else 1
+
+
+def timed(fn, series, metrics, count_rows=True):
+    """fn, with its latency, input rows and failures recorded under `series`"""
+    perf_counter = time.perf_counter
+
+    def call(X, *args, **kwargs):
+        start = perf_counter()
+        try:
+            result = fn(X, *args, **kwargs)
+        except Exception:
+            metrics.observe(series, perf_counter() - start, _rows(X) if count_rows else 1, True)
+            raise
+        metrics.observe(series, perf_counter() - start, _rows(X) if count_rows else 1)
+        return result
+
+    call.__wrapped__ = fn
+    return call
+
+
+class InstrumentedModel:
+    """A model whose predict/predict_proba/rank are timed; everything else passes through"""
+
+    kind = 'instrumented'
+
+    def __init__(self, model, name, metrics):
+        self.model = model
+        for method in METHODS:
+            if hasattr(model, method):
+                setattr(self, method, timed(getattr(model, method), SERIES_INDEX[(name, method)], metrics))
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+_metrics = None
+
+
+def enabled():
+    return _metrics is not None
+
+
+def enable(directory):
+    """Start recording the serving models and helper() into `directory`"""
+    global _metrics
+    if _metrics is not None:
+        return _metrics
+
+    from . import predictor
+    from .loader import registry
+
+    os.makedirs(directory, exist_ok=True)
+    _metrics = MetricsFile(directory)
+
+    def instrument(name, model):
+        #remote models are timed where they actually run, in the inference server
+        if getattr(model, 'kind', None) in ('remote', 'instrumented'):
+            return model
+        return InstrumentedModel(model, name, _metrics)
+
+    registry.wrap(MODELS, instrument)
+    predictor.helper = timed(predictor.helper, SERIES_INDEX[('knowledge_index', 'helper')], _metrics, count_rows=False)
+    return _metrics
+
+
+def clear(directory):
+    #called once per server start, before any worker records anything
+    for path in glob.glob(os.path.join(directory, FILE_PATTERN)):
+        os.remove(path)
+
+
+def collect(directory):
+    """Slots summed over every process's file, shape (len(SERIES), WIDTH)"""
+    total = np.zeros(len(SERIES) * WIDTH)
+    for path in glob.glob(os.path.join(directory, FILE_PATTERN)):
+        try:
+            values = np.fromfile(path, dtype=np.float64)
+        except FileNotFoundError:
+            continue
+        #files from an older layout are skipped rather than misread
+        if len(values) == len(total):
+            total += values
+    return total.reshape(len(SERIES), WIDTH)
+
+
+def _labels(model, method, **extra):
+    pairs = [('model', model), ('method', method)] + [(key, value) for key, value in extra.items()]
+    return '{' + ','.join(f'{key}="{value}"' for key, value in pairs) + '}'
+
+
+def _histogram(lines, name, bounds, counts, total, model, method):
+    cumulative = np.cumsum(counts)
+    for bound, count in zip(bounds, cumulative):
+        lines.append(f"{name}_bucket{_labels(model, method, le=f'{bound:g}')} {count:g}")
+    lines.append(f"{name}_bucket{_labels(model, method, le='+Inf')} {cumulative[-1]:g}")
+    lines.append(f"{name}_sum{_labels(model, method)} {total:.9g}")
+    lines.append(f"{name}_count{_labels(model, method)} {cumulative[-1]:g}")
+
+
+def render(directory):
+    """All processes' metrics in the Prometheus text exposition format"""
+    slots = collect(directory)
+    seen = [(i, series) for i, series in enumerate(SERIES) if slots[i, CALLS]]
+
+    lines = ['# HELP model_inference_seconds Time spent in one model call',
+             '# TYPE model_inference_seconds histogram']
+    for i, (model, method) in seen:
+        _histogram(lines, 'model_inference_seconds', LATENCY_BUCKETS,
+                   slots[i, LATENCY_OFFSET:BATCH_OFFSET], slots[i, SECONDS], model, method)
+
+    lines += ['# HELP model_inference_batch_rows Rows scored by one model call',
+              '# TYPE model_inference_batch_rows histogram']
+    for i, (model, method) in seen:
+        _histogram(lines, 'model_inference_batch_rows', BATCH_BUCKETS,
+                   slots[i, BATCH_OFFSET:WIDTH], slots[i, ROWS], model, method)
+
+    lines += ['# HELP model_inference_errors_total Model calls that raised',
+              '# TYPE model_inference_errors_total counter']
+    for i, (model, method) in seen:
+        lines.append(f"model_inference_errors_total{_labels(model, method)} {slots[i, ERRORS]:g}")
+
+    return '\n'.join(lines) + '\n'
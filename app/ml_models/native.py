@@ -0,0 +1,245 @@
+"""NumPy-native decision functions for the linear serving models.
+
+A linear-kernel SVC collapses to one weight vector and intercept per pair
+of classes, so predicting is a single matmul followed by one-vs-one
+voting; a binary LogisticRegression is one dot product. This skips
+sklearn's input validation and libsvm dispatch on every request.
+
+The collapsed weights sum the support vectors in a different order from
+libsvm, so a pair whose decision is (mathematically) zero comes out as
++-1e-16 on either side. NativeSVC keeps the support vectors as well and
+recomputes those near-zero pairs in libsvm's order, which keeps its votes
+identical to SVC.predict on any input, not only the training rows.
+
+Models are saved as plain arrays by artifacts.py.
+"""
+import numpy as np
+
+
+class NativeSVC:
+    """Plain NumPy replacement for a fitted linear sklearn SVC"""
+
+    kind = 'svc'
+
+    #|decision| below this may have its sign decided by rounding, see _settle_ties()
+    TIE_EPS = 1e-9
+    #from this many rows, skip the near-zero pairs that _touched() shows are exact; below it the check costs more
+    UNTOUCHED_MIN_ROWS = 8
+
+    def __init__(self, weights, intercepts, pair_i, pair_j, classes,
+                 support_vectors=None, dual_coef=None, n_support=None):
+        self.weights = weights
+        self.intercepts = intercepts
+        self.pair_i = pair_i
+        self.pair_j = pair_j
+        self.classes_ = classes
+        self.n_features_in_ = weights.shape[0]
+
+        #libsvm's model, in libsvm's sign convention; None for artifacts saved without it
+        self.support_vectors = support_vectors
+        self.dual_coef = dual_coef
+        self.n_support = n_support
+        if n_support is not None:
+            self._pair_terms(n_support)
+
+        #votes for class c = sum over pairs won by c, written as one matmul:
+        #positive @ (I - J) + column sums of J, with I/J one-hot pair -> class maps.
+        #float32 holds these small counts exactly, at half the cost of float64
+        n_pairs = len(intercepts)
+        vote_i = np.zeros((n_pairs, len(classes)), dtype=np.float32)
+        vote_j = np.zeros((n_pairs, len(classes)), dtype=np.float32)
+        vote_i[np.arange(n_pairs), pair_i] = 1
+        vote_j[np.arange(n_pairs), pair_j] = 1
+        self._vote_delta = vote_i - vote_j
+        self._vote_base = vote_j.sum(axis=0)
+
+    @classmethod
+    def from_svc(cls, svc):
+        if svc.kernel != 'linear':
+            raise ValueError(f"Only linear SVC models can be exported, got kernel={svc.kernel!r}")
+
+        n_classes = len(svc.classes_)
+        pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+
+        #sklearn flips the sign for binary models so that positive means classes_[1]
+        sign = -1.0 if n_classes == 2 else 1.0
+        return cls(
+            weights=np.ascontiguousarray(sign * svc.coef_.T, dtype=np.float64),
+            intercepts=sign * np.asarray(svc.intercept_, dtype=np.float64),
+            pair_i=np.array([i for i, _ in pairs], dtype=np.intp),
+            pair_j=np.array([j for _, j in pairs], dtype=np.intp),
+            classes=np.asarray(svc.classes_),
+            support_vectors=np.ascontiguousarray(svc.support_vectors_, dtype=np.float64),
+            dual_coef=np.ascontiguousarray(sign * svc.dual_coef_, dtype=np.float64),
+            n_support=np.asarray(svc.n_support_, dtype=np.intp)
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['weights'], arrays['intercepts'], arrays['pair_i'],
+                   arrays['pair_j'], arrays['classes'], arrays.get('support_vectors'),
+                   arrays.get('dual_coef'), arrays.get('n_support'))
+
+    def arrays(self):
+        arrays = {'weights': self.weights, 'intercepts': self.intercepts,
+                  'pair_i': self.pair_i, 'pair_j': self.pair_j, 'classes': self.classes_}
+        if self.support_vectors is not None:
+            arrays.update(support_vectors=self.support_vectors, dual_coef=self.dual_coef,
+                          n_support=self.n_support)
+        return arrays
+
+    def decision_function(self, X):
+        #one-vs-one decision values, same layout as SVC(decision_function_shape='ovo')
+        X = np.asarray(X, dtype=np.float64)
+        decisions = X @ self.weights
+        decisions += self.intercepts
+        if self.support_vectors is not None:
+            #2-d views, so the settled values land in `decisions`
+            self._settle_ties(np.atleast_2d(X), np.atleast_2d(decisions))
+        return decisions
+
+    def _pair_terms(self, n_support):
+        #per pair, the support vectors and coefficients in the order svm_predict_values() sums
+        #them: class i's vectors with sv_coef[j-1], then class j's with sv_coef[i]. Rows are
+        #padded with zero coefficients, which leave a running sum unchanged.
+        start = np.concatenate([[0], np.cumsum(n_support)[:-1]])
+        sv_index, coef = [], []
+        for i, j in zip(self.pair_i, self.pair_j):
+            own = np.arange(start[i], start[i] + n_support[i])
+            other = np.arange(start[j], start[j] + n_support[j])
+            sv_index.append(np.concatenate([own, other]))
+            coef.append(np.concatenate([self.dual_coef[j - 1, own], self.dual_coef[i, other]]))
+
+        width = max(len(index) for index in sv_index)
+        self._pair_sv = np.zeros((len(sv_index), width), dtype=np.intp)
+        self._pair_coef = np.zeros((len(sv_index), width))
+        for pair, (index, values) in enumerate(zip(sv_index, coef)):
+            self._pair_sv[pair, :len(index)] = index
+            self._pair_coef[pair, :len(values)] = values
+
+        #features x pairs: 1 where any of the pair's support vectors is non-zero
+        used = self.support_vectors != 0
+        self._pair_features = np.column_stack([used[index].any(axis=0) for index in sv_index]).astype(np.float64)
+
+    def _settle_ties(self, X, decisions, block=1024):
+        #recompute the near-zero pairs the way libsvm does, so their sign (and the vote) matches it
+        for start in range(0, len(X), block):
+            settled = decisions[start:start + block]
+            block_rows = X[start:start + block]
+            near = np.abs(settled) < self.TIE_EPS
+            if len(block_rows) < self.UNTOUCHED_MIN_ROWS:
+                rows, pairs = np.nonzero(near)
+                kernel_rows = np.arange(len(block_rows))
+            else:
+                kernel_rows, rows, pairs = self._touched(block_rows, near)
+            if not len(rows):
+                continue
+
+            #rows index kernel_rows, whose kernel against every support vector is all that is computed
+            kernel = block_rows[kernel_rows] @ self.support_vectors.T
+            terms = self._pair_coef[pairs] * kernel[rows[:, np.newaxis], self._pair_sv[pairs]]
+            #cumsum adds left to right, like libsvm's running sum
+            settled[kernel_rows[rows], pairs] = np.cumsum(terms, axis=1)[:, -1] + self.intercepts[pairs]
+
+    def _touched(self, X, near):
+        #a row that is zero on every feature of a pair's support vectors only adds zero products, in
+        #X @ weights as in libsvm's kernel sum, so its decision is already the intercept exactly. That
+        #is most near-zero pairs; this keeps the others as (rows needing the kernel, row, pair).
+        tied = np.flatnonzero(near.any(axis=0))
+        needed = near[:, tied] & ((X != 0) @ self._pair_features[:, tied] > 0)
+        kernel_rows = np.flatnonzero(needed.any(axis=1))
+        rows, columns = np.nonzero(needed[kernel_rows])
+        return kernel_rows, rows, tied[columns]
+
+    def votes(self, X):
+        decisions = self.decision_function(X)
+        if decisions.ndim == 1:
+            decisions = decisions[np.newaxis, :]
+
+        #a positive decision is a vote for the first class of the pair
+        positive = (decisions > 0).astype(np.float32)
+        return positive @ self._vote_delta + self._vote_base
+
+    def rank(self, X, k=5):
+        """Top-k classes per row with their one-vs-rest style scores.
+
+        Scores use the formula of SVC.decision_function with
+        decision_function_shape='ovr': the vote count plus a squashed sum of
+        pairwise confidences. Rows are ranked by votes with ties going to the lowest class index,
+        so the first column always equals predict(). Only k columns are sorted.
+        """
+        decisions = self.decision_function(X)
+        if decisions.ndim == 1:
+            decisions = decisions[np.newaxis, :]
+
+        positive = (decisions > 0).astype(np.float64)
+        votes = positive @ self._vote_delta + self._vote_base
+        confidences = decisions @ self._vote_delta
+        scores = votes + confidences / (3 * (np.abs(confidences) + 1))
+
+        n_classes = len(self.classes_)
+        k = min(k, n_classes)
+        order = votes * n_classes + np.arange(n_classes - 1, -1, -1)
+        top = np.argpartition(-order, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(top, np.argsort(-np.take_along_axis(order, top, axis=1), axis=1), axis=1)
+
+        return (self.classes_[top], np.take_along_axis(scores, top, axis=1),
+                np.take_along_axis(votes, top, axis=1))
+
+    def predict(self, X):
+        #libsvm breaks voting ties in favour of the lowest class index, as argmax does
+        return self.classes_[self.votes(X).argmax(axis=1)]
+
+
+class NativeLogistic:
+    """Plain NumPy replacement for a fitted binary sklearn LogisticRegression"""
+
+    kind = 'logistic'
+
+    def __init__(self, coef, intercept, classes):
+        self.coef = coef
+        self.intercept = intercept
+        self.classes_ = classes
+        self.n_features_in_ = coef.shape[0]
+
+    @classmethod
+    def from_logistic(cls, model):
+        if len(model.classes_) != 2:
+            raise ValueError("Only binary LogisticRegression models can be exported")
+        return cls(
+            coef=np.ascontiguousarray(model.coef_.ravel(), dtype=np.float64),
+            intercept=np.asarray(model.intercept_, dtype=np.float64),
+            classes=np.asarray(model.classes_)
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['coef'], arrays['intercept'], arrays['classes'])
+
+    def arrays(self):
+        return {'coef': self.coef, 'intercept': self.intercept, 'classes': self.classes_}
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept[0]
+
+    def predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(np.intp)]
+
+
+def to_native(model):
+    """NumPy-native copy of a fitted sklearn model, if it has one"""
+    kind = type(model).__name__
+    if kind == 'SVC':
+        return NativeSVC.from_svc(model)
+    if kind == 'LogisticRegression':
+        return NativeLogistic.from_logistic(model)
+    raise ValueError(f"No native implementation for {kind}")
+
+
+def check_parity(native, model, X):
+    """Return the row indices where native and sklearn predictions differ"""
+    return np.flatnonzero(native.predict(X) != model.predict(X))
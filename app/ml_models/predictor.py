@@ -1,37 +1,227 @@
+import threading
+
 import numpy as np
-import ast
 
-from .loader import description,precaution,medication,diet,workout,svc
+from .loader import registry,model_version,MODEL_DEPENDENTS
+from .knowledge import lookup
+from .scheduler import MicroBatcher
+from .cache import PredictionCache, symptom_key
+from .bitset import ExactMatchTable, encode_indices, encode_matrix, words_to_int
+from .resolver import SymptomResolver, SYMPTOM_ALIASES, normalize_symptom
 
-#helper function for disease prediction
-def helper(dis):
-    descr =  description[description['Disease']==dis]['Description']
-    descr = " ".join([w for w in descr])
-    
-    prec=precaution[precaution['Disease']==dis][['Precaution_1','Precaution_2','Precaution_3','Precaution_4']]
-    prec=[col for col in prec.values]
-    
-    med_string =medication[medication['Disease']==dis]['Medication'].values[0]
-    med =ast.literal_eval(med_string)
+#optional micro-batching of the model pass behind concurrent get_prediction calls, see enable_batching()
+batcher = None
 
-    die_string=diet[diet['Disease']==dis]['Diet'].values[0]
-    die=ast.literal_eval(die_string)
+#LRU cache of full prediction bundles keyed on the symptom set
+prediction_cache = PredictionCache(maxsize=1024)
 
-    work=workout[workout['disease']==dis]['workout']
+#number of candidate diseases returned with every diagnosis
+DIFFERENTIAL_SIZE = 5
 
-    return descr,prec,med,die,work
+#helper function for disease prediction
+def helper(dis):
+    info = lookup(registry.get('knowledge_index'), dis)
+    return info.description,(info.precautions,),info.medications,info.diet,info.workout
   
    
 #from our first data set i.e. training dataset
 symptoms_dict = {'itching': 0, 'skin_rash': 1, 'nodal_skin_eruptions': 2, 'continuous_sneezing': 3, 'shivering': 4, 'chills': 5, 'joint_pain': 6, 'stomach_pain': 7, 'acidity': 8, 'ulcers_on_tongue': 9, 'muscle_wasting': 10, 'vomiting': 11, 'burning_micturition': 12, 'spotting_urination': 13, 'fatigue': 14, 'weight_gain': 15, 'anxiety': 16, 'cold_hands_and_feets': 17, 'mood_swings': 18, 'weight_loss': 19, 'restlessness': 20, 'lethargy': 21, 'patches_in_throat': 22, 'irregular_sugar_level': 23, 'cough': 24, 'high_fever': 25, 'sunken_eyes': 26, 'breathlessness': 27, 'sweating': 28, 'dehydration': 29, 'indigestion': 30, 'headache': 31, 'yellowish_skin': 32, 'dark_urine': 33, 'nausea': 34, 'loss_of_appetite': 35, 'pain_behind_the_eyes': 36, 'back_pain': 37, 'constipation': 38, 'abdominal_pain': 39, 'diarrhoea': 40, 'mild_fever': 41, 'yellow_urine': 42, 'yellowing_of_eyes': 43, 'acute_liver_failure': 44, 'fluid_overload': 45, 'swelling_of_stomach': 46, 'swelled_lymph_nodes': 47, 'malaise': 48, 'blurred_and_distorted_vision': 49, 'phlegm': 50, 'throat_irritation': 51, 'redness_of_eyes': 52, 'sinus_pressure': 53, 'runny_nose': 54, 'congestion': 55, 'chest_pain': 56, 'weakness_in_limbs': 57, 'fast_heart_rate': 58, 'pain_during_bowel_movements': 59, 'pain_in_anal_region': 60, 'bloody_stool': 61, 'irritation_in_anus': 62, 'neck_pain': 63, 'dizziness': 64, 'cramps': 65, 'bruising': 66, 'obesity': 67, 'swollen_legs': 68, 'swollen_blood_vessels': 69, 'puffy_face_and_eyes': 70, 'enlarged_thyroid': 71, 'brittle_nails': 72, 'swollen_extremeties': 73, 'excessive_hunger': 74, 'extra_marital_contacts': 75, 'drying_and_tingling_lips': 76, 'slurred_speech': 77, 'knee_pain': 78, 'hip_joint_pain': 79, 'muscle_weakness': 80, 'stiff_neck': 81, 'swelling_joints': 82, 'movement_stiffness': 83, 'spinning_movements': 84, 'loss_of_balance': 85, 'unsteadiness': 86, 'weakness_of_one_body_side': 87, 'loss_of_smell': 88, 'bladder_discomfort': 89, 'foul_smell_of urine': 90, 'continuous_feel_of_urine': 91, 'passage_of_gases': 92, 'internal_itching': 93, 'toxic_look_(typhos)': 94, 'depression': 95, 'irritability': 96, 'muscle_pain': 97, 'altered_sensorium': 98, 'red_spots_over_body': 99, 'belly_pain': 100, 'abnormal_menstruation': 101, 'dischromic _patches': 102, 'watering_from_eyes': 103, 'increased_appetite': 104, 'polyuria': 105, 'family_history': 106, 'mucoid_sputum': 107, 'rusty_sputum': 108, 'lack_of_concentration': 109, 'visual_disturbances': 110, 'receiving_blood_transfusion': 111, 'receiving_unsterile_injections': 112, 'coma': 113, 'stomach_bleeding': 114, 'distention_of_abdomen': 115, 'history_of_alcohol_consumption': 116, 'fluid_overload.1': 117, 'blood_in_sputum': 118, 'prominent_veins_on_calf': 119, 'palpitations': 120, 'painful_walking': 121, 'pus_filled_pimples': 122, 'blackheads': 123, 'scurring': 124, 'skin_peeling': 125, 'silver_like_dusting': 126, 'small_dents_in_nails': 127, 'inflammatory_nails': 128, 'blister': 129, 'red_sore_around_nose': 130, 'yellow_crust_ooze': 131}
 diseases_list = {15: 'Fungal infection', 4: 'Allergy', 16: 'GERD', 9: 'Chronic cholestasis', 14: 'Drug Reaction', 33: 'Peptic ulcer diseae', 1: 'AIDS', 12: 'Diabetes ', 17: 'Gastroenteritis', 6: 'Bronchial Asthma', 23: 'Hypertension ', 30: 'Migraine', 7: 'Cervical spondylosis', 32: 'Paralysis (brain hemorrhage)', 28: 'Jaundice', 29: 'Malaria', 8: 'Chicken pox', 11: 'Dengue', 37: 'Typhoid', 40: 'hepatitis A', 19: 'Hepatitis B', 20: 'Hepatitis C', 21: 'Hepatitis D', 22: 'Hepatitis E', 3: 'Alcoholic hepatitis', 36: 'Tuberculosis', 10: 'Common Cold', 34: 'Pneumonia', 13: 'Dimorphic hemmorhoids(piles)', 18: 'Heart attack', 39: 'Varicose veins', 26: 'Hypothyroidism', 24: 'Hyperthyroidism', 25: 'Hypoglycemia', 31: 'Osteoarthristis', 5: 'Arthritis', 0: '(vertigo) Paroymsal  Positional Vertigo', 2: 'Acne', 38: 'Urinary tract infection', 35: 'Psoriasis', 27: 'Impetigo'}
+disease_labels = {name: label for label, name in diseases_list.items()}
+
+
+#Indexes derived from the datasets are registered like the models, so they are
+#built on first use (or by preload) rather than when this module is imported.
+
+#free-text symptoms are matched against these keys (and aliases) by trigram similarity
+registry.register('symptom_resolver', lambda: SymptomResolver(symptoms_dict, SYMPTOM_ALIASES))
+
+
+#0/1 rows for symtoms_df.csv, whose symptom names carry stray spaces
+def _symptom_rows(frame):
+    lookup_key = registry.get('symptom_resolver').lookup
+    columns = [col for col in frame.columns if col.startswith('Symptom_')]
+    rows = np.zeros((len(frame), len(symptoms_dict)))
+    for r, values in enumerate(frame[columns].itertuples(index=False)):
+        for value in values:
+            key = lookup_key.get(normalize_symptom(value)) if isinstance(value, str) else None
+            if key is not None:
+                rows[r, symptoms_dict[key]] = 1
+    return rows
+
+
+#prefix trie for the symptom box, re-ranked by co-occurrence in both symptom datasets
+def _symptom_autocomplete():
+    from .autocomplete import SymptomAutocomplete, build_cooccurrence
+
+    training = registry.get('training')
+    return SymptomAutocomplete(symptoms_dict, build_cooccurrence(
+        [training.drop(columns=['prognosis']).values, _symptom_rows(registry.get('symptoms'))],
+        len(symptoms_dict)
+    ))
+
+
+registry.register('symptom_autocomplete', _symptom_autocomplete)
+
+
+def _known_rows():
+    return np.unique(registry.get('training').drop(columns=['prognosis']).values, axis=0)
+
+
+#the model's answers for the symptom combinations of Training.csv, looked up instead of recomputed
+def _exact_matches(svc_native):
+    known_rows = _known_rows()
+    return ExactMatchTable.from_training(known_rows, svc_native.predict(known_rows))
+
+
+registry.register('exact_matches', lambda: _exact_matches(registry.get('svc_native')))
+
+
+#Ranked differential diagnosis: top-k diseases per symptom list from one model call
+def _ranked(matrix, k, svc_native=None):
+    labels, scores, votes = (svc_native or registry.get('svc_native')).rank(matrix, k)
+    return [
+        [{'disease': diseases_list[label], 'score': round(float(score), 4), 'votes': int(vote)}
+         for label, score, vote in zip(row_labels, row_scores, row_votes)]
+        for row_labels, row_scores, row_votes in zip(labels, scores, votes)
+    ]
+
+
+def differential(symptom_lists, k=DIFFERENTIAL_SIZE):
+    if not symptom_lists:
+        return []
+    return _ranked(build_symptom_matrix(symptom_lists), k)
+
+
+#differentials for the training combinations are ranked once, in one batch
+def _known_differentials(svc_native):
+    known_rows = _known_rows()
+    return dict(zip(
+        [words_to_int(words) for words in encode_matrix(known_rows)],
+        _ranked(known_rows, DIFFERENTIAL_SIZE, svc_native)
+    ))
 
 
+registry.register('known_differentials', lambda: _known_differentials(registry.get('svc_native')))
+
+#what a worker needs to answer /medical_test requests without a cold start
+SERVING_SET = ['svc_native', 'knowledge_index', 'exact_matches', 'known_differentials',
+               'symptom_resolver', 'symptom_autocomplete']
+
+#entries computed from the svc model; loader.load_release builds a new release's before it goes live
+MODEL_DEPENDENTS.update(exact_matches=_exact_matches, known_differentials=_known_differentials)
+
+#held by the request that moves the cache on to a new model version
+_release_lock = threading.Lock()
+
+
+def _refresh_dependents():
+    for name in MODEL_DEPENDENTS:
+        if registry.is_loaded(name):
+            registry.refresh(name)
+
+
+def _serving_version():
+    """The model version being served, once the cache and the svc model's dependents belong to it"""
+    version = model_version()
+    if version != prediction_cache.version:
+        with _release_lock:
+            if version != prediction_cache.version:
+                #a local release arrives together with its dependents; one swapped in the inference
+                #server is only noticed here, so its dependents are rebuilt before the cache moves on
+                if prediction_cache.version is not None and hasattr(registry.get('svc_native'), 'model_version'):
+                    _refresh_dependents()
+                prediction_cache.validate(version)
+    return version
+
 #Disease prediction Function
 def get_prediction(patient_symptoms):
+    return diagnose(patient_symptoms)[0]
+
+
+#Prediction, helper() bundle and differential, served from the cache for known symptom sets
+def diagnose(patient_symptoms):
+    key = symptom_key(patient_symptoms)
+    #read before the models, so a bundle that straddles a release swap is tagged with the old version
+    version = _serving_version()
+
+    bundle = prediction_cache.get(key)
+    if bundle is None:
+        disease, ranked = _predict_differential(key)
+        bundle = (disease,) + helper(disease) + (ranked,)
+        prediction_cache.put(key, bundle, version)
+    return bundle
+
+
+def _predict_differential(patient_symptoms):
+    indices = [symptoms_dict[item] for item in patient_symptoms]
+    mask = encode_indices(indices)
+
+    label = registry.get('exact_matches').get(mask)
+    if label is not None:
+        return diseases_list[label], registry.get('known_differentials').get(mask, [])
+
+    #the top-ranked candidate is the prediction, so one model pass gives both
     input_vector = np.zeros(len(symptoms_dict))
+    input_vector[indices]=1
+    if batcher is not None:
+        ranked = batcher.predict(input_vector)
+    else:
+        ranked = _ranked(input_vector[np.newaxis], DIFFERENTIAL_SIZE)[0]
+    return ranked[0]['disease'], ranked
+
+
+def enable_batching(window=0.003, max_batch=64):
+    #unseen combinations from concurrent get_prediction calls share one rank call per batch
+    global batcher
+    if batcher is None:
+        batcher = MicroBatcher(lambda X: _ranked(X, DIFFERENTIAL_SIZE), window=window, max_batch=max_batch)
+    return batcher
+
+
+#one 0/1 row per symptom list, filled with a single fancy-indexed assignment
+def build_symptom_matrix(symptom_lists):
+    rows = [i for i, symptoms in enumerate(symptom_lists) for _ in symptoms]
+    cols = [symptoms_dict[item] for symptoms in symptom_lists for item in symptoms]
+
+    matrix = np.zeros((len(symptom_lists), len(symptoms_dict)))
+    matrix[rows, cols] = 1
+    return matrix
+
+
+#Batch disease prediction: one predict call for every symptom list
+def predict_batch(symptom_lists):
+    if not symptom_lists:
+        return []
+
+    matrix = build_symptom_matrix(symptom_lists)
+    exact_matches = registry.get('exact_matches')
+    predictions = [exact_matches.get(words_to_int(words)) for words in encode_matrix(matrix)]
+
+    #only combinations missing from the training table go to the model
+    unseen = [i for i, label in enumerate(predictions) if label is None]
+    if unseen:
+        for i, label in zip(unseen, registry.get('svc_native').predict(matrix[unseen])):
+            predictions[i] = label
+
+    knowledge_index = registry.get('knowledge_index')
+    results = []
+    for label in predictions:
+        disease = diseases_list[label]
+        info = lookup(knowledge_index, disease)
+        results.append({
+            'disease': disease,
+            'description': info.description,
+            'precautions': list(info.precautions),
+            'medications': list(info.medications),
+            'diet': list(info.diet),
+            'workout': list(info.workout)
+        })
+    return results
+
 
-    for item in patient_symptoms:
-        input_vector[symptoms_dict[item]]=1
-        #to return actual disease instead of integer
-    return diseases_list[svc.predict([input_vector])[0]] 
\ No newline at end of file
+def __getattr__(name):
+    #module-level access to the lazily built indexes, e.g. predictor.symptom_resolver
+    if name in registry:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
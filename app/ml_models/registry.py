@@ -0,0 +1,128 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Lazy, thread-safe registry of models, datasets and derived indexes.
+
+    Each entry is registered with a zero-argument loader and built the first
+    time it is asked for. Concurrent first requests for the same entry wait
+    for a single load. Load times are kept for every entry so slow artifacts
+    are easy to spot.
+
+    The loaded values live in one dict that is replaced, never changed in
+    place, so put_many can swap several entries as a single snapshot.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._locks = {}
+        self._timings = {}
+        self._lock = threading.Lock()
+        self._preloads = []
+        self._wrappers = {}
+
+    def register(self, name, loader):
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+
+    def __contains__(self, name):
+        return name in self._loaders
+
+    def names(self):
+        return list(self._loaders)
+
+    def get(self, name):
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model or dataset: {name}")
+
+        with self._locks[name]:
+            if name not in self._values:
+                start = time.perf_counter()
+                value = self._loaders[name]()
+                self._timings[name] = time.perf_counter() - start
+                self._store({name: self._wrap(name, value)})
+        return self._values[name]
+
+    def _store(self, values):
+        #copy on write: a reader holding the old dict never sees half of an update
+        with self._lock:
+            self._values = {**self._values, **values}
+
+    def put(self, name, value):
+        #replace an entry, e.g. with a freshly loaded model
+        self.put_many({name: value})
+
+    def put_many(self, values):
+        """Replace several entries at once; no get() sees some of them new and others old"""
+        self._store({name: self._wrap(name, value) for name, value in values.items()})
+
+    def wrap(self, names, wrapper):
+        """Pass the given entries through wrapper(name, value) now and whenever they are replaced"""
+        for name in names:
+            with self._locks.setdefault(name, threading.Lock()):
+                self._wrappers[name] = wrapper
+                if name in self._values:
+                    self._store({name: wrapper(name, self._values[name])})
+
+    def _wrap(self, name, value):
+        wrapper = self._wrappers.get(name)
+        return value if wrapper is None else wrapper(name, value)
+
+    def refresh(self, name):
+        #rebuild an entry while the old value keeps serving, then swap it in
+        start = time.perf_counter()
+        value = self._loaders[name]()
+        self._timings[name] = time.perf_counter() - start
+        self.put(name, value)
+        return value
+
+    def is_loaded(self, name):
+        return name in self._values
+
+    def unload(self, name):
+        with self._lock:
+            self._values = {key: value for key, value in self._values.items() if key != name}
+
+    def preload(self, names=None, background=True):
+        """Load the given entries (all of them by default) ahead of first use"""
+        names = self.names() if names is None else list(names)
+
+        if not background:
+            for name in names:
+                self.get(name)
+            return None
+
+        def load_all():
+            #a failed entry is left unloaded, to be retried on first use
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as err:
+                    logger.warning(f"Preloading {name} failed: {err}")
+
+        thread = threading.Thread(target=load_all, name='model-preload', daemon=True)
+        thread.start()
+        self._preloads.append(thread)
+        return thread
+
+    def wait(self, timeout=None):
+        #block until background preloads finish, e.g. before a pre-fork server forks
+        for thread in self._preloads:
+            thread.join(timeout)
+        self._preloads = [thread for thread in self._preloads if thread.is_alive()]
+        return not self._preloads
+
+    def timings(self):
+        #seconds spent in each loader; dependencies are included in their dependants' time
+        return dict(self._timings)
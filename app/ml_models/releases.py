@@ -0,0 +1,229 @@
+"""Versioned model releases and hot reload.
+
+A release is a directory under models/releases/<version>/ holding the four
+serving models (and their mmap artifacts). models/manifest.json names the
+active release:
+
+    {"active": "20261018-1",
+     "releases": {"20261018-1": {"path": "releases/20261018-1",
+                                 "created": "...", "models": {"svc": "<sha256>", ...}}}}
+
+Without a manifest the models are read from models/ itself, as before.
+A ModelWatcher polls the manifest; when the active release changes it
+loads and warms the new models in the background and only then swaps them
+into the registry, so requests in flight keep the models they started with.
+
+Publish and switch releases with:
+    python -m app.ml_models.releases publish <dir with the .pkl/.sav files> [version]
+    python -m app.ml_models.releases activate <version>
+    python -m app.ml_models.releases list
+"""
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import NamedTuple
+
+import numpy as np
+
+from .artifacts import MODEL_FILES, file_digest
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+RELEASES_DIR = 'releases'
+
+
+class Release(NamedTuple):
+    version: str
+    directory: str
+
+
+def manifest_path(models_dir):
+    return os.path.join(models_dir, MANIFEST_FILE)
+
+
+def read_manifest(models_dir):
+    try:
+        with open(manifest_path(models_dir)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(models_dir, manifest):
+    #written to a temp file and renamed, so pollers never read half a manifest
+    tmp = manifest_path(models_dir) + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, manifest_path(models_dir))
+
+
+def active_release(models_dir):
+    """The release named by the manifest, or models/ itself when there is none"""
+    manifest = read_manifest(models_dir)
+    if manifest:
+        version = manifest['active']
+        return Release(version, os.path.join(models_dir, manifest['releases'][version]['path']))
+
+    #unversioned models/ directory: name it after the svc file it serves
+    svc_path = os.path.join(models_dir, MODEL_FILES['svc'])
+    digest = file_digest(svc_path)[:12] if os.path.exists(svc_path) else 'none'
+    return Release(f"base-{digest}", models_dir)
+
+
+def publish(models_dir, source_dir, version=None, activate=True):
+    """Copy a set of model files into a new release and (by default) activate it.
+
+    Files missing from source_dir are carried over from the active release,
+    so a release can replace a single model.
+    """
+    from .artifacts import main as export_artifacts
+
+    version = version or datetime.utcnow().strftime('%Y%m%d-%H%M%S')
+    manifest = read_manifest(models_dir) or {'active': None, 'releases': {}}
+    if version in manifest['releases']:
+        raise ValueError(f"Release {version} already exists")
+
+    current = active_release(models_dir).directory
+    target = os.path.join(models_dir, RELEASES_DIR, version)
+    os.makedirs(target)
+    for filename in MODEL_FILES.values():
+        source = os.path.join(source_dir, filename)
+        shutil.copy2(source if os.path.exists(source) else os.path.join(current, filename), target)
+
+    #parity-checked mmap artifacts; a model failing the check is served from its pickle
+    export_artifacts([target])
+
+    manifest['releases'][version] = {
+        'path': os.path.join(RELEASES_DIR, version),
+        'created': datetime.utcnow().isoformat(),
+        'models': {name: file_digest(os.path.join(target, filename)) for name, filename in MODEL_FILES.items()}
+    }
+    if activate or manifest['active'] is None:
+        manifest['active'] = version
+    write_manifest(models_dir, manifest)
+    return Release(version, target)
+
+
+def activate(models_dir, version):
+    manifest = read_manifest(models_dir)
+    if not manifest or version not in manifest['releases']:
+        raise ValueError(f"Unknown release {version}")
+    manifest['active'] = version
+    write_manifest(models_dir, manifest)
+
+
+def warm(model):
+    #one prediction touches the weights (and faults in mmap pages) before any request does
+    model.predict(np.zeros((1, model.n_features_in_)))
+    return model
+
+
+class ModelWatcher:
+    """Polls the manifest and hot-swaps the registry's models on a new release.
+
+    `load_release(release)` returns {registry name: value} for the models
+    of a release that this process uses, and anything derived from them;
+    the rest load lazily from the new release when first asked for. All of
+    it goes live together with the release itself, in one registry swap.
+    """
+
+    def __init__(self, registry, models_dir, load_release, interval=30.0):
+        self.registry = registry
+        self.models_dir = models_dir
+        self.load_release = load_release
+        self.interval = interval
+        self.reloads = 0
+        self.failures = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._manifest_mtime = self._mtime()
+        self._lock = threading.Lock()
+
+    def _mtime(self):
+        try:
+            return os.stat(manifest_path(self.models_dir)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+        #threads do not survive fork; gunicorn workers forked from a preloaded master get their own
+        os.register_at_fork(after_in_child=self._restart_in_child)
+        return self
+
+    def _restart_in_child(self):
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            mtime = self._mtime()
+            if mtime == self._manifest_mtime:
+                continue
+            self._manifest_mtime = mtime
+            try:
+                self.check()
+            except Exception as err:
+                self.failures += 1
+                logger.error(f"Model reload failed, keeping the current models: {err}")
+
+    def check(self):
+        """Swap in the active release if it differs from the loaded one"""
+        with self._lock:
+            release = active_release(self.models_dir)
+            if self.registry.is_loaded('model_release') and \
+                    self.registry.get('model_release').version == release.version:
+                return False
+
+            start = time.perf_counter()
+            models = {name: warm(model) if hasattr(model, 'predict') else model
+                      for name, model in self.load_release(release).items()}
+
+            #one snapshot: no request sees the new release with an old model or an old index
+            self.registry.put_many(dict(models, model_release=release))
+
+            self.reloads += 1
+            logger.info(f"Model release {release.version} active after {time.perf_counter() - start:.2f}s")
+            return True
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    from .loader import models_dir
+
+    command = argv[0] if argv else 'list'
+    if command == 'publish' and len(argv) >= 2:
+        release = publish(models_dir, argv[1], argv[2] if len(argv) > 2 else None)
+        print(f"published and activated {release.version} in {release.directory}")
+    elif command == 'activate' and len(argv) == 2:
+        activate(models_dir, argv[1])
+        print(f"activated {argv[1]}")
+    elif command == 'list':
+        manifest = read_manifest(models_dir)
+        if not manifest:
+            print(f"no manifest, serving {active_release(models_dir).version} from {models_dir}")
+            return 0
+        for version, info in sorted(manifest['releases'].items()):
+            marker = '*' if version == manifest['active'] else ' '
+            print(f"{marker} {version}  {info['created']}  {info['path']}")
+    else:
+        print(__doc__)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
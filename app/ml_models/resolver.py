@@ -0,0 +1,113 @@
+"""Fuzzy resolution of free-text symptoms onto symptoms_dict keys.
+
+Every known symptom (plus a table of aliases) is normalised and indexed by
+character trigrams once at startup. A token is resolved by exact lookup of
+its normalised form first, then by Dice similarity over shared trigrams.
+"""
+import re
+from collections import Counter
+from typing import NamedTuple, Optional, Tuple
+
+
+# Spellings users (and our own forms) send that do not match the dataset
+# keys, several of which are malformed in the training data itself.
+SYMPTOM_ALIASES = {
+    'foul_smell_of_urine': 'foul_smell_of urine',
+    'dischromic_patches': 'dischromic _patches',
+    'discoloured_patches': 'dischromic _patches',
+    'toxic_look': 'toxic_look_(typhos)',
+    'typhos': 'toxic_look_(typhos)',
+    'continous_sneezing': 'continuous_sneezing',
+    'sneezing': 'continuous_sneezing',
+    'cold_hands_and_feet': 'cold_hands_and_feets',
+    'swollen_extremities': 'swollen_extremeties',
+    'scarring': 'scurring',
+    'diarrhea': 'diarrhoea',
+    'fever': 'high_fever',
+    'rash': 'skin_rash',
+    'itchy_skin': 'itching',
+    'shortness_of_breath': 'breathlessness',
+    'tiredness': 'fatigue',
+    'stomach_ache': 'stomach_pain',
+    'heartburn': 'acidity',
+}
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_symptom(text):
+    return _NON_ALNUM.sub('_', str(text).lower()).strip('_')
+
+
+def trigrams(text):
+    padded = f"$${text}$"
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+class Resolution(NamedTuple):
+    text: str
+    symptom: Optional[str]
+    score: float
+    suggestions: Tuple[str, ...]
+
+    @property
+    def corrected(self):
+        return self.symptom is not None and self.symptom != self.text
+
+
+class SymptomResolver:
+    """Map messy symptom text onto the canonical symptoms_dict keys"""
+
+    def __init__(self, symptoms, aliases=None, threshold=0.6, max_suggestions=3):
+        self.threshold = threshold
+        self.max_suggestions = max_suggestions
+
+        #normalised spelling -> canonical key
+        self.lookup = {normalize_symptom(key): key for key in symptoms}
+        for alias, key in (aliases or {}).items():
+            if key in symptoms:
+                self.lookup.setdefault(normalize_symptom(alias), key)
+
+        self.names = list(self.lookup)
+        self._gram_counts = []
+        self._postings = {}
+        for name_id, name in enumerate(self.names):
+            grams = set(trigrams(name))
+            self._gram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(name_id)
+
+    def candidates(self, text):
+        """(canonical key, Dice score) pairs, best first, one per key"""
+        query = set(trigrams(text))
+        if not query:
+            return []
+
+        shared = Counter()
+        for gram in query:
+            shared.update(self._postings.get(gram, ()))
+
+        best = {}
+        for name_id, common in shared.items():
+            score = 2.0 * common / (len(query) + self._gram_counts[name_id])
+            key = self.lookup[self.names[name_id]]
+            if score > best.get(key, 0.0):
+                best[key] = score
+        return sorted(best.items(), key=lambda item: (-item[1], item[0]))
+
+    def resolve(self, text):
+        normalized = normalize_symptom(text)
+        key = self.lookup.get(normalized)
+        if key is not None:
+            return Resolution(text, key, 1.0, ())
+
+        ranked = self.candidates(normalized)
+        suggestions = tuple(key for key, _ in ranked[:self.max_suggestions])
+        if ranked and ranked[0][1] >= self.threshold:
+            #a close second means the match is ambiguous, so ask instead of guessing
+            if len(ranked) < 2 or ranked[0][1] - ranked[1][1] > 0.05:
+                return Resolution(text, ranked[0][0], ranked[0][1], suggestions)
+        return Resolution(text, None, ranked[0][1] if ranked else 0.0, suggestions)
+
+    def resolve_all(self, texts):
+        return [self.resolve(text) for text in texts]
@@ -0,0 +1,105 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Collect single-row predictions from concurrent callers into one batch.
+
+    Requests arriving within `window` seconds of the first queued request
+    (or until `max_batch` rows are waiting) are stacked into one matrix and
+    scored with a single call to `predict_fn`. Each caller gets its own row
+    of the result back through a Future.
+
+    The worker thread does not survive a fork (gunicorn's preload_app), so a
+    forked child gets a fresh queue and thread of its own.
+    """
+
+    def __init__(self, predict_fn, window=0.003, max_batch=64):
+        self.predict_fn = predict_fn
+        self.window = window
+        self.max_batch = max_batch
+
+        self._start()
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        #rows queued in the parent have no thread to answer them in the child; it starts empty
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._rows = 0
+        self._errors = 0
+        self._largest_batch = 0
+        self._batch_sizes = {}
+
+        self._thread = threading.Thread(target=self._run, name='predict-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        future = Future()
+        self._queue.put((np.asarray(row), future))
+        return future
+
+    def predict(self, row, timeout=None):
+        #blocking single-row prediction, batched with whoever else is waiting
+        return self.submit(row).result(timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        #whatever is already queued joins without waiting (all of it when window=0)
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            rows = [row for row, _ in batch]
+            futures = [future for _, future in batch]
+
+            try:
+                predictions = self.predict_fn(np.vstack(rows))
+            except Exception as err:
+                with self._lock:
+                    self._errors += 1
+                for future in futures:
+                    future.set_exception(err)
+                continue
+
+            for future, prediction in zip(futures, predictions):
+                future.set_result(prediction)
+
+            with self._lock:
+                self._batches += 1
+                self._rows += len(batch)
+                self._largest_batch = max(self._largest_batch, len(batch))
+                self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue_depth': self._queue.qsize(),
+                'batches': self._batches,
+                'rows': self._rows,
+                'errors': self._errors,
+                'mean_batch_size': self._rows / self._batches if self._batches else 0.0,
+                'largest_batch': self._largest_batch,
+                'batch_sizes': dict(sorted(self._batch_sizes.items()))
+            }
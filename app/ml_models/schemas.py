@@ -0,0 +1,280 @@
+"""Declarative input schemas for the diabetes, heart and kidney models.
+
+Each schema lists the model's features in order with their form field,
+encoder, default and allowed range. One vectorized builder turns a web
+form, JSON records or CSV rows into the model's feature matrix, with a
+list of problems for every row that cannot be scored.
+"""
+import functools
+import itertools
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class SchemaError(ValueError):
+    """Raised when a single input (form or JSON object) has invalid features"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__('; '.join(self.errors))
+
+
+class Feature(NamedTuple):
+    name: str                      #dataset column header
+    field: str                     #form / JSON key
+    kind: str = 'float'            #key into ENCODERS
+    default: Optional[float] = None   #used when the value is missing; None = required
+    low: float = -np.inf
+    high: float = np.inf
+    aliases: Tuple[str, ...] = ()
+    words: Optional[Dict[str, int]] = None   #this column's own words, on top of its kind's
+
+
+#words accepted by the categorical encoders, compared lower-cased. Words that
+#name one state of one measurement ('normal', 'poor') only mean 1 for that
+#column, so they are given per feature rather than shared by every binary one.
+BINARY_WORDS = {'yes': 1, 'y': 1, 'true': 1, 'no': 0, 'n': 0, 'false': 0}
+SEX_WORDS = {'male': 1, 'm': 1, 'female': 0, 'f': 0}
+NORMAL_WORDS = {'normal': 1, 'abnormal': 0}
+PRESENT_WORDS = {'present': 1, 'notpresent': 0, 'not present': 0}
+
+
+@functools.lru_cache(maxsize=4096)
+def column_key(name):
+    #'Age (yrs)', 'age_yrs' and '﻿age' all compare equal to their plain form
+    return re.sub(r'[^a-z0-9]+', '_', str(name).replace('﻿', '').lower()).strip('_')
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def encode_float(values):
+    #numpy parses a clean column in one C call; only dirty ones go value by value
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        import pandas as pd
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(np.float64)
+
+
+def _word_encoder(words):
+    def encode(values):
+        encoded = encode_float(values)
+        unparsed = np.isnan(encoded)
+        if unparsed.any():
+            for i in np.flatnonzero(unparsed):
+                value = values[i]
+                if isinstance(value, str):
+                    encoded[i] = words.get(value.strip().lower(), np.nan)
+        return encoded
+    return encode
+
+
+ENCODERS = {
+    'float': encode_float,
+    'binary': _word_encoder(BINARY_WORDS),
+    'sex': _word_encoder(SEX_WORDS),
+}
+
+#the words of each kind, for features that add their own
+_KIND_WORDS = {'binary': BINARY_WORDS, 'sex': SEX_WORDS}
+
+#encoders whose values are 0/1 codes
+CATEGORICAL = ('binary', 'sex')
+
+_EXPECTED = {
+    'float': 'a number',
+    'binary': 'yes/no or 1/0',
+    'sex': 'male/female or 1/0',
+}
+
+
+def _expected(feature):
+    if feature.words:
+        return '/'.join(feature.words) + ', ' + _EXPECTED[feature.kind]
+    return _EXPECTED[feature.kind]
+
+
+class FeatureMatrix(NamedTuple):
+    X: np.ndarray
+    errors: list    #per row: list of problems, empty when the row can be scored
+
+    @property
+    def valid(self):
+        return np.array([not problems for problems in self.errors], dtype=bool)
+
+
+class FeatureSchema:
+
+    def __init__(self, test, model, dataset, features, diagnoses):
+        self.test = test
+        self.model = model
+        self.dataset = dataset
+        self.features = tuple(features)
+        self.diagnoses = diagnoses
+        self.names = [feature.name for feature in self.features]
+        self.index = {}
+        for i, feature in enumerate(self.features):
+            for key in (feature.name, feature.field) + feature.aliases:
+                self.index.setdefault(column_key(key), i)
+        #features sharing an encoder are encoded together; one with its own words gets its own
+        self._groups = {}
+        for i, feature in enumerate(self.features):
+            key = (feature.kind, tuple(sorted(feature.words.items())) if feature.words else ())
+            self._groups.setdefault(key, []).append(i)
+        self._encoders = {key: _word_encoder({**_KIND_WORDS[key[0]], **dict(key[1])}) if key[1] else ENCODERS[key[0]]
+                          for key in self._groups}
+        self._low = np.array([0 if feature.kind in CATEGORICAL else feature.low for feature in self.features], dtype=float)
+        self._high = np.array([1 if feature.kind in CATEGORICAL else feature.high for feature in self.features], dtype=float)
+
+    def __len__(self):
+        return len(self.features)
+
+    def diagnosis(self, label):
+        return self.diagnoses[int(label)]
+
+    def encode(self, columns, n_rows):
+        """Feature matrix from one sequence of raw values per feature (None = column absent)"""
+        X = np.full((n_rows, len(self.features)), np.nan)
+
+        #one encoder call per kind of feature, over all of its columns at once
+        for key, group in self._groups.items():
+            present = [f for f in group if columns[f] is not None]
+            if present and n_rows:
+                values = [value for f in present for value in columns[f]]
+                X[:, present] = self._encoders[key](values).reshape(len(present), n_rows).T
+        for f, feature in enumerate(self.features):
+            if columns[f] is None and feature.default is not None:
+                X[:, f] = feature.default
+
+        #only the cells that failed to encode or fall out of range need a closer look
+        unparsed = np.isnan(X)
+        errors = [[] for _ in range(n_rows)]
+        for r, f in zip(*np.nonzero(unparsed | (X < self._low) | (X > self._high))):
+            feature = self.features[f]
+            value = columns[f][r] if columns[f] is not None else None
+            if not unparsed[r, f]:
+                errors[r].append(f"{feature.field} must be between {self._low[f]:g} and {self._high[f]:g}")
+            elif not _is_blank(value):
+                errors[r].append(f"{feature.field} must be {_expected(feature)}, got {value!r}")
+            elif feature.default is not None:
+                X[r, f] = feature.default
+            else:
+                errors[r].append(f"{feature.field} is required")
+
+        return FeatureMatrix(X, errors)
+
+    def from_records(self, records):
+        """Form data or JSON objects, keyed by form field, dataset header or alias"""
+        rows = []
+        for record in records:
+            row = [None] * len(self.features)
+            for key, value in record.items():
+                f = self.index.get(column_key(key))
+                if f is not None and row[f] is None:
+                    row[f] = value
+            rows.append(row)
+        columns = list(zip(*rows)) if rows else [()] * len(self.features)
+        return self.encode([None if all(value is None for value in column) else column for column in columns],
+                           len(rows))
+
+    def from_form(self, form):
+        """One (1, n_features) row from a form or JSON object; raises SchemaError"""
+        matrix = self.from_records([form])
+        if matrix.errors[0]:
+            raise SchemaError(matrix.errors[0])
+        return matrix.X
+
+    def column_mapping(self, header):
+        """Header position of every feature (None when absent); raises on missing required columns"""
+        mapping = [None] * len(self.features)
+        for position, column in enumerate(header):
+            f = self.index.get(column_key(column))
+            if f is not None and mapping[f] is None:
+                mapping[f] = position
+        missing = [feature.name for feature, position in zip(self.features, mapping)
+                   if position is None and feature.default is None]
+        if missing:
+            raise ValueError(f"{self.test}: missing columns {', '.join(missing)}")
+        return mapping
+
+    def from_rows(self, header, rows):
+        """Feature matrix from parsed CSV rows (short rows count as missing values)"""
+        mapping = self.column_mapping(header)
+        #transpose once in C; short rows are padded with blanks
+        transposed = list(itertools.zip_longest(*rows, fillvalue='')) if rows else []
+        transposed += [('',) * len(rows)] * (len(header) - len(transposed))
+        return self.encode([transposed[position] if position is not None else None for position in mapping],
+                           len(rows))
+
+
+SCHEMAS = {
+    'diabetes': FeatureSchema(
+        'diabetes', model='classifier', dataset='diabetes',
+        features=[
+            Feature('Pregnancies', 'pregnancy', low=0, high=30),
+            Feature('Glucose', 'gluc', low=0, high=1000),
+            Feature('BloodPressure', 'bp', low=0, high=300, aliases=('blood_pressure',)),
+            Feature('SkinThickness', 'skt', low=0, high=200, aliases=('skin_thickness',)),
+            Feature('Insulin', 'insulin', low=0, high=3000),
+            Feature('BMI', 'bmi', low=0, high=150),
+            Feature('DiabetesPedigreeFunction', 'pedigree', low=0, high=5),
+            Feature('Age', 'age', low=0, high=120),
+        ],
+        diagnoses={0: 'The Person is Not Diabetic', 1: 'The person is diabetic'},
+    ),
+    'heart': FeatureSchema(
+        'heart', model='model', dataset='heart_data',
+        features=[
+            Feature('age', 'age', low=0, high=120),
+            Feature('sex', 'sex', kind='sex'),
+            Feature('cp', 'cp', low=0, high=3, aliases=('chest_pain',)),
+            Feature('trestbps', 'rbp', low=0, high=300, aliases=('resting_blood_pressure',)),
+            Feature('chol', 'chol', low=0, high=1000, aliases=('cholesterol', 'cholestral')),
+            Feature('fbs', 'fbs', kind='binary', aliases=('fasting_blood_sugar',)),
+            Feature('restecg', 'rer', low=0, high=2),
+            Feature('thalach', 'mhr', low=0, high=300, aliases=('max_heart_rate',)),
+            Feature('exang', 'eia', kind='binary'),
+            Feature('oldpeak', 'st', low=-10, high=10),
+            Feature('slope', 'slope', low=0, high=2),
+            Feature('ca', 'vessels', low=0, high=4),
+            Feature('thal', 'defects', low=0, high=3),
+        ],
+        diagnoses={0: 'The person does not have any heart disease', 1: 'The person is having heart disease'},
+    ),
+    #defaults keep the kidney form's old behaviour of treating blank measurements as 0
+    'kidney': FeatureSchema(
+        'kidney', model='kidney_model', dataset='kidney_data',
+        features=[
+            Feature('Age (yrs)', 'age', default=0, low=0, high=120),
+            Feature('Blood Pressure (mm/Hg)', 'blood_pressure', default=0, low=0, high=300),
+            Feature('Specific Gravity', 'specific_gravity', default=0, low=0, high=1.1),
+            Feature('Albumin', 'albumin', default=0, low=0, high=5),
+            Feature('Sugar', 'sugar', default=0, low=0, high=5),
+            Feature('Blood Glucose Random (mgs/dL)', 'blood_glucose', default=0, low=0, high=1000),
+            Feature('Blood Urea (mgs/dL)', 'blood_urea', low=0, high=500),
+            Feature('Serum Creatinine (mgs/dL)', 'serum_creatinine', default=0, low=0, high=100),
+            Feature('Sodium (mEq/L)', 'sodium', default=0, low=0, high=250),
+            Feature('Potassium (mEq/L)', 'potassium', default=0, low=0, high=60),
+            Feature('Hemoglobin (gms)', 'hemoglobin', low=0, high=25),
+            Feature('Packed Cell Volume', 'packed_cell_volume', default=0, low=0, high=100),
+            Feature('White Blood Cells (cells/cmm)', 'white_bc', default=0, low=0, high=100000),
+            Feature('Red Blood Cells (millions/cmm)', 'red_bc', default=0, low=0, high=15),
+            Feature('Red Blood Cells: normal', 'rbc', kind='binary', default=0, words=NORMAL_WORDS),
+            Feature('Pus Cells: normal', 'pus_cells_normal', kind='binary', default=0, words=NORMAL_WORDS),
+            Feature('Pus Cell Clumps: present', 'puss_cell_clumps_present', kind='binary', default=0,
+                    words=PRESENT_WORDS),
+            Feature('Bacteria: present', 'Bacteria_present', kind='binary', default=0, words=PRESENT_WORDS),
+            Feature('Hypertension: yes', 'hypertension', kind='binary', default=0),
+            Feature('Diabetes Mellitus: yes', 'diabetes_mellitus', kind='binary', default=0),
+            Feature('Coronary Artery Disease: yes', 'coronary_artery_disease', kind='binary', default=0),
+            Feature('Appetite: poor', 'appetite', kind='binary', default=0, words={'poor': 1, 'good': 0}),
+            Feature('Pedal Edema: yes', 'radal_edema', kind='binary', default=0, aliases=('pedal_edema',)),
+            Feature('Anemia: yes', 'anaemia', kind='binary', default=0, aliases=('anemia',)),
+        ],
+        diagnoses={0: 'The Person does not have kidney issues', 1: 'The person has kidney issues'},
+    ),
+}
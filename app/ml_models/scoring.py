@@ -0,0 +1,147 @@
+"""Bulk scoring of CSV files with the diabetes, heart and kidney models.
+
+The input is cut into record-aligned chunks of raw text. Each chunk is
+parsed, mapped onto the model's feature order, validated and scored in a
+worker process, and comes back as ready-to-write CSV plus the rows to
+store, so parsing and formatting scale with cores as well as predicting.
+"""
+import csv
+import io
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from .schemas import SCHEMAS, column_key
+
+
+OUTPUT_COLUMNS = ['row', 'name', 'prediction', 'diagnosis', 'error']
+
+
+class ScoredChunk(NamedTuple):
+    csv: str
+    records: list
+    rows: int
+    invalid: int
+
+
+def score_rows(test, header, rows, first_row=1, model=None, keep_records=False):
+    """Score parsed CSV rows; invalid rows get their problems instead of a prediction"""
+    from .loader import registry
+
+    schema = SCHEMAS[test]
+    matrix = schema.from_rows(header, rows)
+    valid = matrix.valid
+
+    predictions = np.zeros(len(rows), dtype=np.int64)
+    if valid.any():
+        model = model or registry.get(schema.model)
+        predictions[valid] = model.predict(matrix.X[valid])
+
+    name_col = next((i for i, col in enumerate(header) if column_key(col) == 'name'), None)
+    names = [row[name_col] if name_col < len(row) else '' for row in rows] if name_col is not None else [''] * len(rows)
+    diagnoses = [schema.diagnosis(p) if ok else '' for p, ok in zip(predictions, valid)]
+
+    out = io.StringIO()
+    csv.writer(out).writerows(zip(
+        range(first_row, first_row + len(rows)), names,
+        [int(p) if ok else '' for p, ok in zip(predictions, valid)], diagnoses,
+        ['; '.join(problems) for problems in matrix.errors]
+    ))
+    records = [{'name': names[r], 'features': matrix.X[r].tolist(), 'diagnosis': diagnoses[r]}
+               for r in np.flatnonzero(valid)] if keep_records else []
+    return ScoredChunk(out.getvalue(), records, len(rows), int((~valid).sum()))
+
+
+def score_text(test, header, text, first_row, keep_records=False):
+    #worker entry point: one chunk of raw CSV lines
+    return score_rows(test, header, list(csv.reader(io.StringIO(text))), first_row, keep_records=keep_records)
+
+
+def read_records(f):
+    """Raw text of each CSV record; a newline inside a quoted field does not end one"""
+    lines, quotes = [], 0
+    for line in f:
+        lines.append(line)
+        #quotes inside a field come in pairs (""), so an odd count means a field is still open
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            yield ''.join(lines)
+            lines, quotes = [], 0
+    if lines:
+        yield ''.join(lines)
+
+
+def read_chunks(f, chunk_size):
+    """(first row number, raw text) for consecutive chunks of `chunk_size` records of a CSV body"""
+    records = read_records(f)
+    first_row = 1
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        yield first_row, ''.join(chunk)
+        first_row += len(chunk)
+
+
+def read_header(test, input_file):
+    """Read and validate the header record; raises ValueError on missing columns"""
+    header = next(csv.reader([next(read_records(input_file), '')]), [])
+    SCHEMAS[test].column_mapping(header)
+    return header
+
+
+def iter_scored(test, header, input_file, chunk_size=5000, keep_records=False):
+    """Score the rest of `input_file` in this process, one ScoredChunk at a time"""
+    for first_row, text in read_chunks(input_file, chunk_size):
+        yield score_text(test, header, text, first_row, keep_records)
+
+
+def output_header():
+    out = io.StringIO()
+    csv.writer(out).writerow(OUTPUT_COLUMNS)
+    return out.getvalue()
+
+
+def score_file(test, input_file, output_file, chunk_size=5000, workers=None, on_chunk=None):
+    """Score a CSV file into `output_file`; `on_chunk(ScoredChunk)` sees every chunk in order.
+
+    Chunks carry their valid rows as records only when `on_chunk` is given.
+    workers=1 scores in this process. Otherwise a fork-started pool is used
+    and at most two chunks per worker are in flight, so memory stays flat.
+    """
+    from .loader import registry
+
+    workers = workers or os.cpu_count() or 1
+    #loaded before forking so the workers share it
+    registry.get(SCHEMAS[test].model)
+
+    header = read_header(test, input_file)
+    output_file.write(output_header())
+    keep_records = on_chunk is not None
+    totals = {'rows': 0, 'invalid': 0}
+
+    def emit(chunk):
+        output_file.write(chunk.csv)
+        totals['rows'] += chunk.rows
+        totals['invalid'] += chunk.invalid
+        if on_chunk:
+            on_chunk(chunk)
+
+    if workers == 1:
+        for chunk in iter_scored(test, header, input_file, chunk_size, keep_records):
+            emit(chunk)
+        return totals
+
+    import multiprocessing
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as pool:
+        pending = []
+        for first_row, text in read_chunks(input_file, chunk_size):
+            pending.append(pool.submit(score_text, test, header, text, first_row, keep_records))
+            if len(pending) >= 2 * workers:
+                emit(pending.pop(0).result())
+        for future in pending:
+            emit(future.result())
+    return totals
@@ -0,0 +1,124 @@
+"""What-if sensitivity curves for the diabetes, heart and kidney models.
+
+A curve varies one feature of a patient's row over a grid while the other
+features stay fixed. The patient's own row and every grid point go into
+one (points + 1, n_features) matrix scored with a single predict_proba
+(or predict) call, so a 200-point curve costs about one prediction.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from .loader import registry, model_version
+from .schemas import CATEGORICAL, SCHEMAS, column_key
+
+DEFAULT_POINTS = 100
+MAX_POINTS = 500
+
+
+class FeatureRanges(NamedTuple):
+    low: np.ndarray
+    high: np.ndarray
+    integral: np.ndarray    #feature only takes whole numbers in the training data
+
+
+def _feature_ranges(schema):
+    #observed range of every feature, the default span of a curve
+    def load():
+        data = registry.get(schema.dataset)[schema.names].to_numpy(np.float64)
+        return FeatureRanges(
+            np.nanmin(data, axis=0), np.nanmax(data, axis=0),
+            np.all(np.isnan(data) | (data == np.round(data)), axis=0)
+        )
+    return load
+
+
+for _test, _schema in SCHEMAS.items():
+    registry.register(f"{_test}_feature_ranges", _feature_ranges(_schema))
+
+
+class Curve(NamedTuple):
+    feature: str
+    values: np.ndarray
+    labels: np.ndarray
+    probabilities: Optional[np.ndarray]
+    current: float
+    current_label: int
+    current_probability: Optional[float]
+
+
+def feature_grid(schema, f, low=None, high=None, points=DEFAULT_POINTS):
+    """Grid of values for feature `f`, within its allowed range"""
+    feature = schema.features[f]
+    if feature.kind in CATEGORICAL:
+        return np.array([0.0, 1.0])
+
+    ranges = registry.get(f"{schema.test}_feature_ranges")
+    low = max(ranges.low[f] if low is None else float(low), feature.low)
+    high = min(ranges.high[f] if high is None else float(high), feature.high)
+    if not low < high:
+        raise ValueError(f"{feature.field}: empty range {low:g} to {high:g}")
+
+    grid = np.linspace(low, high, max(2, min(int(points), MAX_POINTS)))
+    if ranges.integral[f] and high - low < len(grid):
+        #counts and codes (pregnancies, chest pain type, ...) only make sense as whole numbers
+        grid = np.unique(np.round(grid))
+    return grid
+
+
+def score_matrix(model, X):
+    """Labels and, when the model has predict_proba, P(class 1), from one model call"""
+    if hasattr(model, 'predict_proba'):
+        try:
+            proba = model.predict_proba(X)
+        except NotImplementedError:
+            #a model behind the inference server only finds out there whether it has probabilities
+            proba = None
+        if proba is not None:
+            return model.classes_[proba.argmax(axis=1)], proba[:, 1]
+    return np.asarray(model.predict(X)), None
+
+
+def sensitivity_curve(test, row, feature, low=None, high=None, points=DEFAULT_POINTS, model=None):
+    """Predictions for `row` (one encoded patient) as `feature` sweeps its range"""
+    schema = SCHEMAS[test]
+    f = schema.index.get(column_key(feature))
+    if f is None:
+        raise ValueError(f"{test}: unknown feature {feature}")
+
+    grid = feature_grid(schema, f, low, high, points)
+    X = np.repeat(np.asarray(row, dtype=np.float64).reshape(1, -1), len(grid) + 1, axis=0)
+    X[1:, f] = grid
+
+    labels, probabilities = score_matrix(model or registry.get(schema.model), X)
+    return Curve(
+        schema.features[f].field, grid, labels[1:],
+        probabilities[1:] if probabilities is not None else None,
+        float(X[0, f]), int(labels[0]),
+        float(probabilities[0]) if probabilities is not None else None
+    )
+
+
+def curve_json(test, curve):
+    """JSON body for charts.js: the sweep plus the values where the diagnosis flips"""
+    schema = SCHEMAS[test]
+    feature = schema.features[schema.index[column_key(curve.feature)]]
+    flips = np.flatnonzero(curve.labels[1:] != curve.labels[:-1])
+    return {
+        'test': test,
+        'feature': curve.feature,
+        'label': feature.name,
+        'values': curve.values.tolist(),
+        'predictions': curve.labels.astype(int).tolist(),
+        'probabilities': curve.probabilities.tolist() if curve.probabilities is not None else None,
+        #midpoint between the last value with one label and the first with the next
+        'thresholds': ((curve.values[flips] + curve.values[flips + 1]) / 2).tolist(),
+        'current': {
+            'value': curve.current,
+            'prediction': curve.current_label,
+            'probability': curve.current_probability,
+            'diagnosis': schema.diagnosis(curve.current_label),
+        },
+        'diagnoses': {str(label): text for label, text in schema.diagnoses.items()},
+        'model_version': model_version(),
+    }
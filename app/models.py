@@ -87,6 +87,9 @@ class Doctor(User):
     national_id = db.Column(db.String(50), unique=True)
     password1 = db.Column(db.String(255))
     
+    #the admin listing pages through doctors alphabetically, a missing name sorting as ''
+    __table_args__ = (db.Index('ix_register_full_names_id', db.func.coalesce(full_names, ''), 'id'),)
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.role = UserRole.DOCTOR.value
@@ -116,6 +119,10 @@ class Patient(User):
     contact = db.Column(db.String(20))
     password1 = db.Column(db.String(255))
     
+    #the admin listing pages through patients alphabetically, a missing name sorting as ''
+    __table_args__ = (db.Index('ix_patient_register_fname_lname_id',
+                               db.func.coalesce(fname, ''), db.func.coalesce(lname, ''), 'id'),)
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.role = UserRole.PATIENT.value
@@ -177,6 +184,11 @@ class SelfDiagnosis(db.Model):
     description = db.Column(db.Text)
     symptoms = db.Column(db.Text)
     time = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    model_version = db.Column(db.String(64), index=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient_register.id', name='fk_self_diagnosis_patient_id'), nullable=True)
+    
+    #a patient's history is one range scan: patient_id, then newest first
+    __table_args__ = (db.Index('ix_self_diagnosis_patient_id_time', 'patient_id', 'time'),)
     
     def __repr__(self):
         return f'<SelfDiagnosis {self.name}: {self.diagnosis}>'
@@ -189,6 +201,8 @@ class SelfDiagnosis(db.Model):
             'diagnosis': self.diagnosis,
             'description': self.description,
             'symptoms': self.symptoms,
+            'patient_id': self.patient_id,
+            'model_version': self.model_version,
             'time': self.time.isoformat() if self.time else None
         }
 
@@ -204,6 +218,10 @@ class DiabetesTest(db.Model):
     diab_diagnosis = db.Column(db.String(200))
     doctor = db.Column(db.String(150))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    model_version = db.Column(db.String(64), index=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient_register.id', name='fk_diabetes_test_patient_id'), nullable=True)
+    
+    __table_args__ = (db.Index('ix_diabetes_test_patient_id_created_at', 'patient_id', 'created_at'),)
     
     def __repr__(self):
         return f'<DiabetesTest {self.name}>'
@@ -216,6 +234,8 @@ class DiabetesTest(db.Model):
             'insulin': self.insulin,
             'diab_diagnosis': self.diab_diagnosis,
             'doctor': self.doctor,
+            'patient_id': self.patient_id,
+            'model_version': self.model_version,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -231,6 +251,10 @@ class HeartTest(db.Model):
     heart_diagnosis = db.Column(db.String(200))
     doctor = db.Column(db.String(150))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    model_version = db.Column(db.String(64), index=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient_register.id', name='fk_heart_test_patient_id'), nullable=True)
+    
+    __table_args__ = (db.Index('ix_heart_test_patient_id_created_at', 'patient_id', 'created_at'),)
     
     def __repr__(self):
         return f'<HeartTest {self.name}>'
@@ -243,6 +267,8 @@ class HeartTest(db.Model):
             'cholestral': self.cholestral,
             'heart_diagnosis': self.heart_diagnosis,
             'doctor': self.doctor,
+            'patient_id': self.patient_id,
+            'model_version': self.model_version,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -258,6 +284,10 @@ class KidneyTest(db.Model):
     kidney_diagnosis = db.Column(db.String(200))
     doctor = db.Column(db.String(150))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    model_version = db.Column(db.String(64), index=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient_register.id', name='fk_kidney_test_patient_id'), nullable=True)
+    
+    __table_args__ = (db.Index('ix_kidney_test_patient_id_created_at', 'patient_id', 'created_at'),)
     
     def __repr__(self):
         return f'<KidneyTest {self.name}>'
@@ -270,6 +300,8 @@ class KidneyTest(db.Model):
             'blood_glucose': self.blood_glucose,
             'kidney_diagnosis': self.kidney_diagnosis,
             'doctor': self.doctor,
+            'patient_id': self.patient_id,
+            'model_version': self.model_version,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -313,6 +345,9 @@ class BookedAppointment(db.Model):
     day = db.Column(db.String(50))
     time = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    patient_id = db.Column(db.Integer, db.ForeignKey('patient_register.id', name='fk_booked_appointments_patient_id'), nullable=True)
+    
+    __table_args__ = (db.Index('ix_booked_appointments_patient_id_created_at', 'patient_id', 'created_at'),)
     
     def __repr__(self):
         return f'<BookedAppointment {self.patient} - {self.day} {self.time}>'
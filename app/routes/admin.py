@@ -1,8 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash,session
+from flask import Blueprint, render_template, request, redirect, url_for, flash,session, current_app, stream_with_context
 from datetime import datetime
 from app.utils.decorators import admin_required
 from app.models import db, Appointment, Doctor, BookedAppointment,Question, Response,SelfDiagnosis,KidneyTest,HeartTest,DiabetesTest,Patient,Admin
 from app.services.email_service import EmailService, send_email_notification
+from app.services.admin_stats import dashboard_stats, EMPTY_STATS
+from app.services.patient_links import patient_id_for
+from app.services.exports import EXPORTS, FORMATS, parse_date, iter_export, encode, export_filename
+from app.utils.pagination import paginate, sort_key
 
 
 admin = Blueprint('admin', __name__, url_prefix='/admin')
@@ -11,43 +15,13 @@ admin = Blueprint('admin', __name__, url_prefix='/admin')
 @admin.route('/dashboard')
 def dashboard():
     try:
-        stats = {
-            'doctors': Doctor.query.filter_by(is_active=True).count(),
-            'patients': Patient.query.filter_by(is_active=True).count(),
-            'admins': Admin.query.filter_by(is_active=True).count(),
-            'appointments': Appointment.query.count(),
-            'booked_appointments': BookedAppointment.query.count(),
-            'questions': Question.query.count(),
-            'self_diagnosis': SelfDiagnosis.query.count(),
-            'diabetes_tests': DiabetesTest.query.count(),
-            'heart_tests': HeartTest.query.count(),
-            'kidney_tests': KidneyTest.query.count(),
-            'total_tests': (
-                SelfDiagnosis.query.count() + 
-                DiabetesTest.query.count() + 
-                HeartTest.query.count() + 
-                KidneyTest.query.count()
-            )
-        }
-        
+        stats = dashboard_stats()
         return render_template('admin/admin.html', stats=stats)
     except Exception as e:
         flash(f'Error loading dashboard: {str(e)}', 'error')
         # Return empty stats if there's an error
-        stats = {
-            'doctors': 0,
-            'patients': 0,
-            'admins': 0,
-            'appointments': 0,
-            'booked_appointments': 0,
-            'questions': 0,
-            'self_diagnosis': 0,
-            'diabetes_tests': 0,
-            'heart_tests': 0,
-            'kidney_tests': 0,
-            'total_tests': 0
-        }
-        return render_template('admin/admin.html', stats=stats)
+        return render_template('admin/admin.html', stats=dict(EMPTY_STATS))
+
 
 @admin.route('/appointments', methods=['GET', 'POST'])
 @admin_required
@@ -91,7 +65,8 @@ def appointments():
                 specialist=specialist,
                 day=day,
                 time=time,
-                created_at=datetime.utcnow()
+                created_at=datetime.utcnow(),
+                patient_id=patient_id_for(email=email, name=patient)
             )
             
             db.session.add(booked_appointment)
@@ -191,16 +166,16 @@ def response():
 def ASelfDiagBtn():
     
         try:
-            records = SelfDiagnosis.query.with_entities(
+            page = paginate(SelfDiagnosis.query.with_entities(
                 SelfDiagnosis.id,
                 SelfDiagnosis.name,
                 SelfDiagnosis.diagnosis,
                 SelfDiagnosis.time,
                 SelfDiagnosis.symptoms
-            ).order_by(SelfDiagnosis.time.desc()).all()
+            ), (SelfDiagnosis.time, SelfDiagnosis.id))
             
             records_list = []
-            for record in records:
+            for record in page.items:
                 records_list.append({
                     'id': record.id,
                     'name': record.name,
@@ -209,7 +184,7 @@ def ASelfDiagBtn():
                     'symptoms': record.symptoms
                 })
             
-            return render_template('admin/adminselfdiagnosisrecords.html', records=records_list)
+            return render_template('admin/adminselfdiagnosisrecords.html', records=records_list, page=page)
 
         except Exception as err:
             flash(f'The following error occurred: {str(err)}', 'error')
@@ -291,11 +266,11 @@ def edit_records(id):
 @admin_required
 def DiabeResultBtn():
     try:
-        records = DiabetesTest.query.order_by(DiabetesTest.created_at.desc()).all()
-        records_list = [record.to_dict() for record in records]
+        page = paginate(DiabetesTest.query, (DiabetesTest.created_at, DiabetesTest.id))
+        records_list = [record.to_dict() for record in page.items]
         
         print(f"Diabetes records count: {len(records_list)}")  
-        return render_template('admin/admindiabetesresults.html', records=records_list)
+        return render_template('admin/admindiabetesresults.html', records=records_list, page=page)
     except Exception as err:
         print(f"Error: {str(err)}")  
         import traceback
@@ -307,11 +282,11 @@ def DiabeResultBtn():
 @admin_required
 def HeartAResultBtn():
     try:
-        records = HeartTest.query.order_by(HeartTest.created_at.desc()).all()
-        records_list = [record.to_dict() for record in records]
+        page = paginate(HeartTest.query, (HeartTest.created_at, HeartTest.id))
+        records_list = [record.to_dict() for record in page.items]
         
         print(f"Heart records count: {len(records_list)}")  
-        return render_template('admin/adminheartresults.html', records=records_list)
+        return render_template('admin/adminheartresults.html', records=records_list, page=page)
     except Exception as err:
         print(f"Error: {str(err)}")  
         import traceback
@@ -323,11 +298,11 @@ def HeartAResultBtn():
 @admin_required
 def KidnResultBtn():
     try:
-        records = KidneyTest.query.order_by(KidneyTest.created_at.desc()).all()
-        records_list = [record.to_dict() for record in records]
+        page = paginate(KidneyTest.query, (KidneyTest.created_at, KidneyTest.id))
+        records_list = [record.to_dict() for record in page.items]
         
         print(f"Kidney records count: {len(records_list)}")  
-        return render_template('admin/adminkidneyresults.html', records=records_list)
+        return render_template('admin/adminkidneyresults.html', records=records_list, page=page)
     except Exception as err:
         print(f"Error: {str(err)}")  
         import traceback
@@ -340,7 +315,10 @@ def KidnResultBtn():
 @admin_required
 def ViewDoc():
     try:
-        doctors = Doctor.query.filter_by(is_active=True).order_by(Doctor.full_names).all()
+        #alphabetical, doctors without a name first; the id breaks ties between doctors with the same name
+        name = sort_key(Doctor.full_names, 'name_key')
+        keys = (name, Doctor.id)
+        page = paginate(Doctor.query.filter_by(is_active=True).add_columns(*keys), keys, descending=False)
         doctors_list = [{
             'id': doctor.id,
             'full_names': doctor.full_names,
@@ -351,8 +329,8 @@ def ViewDoc():
             'time_in': doctor.time_in,
             'time_out': doctor.time_out,
             'created_at': doctor.created_at.strftime('%Y-%m-%d %H:%M:%S') if doctor.created_at else ''
-        } for doctor in doctors]
-        return render_template('admin/viewDoctors.html', doctors=doctors_list)
+        } for doctor, *_ in page.items]
+        return render_template('admin/viewDoctors.html', doctors=doctors_list, page=page)
     except Exception as err:
         flash(f'Error fetching doctors: {str(err)}', 'error')
         return render_template('admin/viewDoctors.html', doctors=[])
@@ -361,7 +339,9 @@ def ViewDoc():
 @admin_required
 def ViewPat():
     try:
-        patients = Patient.query.filter_by(is_active=True).order_by(Patient.fname, Patient.lname).all()
+        fname, lname = sort_key(Patient.fname, 'fname_key'), sort_key(Patient.lname, 'lname_key')
+        keys = (fname, lname, Patient.id)
+        page = paginate(Patient.query.filter_by(is_active=True).add_columns(*keys), keys, descending=False)
         patients_list = [{
             'id': patient.id,
             'fname': patient.fname,
@@ -370,8 +350,8 @@ def ViewPat():
             'email': patient.email,
             'contact': patient.contact,
             'created_at': patient.created_at.strftime('%Y-%m-%d %H:%M:%S') if patient.created_at else ''
-        } for patient in patients]
-        return render_template('admin/viewPatients.html', patients=patients_list)
+        } for patient, *_ in page.items]
+        return render_template('admin/viewPatients.html', patients=patients_list, page=page)
     except Exception as err:
         flash(f'Error fetching patients: {str(err)}', 'error')
         return render_template('admin/viewPatients.html', patients=[])
@@ -395,6 +375,38 @@ def ViewAdm():
     
 
 
+@admin.route('/export/<name>')
+@admin_required
+def ExportRecords(name):
+    #?format=csv|ndjson&gzip=1&start=YYYY-MM-DD&end=YYYY-MM-DD, streamed a batch at a time
+    fmt = request.args.get('format', 'csv')
+    compress = request.args.get('gzip') in ('1', 'true', 'yes')
+    try:
+        if name not in EXPORTS or fmt not in FORMATS:
+            raise ValueError(f"Unknown export {name}.{fmt}")
+        start, end = parse_date(request.args.get('start')), parse_date(request.args.get('end'))
+    except ValueError as err:
+        flash(f'Check:{str(err)}', 'error')
+        return redirect(url_for('admin.dashboard'))
+
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    def generate():
+        try:
+            for chunk in iter_export(name, fmt, start, end, batch_size):
+                yield chunk
+        except Exception as err:
+            #headers are already sent; failing the stream is better than a file that looks complete
+            current_app.logger.error(f"Export of {name} failed: {err}")
+            raise
+
+    return current_app.response_class(
+        stream_with_context(encode(generate(), compress)),
+        mimetype='application/gzip' if compress else FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={export_filename(name, fmt, start, end, compress)}'}
+    )
+
+
 @admin.route('/populate_test_data')
 @admin_required
 def populate_test_data():
@@ -3,6 +3,7 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 from app.models import db, Doctor, Patient, Admin, LoginLog,UserRole
 from app.services.email_service import EmailService
+from app.services.patient_links import link_records
 from app.utils.decorators import admin_required
 
 auth = Blueprint('auth', __name__, url_prefix='/auth')
@@ -183,6 +184,9 @@ def register_patient():
             patient.password1 = generate_password_hash(password) 
             
             db.session.add(patient)
+            db.session.flush()
+            #diagnoses and tests made before the account existed show up in its history
+            link_records(patient)
             db.session.commit()
 
             try:
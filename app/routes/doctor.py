@@ -1,9 +1,17 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+import io
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, Response, stream_with_context, jsonify
 from app.utils.decorators import doctor_required
-from app.utils.formatters import sex_to_binary, yes_no_into_binary
-from app.models import db, DiabetesTest, HeartTest, KidneyTest, Doctor, BookedAppointment, SelfDiagnosis
+from app.models import db, DiabetesTest, HeartTest, KidneyTest, Doctor, BookedAppointment, SelfDiagnosis, Patient
 from app.services.email_service import EmailService
-from app.ml_models.loader import classifier, model, kidney_model, diabetes_remedies, heart_remedies, kidney_remedies
+from app.ml_models import loader
+from app.ml_models.loader import diabetes_remedies, heart_remedies, kidney_remedies
+from app.ml_models.schemas import SCHEMAS, SchemaError
+from app.ml_models.sensitivity import DEFAULT_POINTS, sensitivity_curve, curve_json
+from app.ml_models.scoring import read_header, iter_scored, output_header
+from app.services.test_results import save_results
+from app.services.patient_links import patient_id_for
+from app.services.timeline import SOURCES, timeline_query, entry_json
+from app.utils.pagination import paginate
 
 
 doctor = Blueprint('doctor', __name__, url_prefix='/doctor')
@@ -23,31 +31,20 @@ def TestDiabetes():
     if request.method == 'POST':
         try:
             name = request.form.get('name')
-            user_input = [
-                float(request.form.get('pregnancy')),
-                float(request.form.get('gluc')),
-                float(request.form.get('bp')),
-                float(request.form.get('skt')),
-                float(request.form.get('insulin')),
-                float(request.form.get('bmi')),
-                float(request.form.get('pedigree')),
-                float(request.form.get('age'))
-            ]
+            user_input = SCHEMAS['diabetes'].from_form(request.form)
             
-            diab_prediction = classifier.predict([user_input])
-
-            if diab_prediction[0] == 0:
-                diab_diagnosis = 'The Person is Not Diabetic'
-            else:
-                diab_diagnosis = 'The person is diabetic'
+            diab_prediction = loader.classifier.predict(user_input)
+            diab_diagnosis = SCHEMAS['diabetes'].diagnosis(diab_prediction[0])
 
             try:
                 diabetes_test = DiabetesTest(
                     name=name,
-                    age=user_input[7],
-                    insulin=user_input[4],
+                    age=user_input[0, 7],
+                    insulin=user_input[0, 4],
                     diab_diagnosis=diab_diagnosis,
-                    doctor=session.get('username', 'Unknown') 
+                    doctor=session.get('username', 'Unknown'),
+                    model_version=loader.model_version(),
+                    patient_id=patient_id_for(name=name)
                 )
                 
                 db.session.add(diabetes_test)
@@ -62,7 +59,7 @@ def TestDiabetes():
         except Exception as err2:
             flash(f'Check:{str(err2)}', 'error')
 
-    return render_template('doctor/diabetes.html', diab_diagnosis=diab_diagnosis, remedies=diabetes_remedies)
+    return render_template('doctor/diabetes.html', diab_diagnosis=diab_diagnosis, remedies=diabetes_remedies, features=SCHEMAS['diabetes'].features)
 
 
 @doctor.route('/HeartTest', methods=['POST', 'GET'])
@@ -74,36 +71,19 @@ def TestHeart():
     try:
         if request.method == 'POST':
             name = request.form.get('name')
-            age = request.form.get('age')
-            sex = sex_to_binary(request.form.get('sex', "male"))
-            cp = request.form.get('cp')
-            trestbps = request.form.get('rbp')
-            chol = request.form.get('chol')
-            fbs = request.form.get('fbs')
-            restecg = request.form.get('rer')
-            thalach = request.form.get('mhr')
-            exang = request.form.get('eia')
-            oldpeak = request.form.get('st')
-            slope = request.form.get('slope')
-            ca = request.form.get('vessels')
-            thal = request.form.get('defects')
-
-            user_input = [age, sex, cp, trestbps, chol, fbs, restecg, thalach, exang, oldpeak, slope, ca, thal]
-            user_input = [float(x) for x in user_input]
+            user_input = SCHEMAS['heart'].from_form(request.form)
             
-            heart_prediction = model.predict([user_input])
-
-            if heart_prediction[0] == 1:
-                heart_diagnosis = 'The person is having heart disease'
-            else:
-                heart_diagnosis = 'The person does not have any heart disease'
+            heart_prediction = loader.model.predict(user_input)
+            heart_diagnosis = SCHEMAS['heart'].diagnosis(heart_prediction[0])
             
             heart_test = HeartTest(
                 name=name,
-                age=float(age),
-                cholestral=float(chol),
+                age=user_input[0, 0],
+                cholestral=user_input[0, 4],
                 heart_diagnosis=heart_diagnosis,
-                doctor=session.get('username', 'Unknown')
+                doctor=session.get('username', 'Unknown'),
+                model_version=loader.model_version(),
+                patient_id=patient_id_for(name=name)
             )
             
             db.session.add(heart_test)
@@ -115,7 +95,7 @@ def TestHeart():
         db.session.rollback()
         flash(f'Check:{str(err2)}', 'error')
 
-    return render_template('doctor/heart.html', heart_diagnosis=heart_diagnosis, remedies=heart_remedies)
+    return render_template('doctor/heart.html', heart_diagnosis=heart_diagnosis, remedies=heart_remedies, features=SCHEMAS['heart'].features)
 
 
 @doctor.route('/KidneyTest', methods=['POST', 'GET'])
@@ -127,46 +107,19 @@ def TestKidney():
     if request.method == 'POST':
         try:
             name = request.form.get('name')
-            user_input = [
-                float(request.form.get('age') or 0),
-                float(request.form.get('blood_pressure') or 0),
-                float(request.form.get('specific_gravity') or 0),
-                float(request.form.get('albumin') or 0),
-                float(request.form.get('sugar') or 0),
-                float(request.form.get('blood_glucose') or 0),
-                float(request.form.get('blood_urea')),
-                float(request.form.get('serum_creatinine') or 0),
-                float(request.form.get('sodium') or 0),
-                float(request.form.get('potassium') or 0),
-                float(request.form.get('hemoglobin')),
-                float(request.form.get('packed_cell_volume') or 0),
-                float(request.form.get('white_bc') or 0),
-                float(request.form.get('red_bc') or 0),
-                float(request.form.get('rbc') or 0),
-                float(yes_no_into_binary(request.form.get('pus_cells_normal', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('puss_cell_clumps_present', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('Bacteria_present', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('hypertension', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('diabetes_mellitus', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('coronary_artery_disease', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('appetite', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('radal_edema', "no")) or 0),
-                float(yes_no_into_binary(request.form.get('anaemia', "no")) or 0)
-            ]
-
-            kidney_prediction = kidney_model.predict([user_input])
-
-            if kidney_prediction[0] == 0:
-                kidney_diagnosis = 'The Person does not have kidney issues'
-            else:
-                kidney_diagnosis = 'The person has kidney issues'
+            user_input = SCHEMAS['kidney'].from_form(request.form)
+
+            kidney_prediction = loader.kidney_model.predict(user_input)
+            kidney_diagnosis = SCHEMAS['kidney'].diagnosis(kidney_prediction[0])
             
             kidney_test = KidneyTest(
                 name=name,
-                age=user_input[0],
-                blood_glucose=user_input[5],
+                age=user_input[0, 0],
+                blood_glucose=user_input[0, 5],
                 kidney_diagnosis=kidney_diagnosis,
-                doctor=session.get('username', 'Unknown')
+                doctor=session.get('username', 'Unknown'),
+                model_version=loader.model_version(),
+                patient_id=patient_id_for(name=name)
             )
             
             db.session.add(kidney_test)
@@ -178,18 +131,159 @@ def TestKidney():
             db.session.rollback()
             flash(f'Check:{str(err)}', 'error')
 
-    return render_template('doctor/kidney.html', kidney_diagnosis=kidney_diagnosis, remedies=kidney_remedies)
+    return render_template('doctor/kidney.html', kidney_diagnosis=kidney_diagnosis, remedies=kidney_remedies, features=SCHEMAS['kidney'].features)
+
+
+@doctor.route('/batchTest', methods=['POST', 'GET'])
+@doctor_required
+def BatchTest():
+    #score an uploaded CSV of patients; results stream back as CSV while rows are saved per chunk
+    if request.method == 'POST':
+        test = request.form.get('test')
+        upload = request.files.get('file')
+        save = request.form.get('save') == 'yes'
+
+        if test not in SCHEMAS or not upload or not upload.filename:
+            flash('Choose a test and a CSV file to upload', 'error')
+            return redirect(url_for('doctor.BatchTest'))
+
+        input_file = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+        try:
+            header = read_header(test, input_file)
+        except (ValueError, UnicodeDecodeError) as err:
+            flash(f'Check: {str(err)}', 'error')
+            return redirect(url_for('doctor.BatchTest'))
+
+        doctor_name = session.get('username', 'Unknown')
+        version = loader.model_version()
+        chunk_size = current_app.config['BATCH_TEST_CHUNK_SIZE']
+
+        def generate():
+            yield output_header()
+            scored = saved = 0
+            try:
+                for chunk in iter_scored(test, header, input_file, chunk_size, keep_records=save):
+                    if save:
+                        saved += save_results(test, chunk.records, doctor_name, version)
+                    scored += chunk.rows
+                    yield chunk.csv
+            except Exception as err:
+                #headers are already sent, so the failure is reported in the file itself
+                current_app.logger.error(f"Batch {test} test failed after {scored} rows: {err}")
+                yield f",,,,batch stopped after {scored} rows: {err}\n"
+                return
+            current_app.logger.info(f"Batch {test} test: {scored} rows scored, {saved} saved by {doctor_name}")
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={test}_results.csv'}
+        )
+
+    return render_template('doctor/batch.html', tests=list(SCHEMAS))
+
+
+@doctor.route('/api/<test>/predict', methods=['POST'])
+@doctor_required
+def PredictTest(test):
+    #JSON object or array of objects keyed like the form fields (or dataset headers); nothing is saved
+    schema = SCHEMAS.get(test)
+    if schema is None:
+        return jsonify({'error': f'Unknown test {test}'}), 404
+
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not all(isinstance(record, dict) for record in payload):
+        return jsonify({'error': 'Expected a JSON object or an array of objects'}), 400
+
+    limit = current_app.config['PREDICT_BATCH_LIMIT']
+    if len(payload) > limit:
+        return jsonify({'error': f'At most {limit} records per request'}), 413
+
+    matrix = schema.from_records(payload)
+    valid = matrix.valid
+    try:
+        predictions = loader.registry.get(schema.model).predict(matrix.X[valid]) if valid.any() else []
+    except Exception as err:
+        current_app.logger.error(f"{test} prediction error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+
+    predictions = iter(predictions)
+    results = []
+    for problems in matrix.errors:
+        if problems:
+            results.append({'errors': problems})
+        else:
+            label = int(next(predictions))
+            results.append({'prediction': label, 'diagnosis': schema.diagnosis(label)})
+
+    return jsonify({'results': results, 'model_version': loader.model_version()})
+
+
+@doctor.route('/api/<test>/sensitivity', methods=['POST'])
+@doctor_required
+def SensitivityCurve(test):
+    #{"patient": {...form fields...}, "feature": "chol", "low": 100, "high": 400, "points": 200}
+    if test not in SCHEMAS:
+        return jsonify({'error': f'Unknown test {test}'}), 404
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get('patient'), dict) or not payload.get('feature'):
+        return jsonify({'error': 'Expected a JSON object with a patient and a feature'}), 400
+
+    try:
+        row = SCHEMAS[test].from_form(payload['patient'])
+        curve = sensitivity_curve(test, row[0], payload['feature'], payload.get('low'), payload.get('high'),
+                                  payload.get('points', DEFAULT_POINTS))
+    except SchemaError as err:
+        return jsonify({'error': 'Invalid patient', 'errors': err.errors}), 400
+    except (ValueError, TypeError) as err:
+        return jsonify({'error': str(err)}), 400
+    except Exception as err:
+        current_app.logger.error(f"{test} sensitivity error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+
+    return jsonify(curve_json(test, curve))
+
+
+@doctor.route('/api/patients/<int:patient_id>/timeline')
+@doctor_required
+def PatientTimeline(patient_id):
+    #?kind=heart&kind=kidney narrows the tables; ?after=/?before=/?limit= page through, newest first
+    patient = db.session.get(Patient, patient_id)
+    if patient is None:
+        return jsonify({'error': f'Unknown patient {patient_id}'}), 404
+
+    kinds = request.args.getlist('kind')
+    unknown = [kind for kind in kinds if kind not in SOURCES]
+    if unknown:
+        return jsonify({'error': f'Unknown kind {", ".join(unknown)}', 'kinds': list(SOURCES)}), 400
+
+    try:
+        page = paginate(*timeline_query(patient_id, kinds))
+    except Exception as err:
+        current_app.logger.error(f"Timeline error for patient {patient_id}: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+
+    return jsonify({
+        'patient': {'id': patient.id, 'full_name': patient.full_name},
+        'items': [entry_json(row) for row in page.items],
+        'limit': page.limit,
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor
+    })
 
 
 @doctor.route('/self_diag_records')
 def SelfDiagBtn():
     try:
-        records = SelfDiagnosis.query.order_by(SelfDiagnosis.time.desc()).all()
+        page = paginate(SelfDiagnosis.query, (SelfDiagnosis.time, SelfDiagnosis.id))
     except Exception as err:
         flash(f"Error fetching records: {str(err)}", "error")
-        records = []
+        page = None
     
-    return render_template('records/selfdiagnosisrecords.html', records=records)
+    return render_template('records/selfdiagnosisrecords.html', records=page.items if page else [], page=page)
 
 
 @doctor.route('/doc_appointment')
@@ -232,12 +326,12 @@ def HeartResultBtn():
         return redirect(url_for('auth.Login'))
     
     try:
-        records = HeartTest.query.order_by(HeartTest.created_at.desc()).all()
+        page = paginate(HeartTest.query, (HeartTest.created_at, HeartTest.id))
     except Exception as err:
         flash(f"Error fetching records: {str(err)}", "error")
-        records = []
+        page = None
     
-    return render_template('records/heartresults.html', records=records)
+    return render_template('records/heartresults.html', records=page.items if page else [], page=page)
 
 
 @doctor.route('/kidneyresults')
@@ -248,12 +342,12 @@ def KidResultBtn():
         return redirect(url_for('auth.Login'))
     
     try:
-        records = KidneyTest.query.order_by(KidneyTest.created_at.desc()).all()
+        page = paginate(KidneyTest.query, (KidneyTest.created_at, KidneyTest.id))
     except Exception as err:
         flash(f"Error fetching records: {str(err)}", "error")
-        records = []
+        page = None
     
-    return render_template('records/kidneyresults.html', records=records)
+    return render_template('records/kidneyresults.html', records=page.items if page else [], page=page)
 
 
 @doctor.route('/diabetesresults')
@@ -264,12 +358,12 @@ def DiabResultBtn():
         return redirect(url_for('auth.Login'))
     
     try:
-        records = DiabetesTest.query.order_by(DiabetesTest.created_at.desc()).all()
+        page = paginate(DiabetesTest.query, (DiabetesTest.created_at, DiabetesTest.id))
     except Exception as err:
         flash(f"Error fetching records: {str(err)}", "error")
-        records = []
+        page = None
     
-    return render_template('records/diabetesresults.html', records=records)
+    return render_template('records/diabetesresults.html', records=page.items if page else [], page=page)
 
 
 @doctor.route('/view_records/<int:id>')
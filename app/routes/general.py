@@ -1,4 +1,4 @@
-from flask import Flask, request , render_template, request, url_for, session, redirect, flash,Blueprint, render_template, request, redirect, url_for, flash
+from flask import Flask, request , render_template, request, url_for, session, redirect, flash,Blueprint, render_template, request, redirect, url_for, flash, current_app, abort
 from app.models import db, Question, Response, Appointment, BookedAppointment
 from app.services.email_service import  EmailService, send_help_notification
 
@@ -127,3 +127,14 @@ def responses():
 
 
 
+
+
+@main.route('/metrics')
+def metrics():
+    #Prometheus scrape target; model metrics of every worker, see app/ml_models/metrics.py
+    directory = current_app.config['METRICS_DIR']
+    if not directory:
+        abort(404)
+
+    from app.ml_models.metrics import render
+    return render(directory), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
@@ -1,8 +1,10 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash,session
-from app.ml_models.predictor import get_prediction,helper
+import hashlib
+from flask import Blueprint, render_template, request, redirect, url_for, flash,session,jsonify,current_app
+from app.ml_models.predictor import diagnose,predict_batch,registry,model_version
 from app.models import db, SelfDiagnosis, DiabetesTest, HeartTest, KidneyTest, SelfDiagnosis
+from app.services.patient_links import patient_id_for
 from app.services.email_service import EmailService,send_help_notification, send_diagnosis_notification
-from app.utils.formatters import format_symptom
+from app.utils.formatters import split_symptoms
 from app.utils.decorators import patient_required
 
 tests = Blueprint('medical_test', __name__, url_prefix='/medical_test')
@@ -10,6 +12,22 @@ tests = Blueprint('medical_test', __name__, url_prefix='/medical_test')
 
 
 
+def resolve_symptoms(user_symptoms):
+    #map typed symptoms onto known ones, keeping corrections and suggestions for the user
+    resolved = []
+    corrections = {}
+    unresolved = []
+    for resolution in registry.get('symptom_resolver').resolve_all(user_symptoms):
+        if resolution.symptom is None:
+            unresolved.append({'input': resolution.text, 'suggestions': list(resolution.suggestions)})
+            continue
+        if resolution.corrected:
+            corrections[resolution.text] = resolution.symptom
+        if resolution.symptom not in resolved:
+            resolved.append(resolution.symptom)
+    return resolved, corrections, unresolved
+
+
 @tests.route('/dashboard')
 def index():
     return render_template('general/home.html')
@@ -22,12 +40,13 @@ def predict():
     med = []
     die = []
     work = []
+    ranked = []
 
     if request.method == 'POST':
         try:
             name = request.form.get('name')
             email = request.form.get('email')
-            symptoms = request.form.get('symptoms')
+            symptoms = request.form.get('typed_symptoms') or request.form.get('symptoms')
             
             print(f"DEBUG - Name: {name}")
             print(f"DEBUG - Email: {email}")
@@ -43,15 +62,23 @@ def predict():
                     dis_prec=my_prec,
                     dis_med=med,
                     dis_diet=die, 
-                    dis_work=work
+                    dis_work=work,
+                    dis_diff=ranked
                 )
             
-            #Format the symptoms
-            user_symptoms = [format_symptom(s.strip()) for s in symptoms.split(',')]
-            user_symptoms = [sym.strip("[]' ") for sym in user_symptoms if sym.strip()]
+            #Format the symptoms and resolve misspellings against the known symptoms
+            user_symptoms, corrections, unresolved = resolve_symptoms(split_symptoms(symptoms))
             
             print(f"DEBUG - Formatted Symptoms: {user_symptoms}")
             
+            for typed, symptom in corrections.items():
+                flash(f"Interpreted '{typed}' as '{symptom}'", "info")
+            for unknown in unresolved:
+                if unknown['suggestions']:
+                    flash(f"Symptom not found: '{unknown['input']}'. Did you mean: {', '.join(unknown['suggestions'])}?", "warning")
+                else:
+                    flash(f"Symptom not found: '{unknown['input']}'", "warning")
+            
             #Check if the symptoms are valid
             if not user_symptoms:
                 flash("No valid symptoms provided", "error")
@@ -62,17 +89,15 @@ def predict():
                     dis_prec=my_prec,
                     dis_med=med,
                     dis_diet=die, 
-                    dis_work=work
+                    dis_work=work,
+                    dis_diff=ranked
                 )
             
             #Make the prediction with:
-            print("DEBUG - Calling get_prediction...")
-            predicted_disease = get_prediction(user_symptoms)
+            print("DEBUG - Calling diagnose...")
+            predicted_disease, descr, prec, med, die, work, ranked = diagnose(user_symptoms)
             print(f"DEBUG - Predicted Disease: {predicted_disease}")
             
-            # Get the predicted disease information
-            print("DEBUG - Calling helper...")
-            descr, prec, med, die, work = helper(predicted_disease)
             print(f"DEBUG - Description: {descr[:100]}...")
             print(f"DEBUG - Precautions: {prec}")
             
@@ -94,7 +119,10 @@ def predict():
                         email=email,
                         diagnosis=predicted_disease,
                         description=descr,
-                        symptoms=symptoms
+                        symptoms=symptoms,
+                        model_version=model_version(),
+                        #a signed-in patient owns their own self-diagnosis
+                        patient_id=session['user_id'] if session.get('user_role') == 'patient' else patient_id_for(email, name)
                     )
                     db.session.add(diagnosis)
                     db.session.commit()
@@ -128,10 +156,78 @@ def predict():
         dis_prec=my_prec,
         dis_med=med,
         dis_diet=die, 
-        dis_work=work
+        dis_work=work,
+        dis_diff=ranked
     )
 
 
+@tests.route('/predict_batch', methods=['POST'])
+def predict_many():
+    #JSON array of symptom lists (or comma separated strings), scored in one model call
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        payload = payload.get('symptoms')
+
+    if not isinstance(payload, list):
+        return jsonify({'error': 'Expected a JSON array of symptom lists'}), 400
+
+    limit = current_app.config['PREDICT_BATCH_LIMIT']
+    if len(payload) > limit:
+        return jsonify({'error': f'At most {limit} symptom lists per request'}), 413
+
+    results = [None] * len(payload)
+    valid_rows = []
+    valid_symptoms = []
+    for i, entry in enumerate(payload):
+        if not isinstance(entry, (list, str)):
+            results[i] = {'error': 'Expected a list of symptoms'}
+            continue
+
+        user_symptoms, corrections, unresolved = resolve_symptoms(split_symptoms(entry))
+        if not user_symptoms:
+            results[i] = {'error': 'No valid symptoms provided', 'unresolved': unresolved}
+        else:
+            results[i] = {'corrections': corrections, 'unresolved': unresolved}
+            valid_rows.append(i)
+            valid_symptoms.append(user_symptoms)
+
+    try:
+        for i, result in zip(valid_rows, predict_batch(valid_symptoms)):
+            results[i].update(result)
+    except Exception as err:
+        current_app.logger.error(f"Batch prediction error: {str(err)}")
+        return jsonify({'error': str(err)}), 500
+
+    return jsonify({'results': results})
+
+
+@tests.route('/autocomplete')
+def autocomplete():
+    #keystroke suggestions for the symptom box; ?q=<prefix>&selected=<symptom>,<symptom>
+    prefix = request.args.get('q', '')
+    symptom_autocomplete = registry.get('symptom_autocomplete')
+    selected, _, _ = resolve_symptoms(split_symptoms(request.args.get('selected', '')))
+    limit = request.args.get('limit', symptom_autocomplete.limit, type=int) or symptom_autocomplete.limit
+    limit = max(1, min(limit, 50))
+
+    #answers only depend on the index and the normalised query, so the ETag is known up front
+    query_key = repr((prefix.strip().lower(), sorted(selected), limit)).encode()
+    etag = f"{symptom_autocomplete.version}-{hashlib.sha1(query_key).hexdigest()[:16]}"
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({
+            'query': prefix,
+            'selected': selected,
+            'suggestions': symptom_autocomplete.suggest(prefix, selected, limit)
+        })
+
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 3600
+    return response
+
+
 @tests.route('/mine')
 def Mine():
     diagnoses = []
@@ -146,15 +242,10 @@ def Mine():
             flash('Please login to view your diagnosis', 'warning')
             return redirect(url_for('auth.login'))
         
-        # Get ALL diagnoses by email OR by name
-        from sqlalchemy import or_
-        
-        diagnoses = SelfDiagnosis.query.filter(
-            or_(
-                SelfDiagnosis.email == email,
-                SelfDiagnosis.name == username
-            )
-        ).order_by(SelfDiagnosis.time.desc()).all()
+        #one range scan of the (patient_id, time) index
+        patient_id = session.get('user_id') if session.get('user_role') == 'patient' else patient_id_for(email, username)
+        diagnoses = SelfDiagnosis.query.filter_by(patient_id=patient_id).order_by(SelfDiagnosis.time.desc()).all() \
+            if patient_id is not None else []
         
         print(f"Found {len(diagnoses)} diagnosis records")
         
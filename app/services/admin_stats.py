@@ -0,0 +1,113 @@
+#Counts shown on the admin dashboard, in one query and cached => Admin Stats Service Module
+import threading
+import time
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from app.models import (db, Doctor, Patient, Admin, Appointment, BookedAppointment, Question,
+                        SelfDiagnosis, DiabetesTest, HeartTest, KidneyTest)
+
+
+#stat -> (model, only active accounts)
+COUNTED = {
+    'doctors': (Doctor, True),
+    'patients': (Patient, True),
+    'admins': (Admin, True),
+    'appointments': (Appointment, False),
+    'booked_appointments': (BookedAppointment, False),
+    'questions': (Question, False),
+    'self_diagnosis': (SelfDiagnosis, False),
+    'diabetes_tests': (DiabetesTest, False),
+    'heart_tests': (HeartTest, False),
+    'kidney_tests': (KidneyTest, False),
+}
+
+#summed into total_tests
+TEST_STATS = ['self_diagnosis', 'diabetes_tests', 'heart_tests', 'kidney_tests']
+
+COUNTED_TABLES = {model.__table__ for model, _ in COUNTED.values()}
+
+EMPTY_STATS = dict.fromkeys(list(COUNTED) + ['total_tests'], 0)
+
+
+def stats_query():
+    #one SELECT of scalar subqueries, so every count comes back in a single round trip
+    counts = []
+    for stat, (model, active_only) in COUNTED.items():
+        count = select(func.count()).select_from(model)
+        if active_only:
+            count = count.where(model.is_active.is_(True))
+        counts.append(count.scalar_subquery().label(stat))
+    return select(*counts)
+
+
+def compute_stats():
+    row = db.session.execute(stats_query()).one()
+    stats = dict(row._mapping)
+    stats['total_tests'] = sum(stats[stat] for stat in TEST_STATS)
+    return stats
+
+
+class StatsCache:
+    """The last computed stats, kept for `ttl` seconds or until a counted row is inserted or deleted.
+
+    Invalidation only reaches this process; other workers catch up within the TTL.
+    """
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._stats = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, compute=compute_stats):
+        stats, expires = self._stats, self._expires
+        if stats is not None and time.monotonic() < expires:
+            return stats
+
+        with self._lock:
+            if self._stats is not None and time.monotonic() < self._expires:
+                return self._stats
+            stats = compute()
+            self._stats, self._expires = stats, time.monotonic() + self.ttl
+            return stats
+
+    def invalidate(self):
+        with self._lock:
+            self._stats = None
+
+
+stats_cache = StatsCache()
+
+
+def dashboard_stats():
+    return dict(stats_cache.get()) if stats_cache.ttl > 0 else compute_stats()
+
+
+#Counted rows change on flush, but the counts only change for other sessions once the
+#transaction commits; the session remembers the change and the cache is cleared on commit.
+
+def _mark_changed(mapper, connection, target):
+    Session.object_session(target).info['admin_stats_changed'] = True
+
+
+def _mark_bulk_changed(orm_execute_state):
+    #session.execute(insert(Model), rows) and delete(Model) statements skip the mapper events
+    if orm_execute_state.is_insert or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if table in COUNTED_TABLES:
+            orm_execute_state.session.info['admin_stats_changed'] = True
+
+
+def _invalidate_on_commit(session):
+    if session.info.pop('admin_stats_changed', False):
+        stats_cache.invalidate()
+
+
+for _model, _ in COUNTED.values():
+    event.listen(_model, 'after_insert', _mark_changed)
+    event.listen(_model, 'after_delete', _mark_changed)
+event.listen(Session, 'do_orm_execute', _mark_bulk_changed)
+event.listen(Session, 'after_commit', _invalidate_on_commit)
+event.listen(Session, 'after_rollback', lambda session: session.info.pop('admin_stats_changed', None))
@@ -0,0 +1,103 @@
+#Streaming CSV/NDJSON exports of diagnosis and test records => Export Service Module
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app.models import db, SelfDiagnosis, DiabetesTest, HeartTest, KidneyTest, BookedAppointment
+
+
+#export name -> (model, timestamp column the date range filters on)
+EXPORTS = {
+    'self_diagnosis': (SelfDiagnosis, SelfDiagnosis.time),
+    'diabetes': (DiabetesTest, DiabetesTest.created_at),
+    'heart': (HeartTest, HeartTest.created_at),
+    'kidney': (KidneyTest, KidneyTest.created_at),
+    'appointments': (BookedAppointment, BookedAppointment.created_at),
+}
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def parse_date(value):
+    """A YYYY-MM-DD query/CLI value, or None when empty; raises ValueError otherwise"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def export_query(name, start=None, end=None):
+    #plain column rows rather than ORM objects, so nothing piles up in the session's identity map
+    model, timestamp = EXPORTS[name]
+    columns = list(model.__table__.columns)
+    query = select(*columns)
+    if start:
+        query = query.where(timestamp >= datetime.combine(start, datetime.min.time()))
+    if end:
+        #the end date is inclusive
+        query = query.where(timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return query.order_by(timestamp, model.id), [column.name for column in columns]
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([[_value(value) for value in row] for row in rows])
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows, names):
+    return ''.join(json.dumps(dict(zip(names, map(_value, row)))) + '\n' for row in rows)
+
+
+def iter_export(name, fmt='csv', start=None, end=None, batch_size=1000):
+    """Text chunks of an export, one per `batch_size` rows.
+
+    The rows come through a server-side cursor (yield_per), so memory stays
+    flat however large the table is. Needs an app context.
+    """
+    query, names = export_query(name, start, end)
+    if fmt == 'csv':
+        yield _csv_chunk([names])
+
+    result = db.session.execute(query.execution_options(yield_per=batch_size))
+    try:
+        for rows in result.partitions():
+            yield _csv_chunk(rows) if fmt == 'csv' else _ndjson_chunk(rows, names)
+    finally:
+        result.close()
+
+
+def encode(chunks, compress=False):
+    """Text chunks as UTF-8 bytes, optionally as one gzip stream compressed as it goes"""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode('utf-8')
+        return
+
+    #wbits=31 writes the gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_filename(name, fmt, start=None, end=None, compress=False):
+    parts = [name] + [day.isoformat() for day in (start, end) if day]
+    return '_'.join(parts) + f'.{fmt}' + ('.gz' if compress else '')
@@ -0,0 +1,69 @@
+#Links diagnosis, test and appointment records to patient accounts => Patient Links Service Module
+from sqlalchemy import func, or_, select, update
+
+from app.models import db, Patient, SelfDiagnosis, DiabetesTest, HeartTest, KidneyTest, BookedAppointment
+
+#record model -> (email column or None, name column), as the 7b2e4c9d1a35 backfill links them
+LINKED_RECORDS = {
+    SelfDiagnosis: ('email', 'name'),
+    DiabetesTest: (None, 'name'),
+    HeartTest: (None, 'name'),
+    KidneyTest: (None, 'name'),
+    BookedAppointment: ('email', 'patient'),
+}
+
+
+def _key(name):
+    return name.strip().lower() if name and name.strip() else None
+
+
+def patient_ids_by_name(names):
+    """{lowercased name: patient id} for the names matching exactly one patient's full name or username"""
+    keys = {key for key in map(_key, names) if key}
+    if not keys:
+        return {}
+
+    full_name = func.lower(Patient.fname + ' ' + Patient.lname)
+    username = func.lower(Patient.username)
+    rows = db.session.execute(
+        select(Patient.id, full_name, username).where(or_(full_name.in_(keys), username.in_(keys)))
+    ).all()
+
+    matches = {}
+    for patient_id, *patient_names in rows:
+        for key in keys.intersection(patient_names):
+            matches.setdefault(key, set()).add(patient_id)
+    #a name shared by two patients stays unlinked rather than guessed
+    return {key: ids.pop() for key, ids in matches.items() if len(ids) == 1}
+
+
+def patient_id_for(email=None, name=None):
+    """The patient with this email, else the one patient called `name`; None when there is none"""
+    if email and email.strip():
+        patient_id = db.session.scalar(select(Patient.id).where(Patient.email == email.strip()))
+        if patient_id is not None:
+            return patient_id
+    return patient_ids_by_name([name]).get(_key(name))
+
+
+def link_records(patient):
+    """Link the unlinked records made under this patient's email or name before they registered; returns the count"""
+    names = [patient.username]
+    if patient.fname and patient.lname:
+        names.append(f'{patient.fname} {patient.lname}')
+    #only names no other patient shares, like patient_id_for
+    names = [key for key, patient_id in patient_ids_by_name(names).items() if patient_id == patient.id]
+    email = patient.email.strip() if patient.email else None
+
+    linked = 0
+    for model, (email_column, name_column) in LINKED_RECORDS.items():
+        matches = [func.lower(func.trim(getattr(model, name_column))).in_(names)] if names else []
+        if email_column and email:
+            matches.append(func.trim(getattr(model, email_column)) == email)
+        if not matches:
+            continue
+        linked += db.session.execute(
+            update(model).where(model.patient_id.is_(None), or_(*matches)).values(patient_id=patient.id)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    return linked
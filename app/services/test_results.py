@@ -0,0 +1,45 @@
+#Bulk storage of scored doctor-test results => Test Results Service Module
+from sqlalchemy import insert
+from app.models import db, DiabetesTest, HeartTest, KidneyTest
+from app.services.patient_links import patient_ids_by_name
+
+
+#test -> (table, diagnosis column, {column: feature index}) for the fields the tables keep
+RESULT_TABLES = {
+    'diabetes': (DiabetesTest, 'diab_diagnosis', {'age': 7, 'insulin': 4}),
+    'heart': (HeartTest, 'heart_diagnosis', {'age': 0, 'cholestral': 4}),
+    'kidney': (KidneyTest, 'kidney_diagnosis', {'age': 0, 'blood_glucose': 5}),
+}
+
+
+def result_rows(test, records, doctor, model_version):
+    #table rows for scoring.ScoredChunk records
+    table, diagnosis_column, fields = RESULT_TABLES[test]
+    #one lookup for the whole chunk
+    patient_ids = patient_ids_by_name(record['name'] for record in records)
+    rows = []
+    for record in records:
+        row = {column: record['features'][i] for column, i in fields.items()}
+        row.update({
+            'name': record['name'] or 'Unknown',
+            diagnosis_column: record['diagnosis'],
+            'doctor': doctor,
+            'model_version': model_version,
+            'patient_id': patient_ids.get((record['name'] or '').strip().lower())
+        })
+        rows.append(row)
+    return rows
+
+
+def save_results(test, records, doctor, model_version):
+    """Insert scored records with one executemany INSERT and commit; returns the row count"""
+    if not records:
+        return 0
+    table = RESULT_TABLES[test][0]
+    try:
+        db.session.execute(insert(table), result_rows(test, records, doctor, model_version))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(records)
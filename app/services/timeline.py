@@ -0,0 +1,48 @@
+#A patient's self-diagnoses and doctor tests as one history => Timeline Service Module
+from sqlalchemy import String, cast, literal, null, select, union_all
+
+from app.models import db, SelfDiagnosis, DiabetesTest, HeartTest, KidneyTest
+
+
+#kind -> (model, timestamp, diagnosis column, doctor column or None)
+SOURCES = {
+    'self_diagnosis': (SelfDiagnosis, SelfDiagnosis.time, SelfDiagnosis.diagnosis, None),
+    'diabetes': (DiabetesTest, DiabetesTest.created_at, DiabetesTest.diab_diagnosis, DiabetesTest.doctor),
+    'heart': (HeartTest, HeartTest.created_at, HeartTest.heart_diagnosis, HeartTest.doctor),
+    'kidney': (KidneyTest, KidneyTest.created_at, KidneyTest.kidney_diagnosis, KidneyTest.doctor),
+}
+
+
+def _branch(kind, patient_id):
+    model, timestamp, diagnosis, doctor = SOURCES[kind]
+    return select(
+        literal(kind, String).label('kind'),
+        model.id.label('id'),
+        timestamp.label('at'),
+        diagnosis.label('diagnosis'),
+        (doctor if doctor is not None else cast(null(), String)).label('doctor'),
+        model.model_version.label('model_version'),
+    ).where(model.patient_id == patient_id)
+
+
+def timeline_query(patient_id, kinds=None):
+    """(query, keys) for pagination.keyset_page: the UNION ALL of the patient's rows in each table.
+
+    The keys are (at, kind, id), since ids repeat across tables. A page's
+    seek and order reach every branch, so the database reads each table
+    through its (patient_id, timestamp) index and merges them, stopping
+    once the page is full.
+    """
+    timeline = union_all(*[_branch(kind, patient_id) for kind in (kinds or SOURCES)]).subquery('timeline')
+    return db.session.query(timeline), (timeline.c.at, timeline.c.kind, timeline.c.id)
+
+
+def entry_json(row):
+    return {
+        'kind': row.kind,
+        'id': row.id,
+        'at': row.at.isoformat() if row.at else None,
+        'diagnosis': row.diagnosis,
+        'doctor': row.doctor,
+        'model_version': row.model_version,
+    }
@@ -0,0 +1,79 @@
+// What-if sensitivity curves for the doctor test forms (needs Chart.js)
+(function() {
+   const panel = document.getElementById('whatif');
+   if (!panel || typeof Chart === 'undefined') {
+      return;
+   }
+
+   const form = document.getElementById(panel.dataset.form);
+   const select = panel.querySelector('select');
+   const button = panel.querySelector('button');
+   const status = panel.querySelector('.whatif-status');
+   const canvas = panel.querySelector('canvas');
+   let chart = null;
+
+   function datasets(curve) {
+      const prediction = {
+         label: 'Prediction (1 = ' + curve.diagnoses['1'] + ')',
+         data: curve.predictions,
+         stepped: true,
+         borderColor: '#c0392b',
+         pointRadius: 0
+      };
+      if (curve.probabilities === null) {
+         return [prediction];
+      }
+      return [{
+         label: 'Probability',
+         data: curve.probabilities,
+         borderColor: '#2e86c1',
+         pointRadius: 0
+      }, prediction];
+   }
+
+   function draw(curve) {
+      if (chart) {
+         chart.destroy();
+      }
+      chart = new Chart(canvas, {
+         type: 'line',
+         data: {
+            labels: curve.values.map(function(value) { return +value.toFixed(2); }),
+            datasets: datasets(curve)
+         },
+         options: {
+            animation: false,
+            scales: {
+               x: { title: { display: true, text: curve.label } },
+               y: { min: 0, max: 1 }
+            }
+         }
+      });
+
+      let text = 'Current ' + curve.feature + ' = ' + curve.current.value + ': ' + curve.current.diagnosis;
+      if (curve.thresholds.length) {
+         text += '. Diagnosis changes at ' + curve.thresholds.map(function(value) { return value.toFixed(2); }).join(', ');
+      }
+      status.textContent = text;
+   }
+
+   button.addEventListener('click', function() {
+      const patient = Object.fromEntries(new FormData(form).entries());
+      status.textContent = 'Scoring...';
+
+      fetch(panel.dataset.url, {
+         method: 'POST',
+         headers: { 'Content-Type': 'application/json' },
+         body: JSON.stringify({ patient: patient, feature: select.value, points: 200 })
+      })
+         .then(function(response) { return response.json(); })
+         .then(function(curve) {
+            if (curve.error) {
+               status.textContent = curve.errors ? curve.errors.join('; ') : curve.error;
+               return;
+            }
+            draw(curve);
+         })
+         .catch(function(err) { status.textContent = 'Error: ' + err; });
+   });
+})();
@@ -0,0 +1,36 @@
+// Symptom autocomplete for the AI doctor form
+(function() {
+   const input = document.getElementById('typed_symptoms');
+   const list = document.getElementById('symptom-suggestions');
+   if (!input || !list) {
+      return;
+   }
+
+   const url = input.dataset.autocompleteUrl;
+   let pending = null;
+
+   input.addEventListener('input', function() {
+      const parts = input.value.split(',');
+      const prefix = parts.pop().trim();
+      const selected = parts.map(function(part) { return part.trim(); }).filter(Boolean);
+
+      if (pending) {
+         pending.abort();
+      }
+      pending = new AbortController();
+
+      const params = new URLSearchParams({ q: prefix, selected: selected.join(',') });
+      fetch(url + '?' + params.toString(), { signal: pending.signal })
+         .then(function(response) { return response.json(); })
+         .then(function(data) {
+            const head = selected.length ? selected.join(', ') + ', ' : '';
+            list.innerHTML = '';
+            data.suggestions.forEach(function(suggestion) {
+               const option = document.createElement('option');
+               option.value = head + suggestion.label;
+               list.appendChild(option);
+            });
+         })
+         .catch(function() {});
+   });
+})();
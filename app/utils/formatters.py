@@ -5,14 +5,22 @@ def format_symptom(symptom):
     return symptom.lower().replace(" ","_")
 
 
+def split_symptoms(symptoms):
+    #accept a comma separated string or a list of symptoms and return symptoms_dict keys
+    if isinstance(symptoms, str):
+        symptoms = symptoms.split(',')
+    user_symptoms = [format_symptom(str(s).strip()) for s in symptoms]
+    return [sym.strip("[]' ") for sym in user_symptoms if sym.strip()]
+
+
 
 
 def yes_no_into_binary(value):
     #convert yes/no to 1/0 and  return 0 for empty input
-    return 1 if value.lower=="yes" else 0
+    return 1 if str(value or "").strip().lower()=="yes" else 0
 
 
 
 def sex_to_binary(value):
-    #convert yes/no to 1/0 and  return 0 for empty input
-    return 1 if value.lower=="male" else 0
\ No newline at end of file
+    #convert male/female to 1/0 and  return 0 for empty input
+    return 1 if str(value or "").strip().lower()=="male" else 0
\ No newline at end of file
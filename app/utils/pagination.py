@@ -0,0 +1,121 @@
+#Keyset (seek) pagination for record listings
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from flask import current_app, request
+from sqlalchemy import and_, func, literal, tuple_
+
+
+class Page(NamedTuple):
+    items: list
+    limit: int
+    next_cursor: Optional[str]    #rows further down the order (older, or later names), None on the last page
+    prev_cursor: Optional[str]    #rows back up the order, None on the first page
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """Key values from a cursor; raises ValueError on anything malformed"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as err:
+        raise ValueError("Invalid page cursor") from err
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise ValueError("Invalid page cursor")
+
+    decoded = []
+    for key, value in zip(keys, values):
+        python_type = key.type.python_type
+        if value is None:
+            #a NULL key has no place in the order; see keyset_page
+            raise ValueError("Invalid page cursor")
+        try:
+            value = datetime.fromisoformat(value) if python_type is datetime else python_type(value)
+        except (TypeError, ValueError) as err:
+            raise ValueError("Invalid page cursor") from err
+        decoded.append(value)
+    return decoded
+
+
+def _seek(keys, values, below):
+    #a row-value comparison, (created_at, id) < (:created_at, :id), which the index on the keys can answer
+    if len(keys) == 1:
+        return keys[0] < values[0] if below else keys[0] > values[0]
+    left = tuple_(*keys)
+    right = tuple_(*[literal(value, key.type) for key, value in zip(keys, values)])
+    #the redundant bound on the first key lets SQLite seek an index on expressions such as coalesce()
+    first = literal(values[0], keys[0].type)
+    if below:
+        return and_(keys[0] <= first, left < right)
+    return and_(keys[0] >= first, left > right)
+
+
+def keyset_page(query, keys, after=None, before=None, limit=50, descending=True):
+    """One page of `query` ordered by `keys`, descending (newest first) by default.
+
+    The last key must be unique (the primary key) so every row has one
+    place in the order. NULL has no place in it, so nullable keys go in
+    through sort_key(), and every listed row must carry each key's value
+    under the key's name (a column attribute or a labelled column). `after`
+    continues past a page's last row, `before` goes back from a page's
+    first row. Either way the database seeks straight to the page through
+    the index on the keys, so the cost does not depend on how deep the page
+    is.
+    """
+    cursor = after or before
+    if cursor:
+        #onwards in a descending order means smaller keys
+        query = query.filter(_seek(keys, decode_cursor(cursor, keys), below=bool(after) == descending))
+
+    onwards = [key.desc() if descending else key.asc() for key in keys]
+    backwards = [key.asc() if descending else key.desc() for key in keys]
+    if before:
+        #walk backwards in the opposite order, then flip the page back
+        rows = query.order_by(*backwards).limit(limit + 1).all()
+        more = len(rows) > limit
+        items = rows[:limit][::-1]
+    else:
+        rows = query.order_by(*onwards).limit(limit + 1).all()
+        more = len(rows) > limit
+        items = rows[:limit]
+
+    def key_of(item):
+        return encode_cursor([getattr(item, key.key) for key in keys])
+
+    has_older = more if not before else bool(items)
+    has_newer = bool(cursor) and bool(items) if not before else more
+    return Page(
+        items, limit,
+        key_of(items[-1]) if items and has_older else None,
+        key_of(items[0]) if items and has_newer else None,
+    )
+
+
+def sort_key(column, name):
+    """`column` with NULL sorted as '', labelled `name`; select it (and the other keys) with the query's entity"""
+    return func.coalesce(column, '').label(name)
+
+
+def page_args():
+    """(after, before, limit) from the query string, with the limit clamped to RECORDS_PAGE_MAX"""
+    try:
+        limit = int(request.args.get('limit', current_app.config['RECORDS_PAGE_SIZE']))
+    except ValueError:
+        limit = current_app.config['RECORDS_PAGE_SIZE']
+    limit = max(1, min(limit, current_app.config['RECORDS_PAGE_MAX']))
+    return request.args.get('after'), request.args.get('before'), limit
+
+
+def paginate(query, keys, descending=True):
+    """The page the request asks for; a bad cursor falls back to the first page"""
+    after, before, limit = page_args()
+    try:
+        return keyset_page(query, keys, after, before, limit, descending)
+    except ValueError:
+        return keyset_page(query, keys, limit=limit, descending=descending)
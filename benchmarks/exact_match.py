@@ -0,0 +1,52 @@
+"""Replay Training.csv through the bitset exact-match table and the model.
+
+Run from the project root with:  python -m benchmarks.exact_match
+"""
+import time
+
+import numpy as np
+
+from app.ml_models.bitset import ExactMatchTable
+from app.ml_models.loader import registry, training
+from app.ml_models.predictor import DIFFERENTIAL_SIZE, _predict_differential, _ranked, disease_labels, symptoms_dict
+
+
+def per_call(func, items):
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - start) / len(items)
+
+
+def main():
+    X = training.drop(columns=['prognosis']).values
+    names = list(symptoms_dict)
+    replay = [[names[i] for i in np.flatnonzero(row)] for row in X]
+
+    #fresh table so the counters only reflect this replay
+    table = ExactMatchTable.from_training(X, [disease_labels[name] for name in training['prognosis']])
+    original = registry.get('exact_matches')
+    registry.put('exact_matches', table)
+    try:
+        with_table = per_call(_predict_differential, replay)
+    finally:
+        registry.put('exact_matches', original)
+
+    def model_only(symptoms):
+        vector = np.zeros((1, len(symptoms_dict)))
+        vector[0, [symptoms_dict[item] for item in symptoms]] = 1
+        return _ranked(vector, DIFFERENTIAL_SIZE)[0]
+
+    without_table = per_call(model_only, replay)
+
+    stats = table.stats()
+    print(f"training rows replayed : {len(replay)}")
+    print(f"distinct symptom sets  : {stats['entries']}")
+    print(f"hit rate               : {stats['hit_rate'] * 100:.1f}%")
+    print(f"model only             : {without_table * 1e6:8.1f} us/prediction")
+    print(f"exact-match table      : {with_table * 1e6:8.1f} us/prediction")
+    print(f"speedup                : {without_table / with_table:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""PSS/USS report for gunicorn workers, with and without master preload.
+
+    python -m benchmarks.gunicorn_memory report [pidfile]   # running server
+    python -m benchmarks.gunicorn_memory compare [workers]  # starts gunicorn twice
+
+PSS splits shared pages between the processes mapping them, and USS is
+what a worker holds alone (what killing it would free). With preload_app and
+gc.freeze() the models live in the master and USS per worker should stay
+well below the per-worker-load numbers. Linux only.
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.worker_rss import memory_kb
+
+project_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+def worker_pids(master_pid):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def role(pid, master_pid):
+    if pid == master_pid:
+        return 'master'
+    with open(f"/proc/{pid}/cmdline", 'rb') as f:
+        #the shared inference server (INFERENCE_SOCKET) is a child of the master too
+        return 'infer' if b'app.ml_models.inference' in f.read() else 'worker'
+
+
+def report(master_pid):
+    rows = [(pid, role(pid, master_pid), memory_kb(pid)) for pid in [master_pid] + worker_pids(master_pid)]
+    print(f"{'pid':>8} {'role':7} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}")
+    for pid, kind, usage in rows:
+        print(f"{pid:8} {kind:7} {usage['Rss'] / 1024:8.1f} {usage['Pss'] / 1024:8.1f} {usage['Uss'] / 1024:8.1f}")
+
+    workers = [usage for _, kind, usage in rows if kind == 'worker']
+    total_pss = sum(usage['Pss'] for _, _, usage in rows) / 1024
+    mean_uss = sum(usage['Uss'] for usage in workers) / len(workers) / 1024 if workers else 0.0
+    print(f"total PSS {total_pss:.1f} MB, mean worker USS {mean_uss:.1f} MB")
+    return total_pss, mean_uss
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_settled(master_pid, workers, timeout=60):
+    #workers are ready once they all exist and their memory stops growing
+    deadline = time.time() + timeout
+    previous = None
+    while time.time() < deadline:
+        time.sleep(1)
+        try:
+            pids = [pid for pid in worker_pids(master_pid) if role(pid, master_pid) == 'worker']
+            current = sum(memory_kb(pid)['Rss'] for pid in pids)
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+        if len(pids) == workers and current == previous:
+            return
+        previous = current
+    raise RuntimeError("gunicorn workers did not settle")
+
+
+def run(preload, workers):
+    pidfile = os.path.join(project_root, f".gunicorn-memory-{os.getpid()}.pid")
+    env = dict(os.environ, GUNICORN_PRELOAD='true' if preload else 'false')
+    if not preload:
+        #without preload each worker loads the same set for itself
+        env['MODEL_PRELOAD'] = 'all'
+
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py', '-w', str(workers),
+         '-b', f"127.0.0.1:{_free_port()}", '--pid', pidfile,
+         '--error-logfile', '-', '--access-logfile', '-', 'wsgi:app'],
+        cwd=project_root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        _wait_until_settled(server.pid, workers)
+        print(f"\npreload_app={preload}")
+        return report(server.pid)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait()
+        if os.path.exists(pidfile):
+            os.remove(pidfile)
+
+
+def compare(workers=4):
+    per_worker_pss, per_worker_uss = run(False, workers)
+    preload_pss, preload_uss = run(True, workers)
+    print(f"\ntotal PSS        : {per_worker_pss:8.1f} MB -> {preload_pss:8.1f} MB")
+    print(f"mean worker USS  : {per_worker_uss:8.1f} MB -> {preload_uss:8.1f} MB")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else 'report'
+    if command == 'compare':
+        compare(int(argv[1]) if len(argv) > 1 else 4)
+    else:
+        pidfile = argv[1] if len(argv) > 1 else os.path.join(project_root, 'gunicorn.pid')
+        with open(pidfile) as f:
+            report(int(f.read().strip()))
+
+
+if __name__ == '__main__':
+    main()
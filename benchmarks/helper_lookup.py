@@ -0,0 +1,62 @@
+"""Compare the old pandas helper() with the precompiled knowledge index.
+
+Run from the project root with:  python -m benchmarks.helper_lookup
+"""
+import ast
+import time
+
+from app.ml_models.loader import description, precaution, medication, diet, workout, knowledge_index
+from app.ml_models.predictor import helper
+
+
+#the helper() implementation that scanned the DataFrames on every call
+def legacy_helper(dis):
+    descr = description[description['Disease'] == dis]['Description']
+    descr = " ".join([w for w in descr])
+
+    prec = precaution[precaution['Disease'] == dis][['Precaution_1', 'Precaution_2', 'Precaution_3', 'Precaution_4']]
+    prec = [col for col in prec.values]
+
+    med_string = medication[medication['Disease'] == dis]['Medication'].values[0]
+    med = ast.literal_eval(med_string)
+
+    die_string = diet[diet['Disease'] == dis]['Diet'].values[0]
+    die = ast.literal_eval(die_string)
+
+    work = workout[workout['disease'] == dis]['workout']
+
+    return descr, prec, med, die, work
+
+
+def time_per_call(func, diseases, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for dis in diseases:
+            func(dis)
+    return (time.perf_counter() - start) / (rounds * len(diseases))
+
+
+def main(rounds=20):
+    diseases = list(description['Disease'])
+
+    #both paths must agree before their timings mean anything; the legacy
+    #scan comes back empty where a table spells the name differently
+    for dis in diseases:
+        old = legacy_helper(dis)
+        new = helper(dis)
+        for old_value, new_value in zip(old[2:], new[2:]):
+            if len(old_value):
+                assert list(old_value) == list(new_value), dis
+        assert old[0] == new[0], dis
+
+    old = time_per_call(legacy_helper, diseases, rounds)
+    new = time_per_call(helper, diseases, rounds)
+
+    print(f"diseases indexed : {len(knowledge_index)}")
+    print(f"legacy helper    : {old * 1e6:10.1f} us/call")
+    print(f"indexed helper   : {new * 1e6:10.1f} us/call")
+    print(f"speedup          : {old / new:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
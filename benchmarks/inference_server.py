@@ -0,0 +1,75 @@
+"""Single-row predictions from many processes: in-process model vs the shared server.
+
+Each client process replays Training.csv rows one at a time, as gunicorn
+workers do. Against the inference server their requests are batched
+together; the batch statistics show how full those batches get.
+
+Run from the project root with:  python -m benchmarks.inference_server [clients]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app.ml_models.inference import InferenceClient, InferenceServer
+from app.ml_models.loader import registry
+
+ROWS_PER_CLIENT = 500
+
+
+def _rows():
+    return registry.get('training').drop(columns=['prognosis']).values.astype(np.float64)
+
+
+def _client(path, offset, results):
+    X = _rows()
+    model = InferenceClient(path) if path else registry.get('svc_native')
+    predict = (lambda row: model.predict('svc_native', row)) if path else model.predict
+
+    start = time.perf_counter()
+    for i in range(ROWS_PER_CLIENT):
+        predict(X[(offset + i) % len(X)])
+    results.put(time.perf_counter() - start)
+
+
+def run(path, clients):
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=_client, args=(path, n * ROWS_PER_CLIENT, results))
+             for n in range(clients)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    wall = time.perf_counter() - start
+    per_call = np.mean([results.get() for _ in procs]) / ROWS_PER_CLIENT
+    return wall, per_call
+
+
+def main(clients=8):
+    path = os.path.join(tempfile.mkdtemp(), 'inference.sock')
+    registry.preload(['svc_native', 'training'], background=False)
+    server = InferenceServer(path, registry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    local_wall, local_call = run(None, clients)
+    remote_wall, remote_call = run(path, clients)
+    stats = server.stats()['svc_native/predict/0']
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+
+    total = clients * ROWS_PER_CLIENT
+    print(f"{clients} clients x {ROWS_PER_CLIENT} single-row predictions")
+    print(f"in-process       : {local_call * 1e6:8.1f} us/call   {total / local_wall:8.0f} rows/s (each client holds a model)")
+    print(f"inference server : {remote_call * 1e6:8.1f} us/call   {total / remote_wall:8.0f} rows/s (one model)")
+    print(f"server batches   : {stats['batches']} for {stats['rows']} rows, "
+          f"mean {stats['mean_batch_size']:.1f}, largest {stats['largest_batch']}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8)
@@ -0,0 +1,71 @@
+"""Compare sklearn's svc.predict with the NumPy-native decision function.
+
+Run from the project root with:  python -m benchmarks.native_svc
+
+Passes (exit 0) when every training row predicts the same and the native
+model is at least as fast as svc.predict both one row at a time and on
+the whole of Training.csv in one batch. Each figure is the median of
+`repeat` runs, so one slow run on a busy machine does not fail it.
+"""
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from app.ml_models.loader import project_root
+from app.ml_models.native import NativeSVC, check_parity
+
+
+def time_per_call(func, rows, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for row in rows:
+            func(row)
+    return (time.perf_counter() - start) / (rounds * len(rows))
+
+
+def median_per_call(func, rows, rounds, repeat):
+    return float(np.median([time_per_call(func, rows, rounds) for _ in range(repeat)]))
+
+
+def main(rounds=3, repeat=5):
+    with open(os.path.join(project_root, "models/svc.pkl"), 'rb') as f:
+        svc = pickle.load(f)
+    training = pd.read_csv(os.path.join(project_root, "datasets/Training.csv"))
+    X = training.drop(columns=['prognosis']).values.astype(np.float64)
+    native = NativeSVC.from_svc(svc)
+
+    #svc was fitted on a DataFrame; plain arrays are what serving passes it too
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+    mismatches = check_parity(native, svc, X)
+    assert not len(mismatches), f"{len(mismatches)} rows disagree"
+
+    single_rows = [X[i:i + 1] for i in range(0, len(X), 10)]
+    sk_single = median_per_call(svc.predict, single_rows, rounds, repeat)
+    np_single = median_per_call(native.predict, single_rows, rounds, repeat)
+
+    sk_batch = median_per_call(svc.predict, [X], rounds, repeat)
+    np_batch = median_per_call(native.predict, [X], rounds, repeat)
+
+    print(f"parity           : all {len(X)} training rows match")
+    print(f"single row       : sklearn {sk_single * 1e6:8.1f} us   numpy {np_single * 1e6:8.1f} us"
+          f"   ({sk_single / np_single:.1f}x)")
+    print(f"batch of {len(X)} : sklearn {sk_batch * 1e3:8.1f} ms   numpy {np_batch * 1e3:8.1f} ms"
+          f"   ({sk_batch / np_batch:.1f}x)")
+
+    slower = [name for name, sk, np_ in (('single row', sk_single, np_single), ('batch', sk_batch, np_batch))
+              if np_ > sk]
+    if slower:
+        print(f"\nnumpy is slower than sklearn: {', '.join(slower)}")
+        return 1
+    print("\npass")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,333 @@
+"""Latency suite for the ML serving path, with JSON baselines.
+
+    python -m benchmarks.suite run [--only NAME ...] [--output FILE] [--save]
+    python -m benchmarks.suite compare [BASELINE] [CURRENT] [--threshold 0.25] [--p99-threshold 0.5]
+
+`run` replays real inputs from the datasets through get_prediction,
+helper(), the three doctor-test predictors, the loader import and the
+model loads, and prints p50/p99 per case. Each case runs --repeat times
+and reports the median of each figure over the runs, so one slow or one
+lucky run moves nothing. --save writes the results as this machine's
+baseline, benchmarks/baselines/serving-<machine>.json (--output anywhere
+else).
+
+`compare` checks a run against a baseline (running the suite now when no
+CURRENT file is given). Cases whose p50 or p99 grew by more than the
+threshold are run again, and compare exits 1 only for those that regress
+a second time. Timings from one machine say nothing about another, so
+without a BASELINE argument compare uses this machine's own baseline and
+exits 2 when there is none yet: record one with `run --save` on the
+hardware that serves the app.
+
+Everything runs offline on one core in under a minute.
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.ml_models.loader import project_root
+
+BASELINES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+DOCTOR_DATASETS = {
+    'heart': "heart_disease_data.csv",
+    'diabetes': "diabetes.csv",
+    'kidney': "kidney Dataset.csv",
+}
+
+
+def _dataset(filename):
+    return pd.read_csv(os.path.join(project_root, "datasets", filename))
+
+
+def sample(func, inputs, rounds=1, warmup=1, block=1):
+    """Nanoseconds per call of func(x) over inputs, `rounds` times over.
+
+    With block > 1 each timing is the mean of that many consecutive calls,
+    for functions too fast to time one call at a time.
+    """
+    for x in inputs[:warmup]:
+        func(x)
+    blocks = [inputs[i:i + block] for i in range(0, len(inputs), block)]
+    timings = []
+    perf_counter_ns = time.perf_counter_ns
+    for _ in range(rounds):
+        for chunk in blocks:
+            start = perf_counter_ns()
+            for x in chunk:
+                func(x)
+            timings.append((perf_counter_ns() - start) / len(chunk))
+    return timings
+
+
+def summarize(timings):
+    us = np.asarray(timings, dtype=np.float64) / 1000.0
+    return {
+        'n': len(us),
+        'p50_us': float(np.percentile(us, 50)),
+        'p99_us': float(np.percentile(us, 99)),
+        'mean_us': float(us.mean()),
+        'min_us': float(us.min()),
+    }
+
+
+#each case returns a list of per-call timings in ns
+
+def symptom_sets():
+    """Distinct symptom lists of Training.csv, and unseen variants with one symptom dropped"""
+    from app.ml_models.predictor import symptoms_dict
+
+    training = _dataset("Training.csv").drop(columns=['prognosis'])
+    names = {i: name for name, i in symptoms_dict.items()}
+    rows = np.unique(training.values, axis=0)
+    known = [[names[i] for i in np.flatnonzero(row)] for row in rows]
+
+    seen = {frozenset(symptoms) for symptoms in known}
+    unseen = [symptoms[:-1] for symptoms in known
+              if len(symptoms) > 1 and frozenset(symptoms[:-1]) not in seen]
+    return known, unseen
+
+
+def case_get_prediction(rounds):
+    from app.ml_models.predictor import get_prediction, prediction_cache
+
+    known, unseen = symptom_sets()
+    results = {}
+    maxsize = prediction_cache.maxsize
+    try:
+        #the serving path as deployed: repeated symptom sets come from the cache
+        prediction_cache.resize(4096)
+        results['get_prediction/cached'] = sample(get_prediction, known, rounds)
+
+        prediction_cache.resize(0)
+        prediction_cache.clear()
+        #exact training combinations: table lookup plus helper()
+        results['get_prediction/exact'] = sample(get_prediction, known, rounds)
+        #combinations the table has never seen go through the svc ranking
+        results['get_prediction/model'] = sample(get_prediction, unseen, rounds)
+    finally:
+        prediction_cache.resize(maxsize)
+    return results
+
+
+def case_helper(rounds):
+    from app.ml_models.predictor import helper
+
+    diseases = list(_dataset("description.csv")['Disease'])
+    return {'helper': sample(helper, diseases * 10, rounds * 20, block=10)}
+
+
+def case_doctor_tests(rounds):
+    from app.ml_models.loader import registry
+    from app.ml_models.schemas import SCHEMAS
+
+    results = {}
+    for test, filename in DOCTOR_DATASETS.items():
+        schema = SCHEMAS[test]
+        model = registry.get(schema.model)
+        records = _dataset(filename)[schema.names].to_dict('records')
+
+        #what the form route does for one patient
+        results[f"{test}/form"] = sample(lambda record: model.predict(schema.from_form(record)), records, rounds)
+        #a whole dataset as one JSON/CSV batch
+        results[f"{test}/batch"] = sample(
+            lambda batch: model.predict(schema.from_records(batch).X), [records], rounds * 70
+        )
+    return results
+
+
+def case_loader_import(rounds):
+    #fresh interpreters, timing only the import itself
+    code = ("import time; start = time.perf_counter_ns(); import app.ml_models.loader; "
+            "print(time.perf_counter_ns() - start)")
+    timings = []
+    for _ in range(max(3, rounds)):
+        out = subprocess.run([sys.executable, '-c', code], cwd=project_root, capture_output=True, text=True, check=True)
+        timings.append(int(out.stdout.strip().splitlines()[-1]))
+    return {'loader/import': timings}
+
+
+def case_model_load(rounds):
+    from app.ml_models.artifacts import load_model
+    from app.ml_models.loader import MODELS, model_format, registry
+
+    directory = registry.get('model_release').directory
+    return {f"model_load/{name}": sample(lambda artifact: load_model(directory, artifact, model_format),
+                                         [artifact], rounds * 10)
+            for name, artifact in MODELS.items()}
+
+
+CASES = {
+    'get_prediction': case_get_prediction,
+    'helper': case_helper,
+    'doctor_tests': case_doctor_tests,
+    'loader_import': case_loader_import,
+    'model_load': case_model_load,
+}
+
+
+def cpu_model():
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def machine():
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu': cpu_model(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+    }
+
+
+def baseline_path(info=None):
+    """benchmarks/baselines/serving-<cpu>-<n>cpu.json for the machine described by `info` (default: this one)"""
+    info = info or machine()
+    tag = re.sub(r'[^a-z0-9]+', '-', re.sub(r'\(r\)|\(tm\)|\bcpu\b', '', info['cpu'].lower())).strip('-')
+    return os.path.join(BASELINES, f"serving-{tag}-{info['cpus']}cpu.json")
+
+
+def typical(runs):
+    #the median run: noise on a shared CPU runs both ways, from neighbours stealing time to turbo bursts
+    merged = dict(runs[0])
+    for stat in ('p50_us', 'p99_us', 'mean_us', 'min_us'):
+        merged[stat] = float(np.median([stats[stat] for stats in runs]))
+    merged['repeats'] = len(runs)
+    return merged
+
+
+def run(only=None, rounds=3, repeat=5):
+    #repeats go round the whole suite, so a slow spell of the machine lands on one run of each case at most
+    runs = {}
+    for _ in range(repeat):
+        for name, case in CASES.items():
+            if only and name not in only:
+                continue
+            for key, timings in case(rounds).items():
+                runs.setdefault(key, []).append(dict(summarize(timings), case=name))
+
+    results = {}
+    for key, summaries in runs.items():
+        results[key] = stats = typical(summaries)
+        print(f"{key:28} n={stats['n']:6}  p50 {stats['p50_us']:10.1f} us  p99 {stats['p99_us']:10.1f} us")
+    return {'created': datetime.now().isoformat(timespec='seconds'), 'machine': machine(), 'results': results}
+
+
+def compare(baseline, current, threshold=0.25, p99_threshold=0.5, min_delta_us=2.0):
+    """Printed table of changes; returns the regressed (case, stat) pairs.
+
+    A change smaller than min_delta_us is timer noise, whatever its ratio.
+    """
+    if baseline['machine'] != current['machine']:
+        print(f"warning: baseline recorded on {baseline['machine']}, comparing on {current['machine']}")
+
+    regressions = []
+    print(f"{'case':28} {'p50 base':>10} {'p50 now':>10} {'change':>8}   {'p99 base':>10} {'p99 now':>10} {'change':>8}")
+    for key, base in sorted(baseline['results'].items()):
+        now = current['results'].get(key)
+        if now is None:
+            print(f"{key:28} not in this run")
+            continue
+
+        cells = []
+        for stat, limit in (('p50_us', threshold), ('p99_us', p99_threshold)):
+            change = now[stat] / base[stat] - 1.0 if base[stat] else 0.0
+            flag = ' '
+            if change > limit and now[stat] - base[stat] > min_delta_us:
+                regressions.append((key, stat))
+                flag = '!'
+            cells.append(f"{base[stat]:10.1f} {now[stat]:10.1f} {change:+7.0%}{flag}")
+        print(f"{key:28} " + '   '.join(cells))
+
+    for key in sorted(set(current['results']) - set(baseline['results'])):
+        print(f"{key:28} new, no baseline")
+    return regressions
+
+
+def _write(path, report):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {path}")
+
+
+def _read(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the suite')
+    run_parser.add_argument('--only', nargs='+', choices=list(CASES))
+    run_parser.add_argument('--rounds', type=int, default=3, help='passes over the inputs per run')
+    run_parser.add_argument('--repeat', type=int, default=5, help='runs per case; the median counts')
+    run_parser.add_argument('--output', help='write the results to this JSON file')
+    run_parser.add_argument('--save', action='store_true', help=f'write the results as the baseline ({baseline_path()})')
+
+    compare_parser = commands.add_parser('compare', help='fail on p50/p99 regressions against a baseline')
+    compare_parser.add_argument('baseline', nargs='?', help="baseline file; this machine's own by default")
+    compare_parser.add_argument('current', nargs='?', help='results file; runs the suite when omitted')
+    compare_parser.add_argument('--rounds', type=int, default=3)
+    compare_parser.add_argument('--repeat', type=int, default=5)
+    compare_parser.add_argument('--threshold', type=float, default=0.25, help='allowed p50 growth (0.25 = 25%%)')
+    compare_parser.add_argument('--p99-threshold', type=float, default=0.5, help='allowed p99 growth')
+    compare_parser.add_argument('--min-delta-us', type=float, default=2.0, help='ignore smaller absolute changes')
+
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.command == 'run':
+        report = run(args.only, args.rounds, args.repeat)
+        if args.output:
+            _write(args.output, report)
+        if args.save:
+            _write(baseline_path(), report)
+        return 0
+
+    path = args.baseline or baseline_path()
+    if not os.path.exists(path):
+        print(f"no baseline for this machine at {path}; record one with `python -m benchmarks.suite run --save`")
+        return 2
+    baseline = _read(path)
+    current = _read(args.current) if args.current else run(rounds=args.rounds, repeat=args.repeat)
+    print()
+    limits = (args.threshold, args.p99_threshold, args.min_delta_us)
+    regressions = compare(baseline, current, *limits)
+    if regressions and not args.current:
+        #a regression has to show up again in a fresh run of its case before it fails the check
+        cases = {current['results'][key]['case'] for key, _ in regressions}
+        print(f"\nrunning {', '.join(sorted(cases))} again to confirm")
+        again = run(cases, rounds=args.rounds, repeat=args.repeat)
+        print()
+        retried = dict(baseline, results={key: baseline['results'][key] for key in again['results']
+                                          if key in baseline['results']})
+        confirmed = set(compare(retried, again, *limits))
+        regressions = [regression for regression in regressions if regression in confirmed]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): " + ', '.join(f"{key} {stat[:3]}" for key, stat in regressions))
+        return 1
+    print("\nno regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Per-worker memory with pickled models versus memory-mapped artifacts.
+
+Starts several worker-like processes that import the model loader, holds
+them alive together and reads RSS/PSS/USS from /proc (Linux only). PSS
+splits shared pages between the processes mapping them, so it is the
+number that shows what page-cache sharing saves.
+
+Run from the project root with:  python -m benchmarks.worker_rss [workers]
+(convert the models first with python -m app.ml_models.artifacts)
+"""
+import os
+import subprocess
+import sys
+
+WORKER = (
+    "import sys, warnings; warnings.filterwarnings('ignore');"
+    "import app.ml_models.predictor;"
+    "print('ready', flush=True); sys.stdin.read()"
+)
+
+
+def memory_kb(pid):
+    #RSS and PSS come from smaps_rollup; USS is the private part of the mapping
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                usage[parts[0].rstrip(':')] = int(parts[1])
+    usage['Uss'] = usage.get('Private_Clean', 0) + usage.get('Private_Dirty', 0)
+    return usage
+
+
+def measure(model_format, workers):
+    env = dict(os.environ, MODEL_FORMAT=model_format)
+    procs = [subprocess.Popen([sys.executable, '-c', WORKER], env=env,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    try:
+        for proc in procs:
+            proc.stdout.readline()
+        samples = [memory_kb(proc.pid) for proc in procs]
+    finally:
+        for proc in procs:
+            proc.stdin.close()
+            proc.wait()
+
+    return {key: sum(sample[key] for sample in samples) / len(samples) / 1024
+            for key in ('Rss', 'Pss', 'Uss')}
+
+
+def main(workers=4):
+    print(f"{'format':8} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}   (mean of {workers} workers)")
+    for model_format in ('pickle', 'mmap'):
+        usage = measure(model_format, workers)
+        print(f"{model_format:8} {usage['Rss']:8.1f} {usage['Pss']:8.1f} {usage['Uss']:8.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 4)
@@ -1,4 +1,6 @@
+import gc
 import multiprocessing
+import os
 
 # Server socket
 bind = "0.0.0.0:8000"
@@ -11,6 +13,23 @@ worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Load the app, models and knowledge tables once in the master and fork
+# workers from it, so they share those pages copy-on-write instead of each
+# holding a private copy. GUNICORN_PRELOAD=false loads per worker instead.
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# INFERENCE_SOCKET=/path/to.sock runs one inference server for the node and
+# workers send it their predictions instead of loading the models at all
+inference_socket = os.environ.get('INFERENCE_SOCKET', '')
+
+# METRICS_DIR=/path collects model latency metrics from every worker (and
+# the inference server) for /metrics; it is emptied on each start
+metrics_dir = os.environ.get('METRICS_DIR', '')
+
+if preload_app:
+    #collections in the master would leave freed holes in otherwise shared pages
+    gc.disable()
+
 # Logging
 errorlog = 'logs/gunicorn_error.log'
 accesslog = 'logs/gunicorn_access.log'
@@ -29,4 +48,59 @@ tmp_upload_dir = None
 # Security
 limit_request_line = 4096
 limit_request_fields = 100
-limit_request_field_size = 8190
\ No newline at end of file
+limit_request_field_size = 8190
+
+
+def on_starting(server):
+    if metrics_dir:
+        from app.ml_models.metrics import clear
+        os.makedirs(metrics_dir, exist_ok=True)
+        clear(metrics_dir)
+
+    if not inference_socket:
+        return
+
+    import subprocess
+    import sys
+    from app.ml_models.inference import wait_for_server
+
+    server.inference = subprocess.Popen([sys.executable, '-m', 'app.ml_models.inference', inference_socket])
+    if not wait_for_server(inference_socket):
+        server.inference.terminate()
+        raise RuntimeError(f"inference server did not start on {inference_socket}")
+    server.log.info(f"Inference server {server.inference.pid} listening on {inference_socket}")
+
+
+def on_exit(server):
+    inference = getattr(server, 'inference', None)
+    if inference is not None:
+        inference.terminate()
+        inference.wait()
+
+
+def when_ready(server):
+    #runs in the master after the preloaded app is imported, before the first fork
+    if not preload_app:
+        return
+
+    from app.models import db
+    from app.ml_models.predictor import registry, SERVING_SET
+
+    registry.wait()
+    registry.preload(SERVING_SET + ['model', 'kidney_model', 'classifier'], background=False)
+    loaded = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in registry.timings().items())
+    server.log.info(f"Preloaded in master: {loaded}")
+
+    #workers must not inherit the master's database connections
+    with server.app.wsgi().app_context():
+        db.engine.dispose()
+
+    #move everything allocated so far out of the collector's reach, so gc in
+    #the workers never writes to (and so copies) the shared object headers
+    gc.freeze()
+    server.log.info(f"gc.freeze(): {gc.get_freeze_count()} objects frozen")
+
+
+def post_fork(server, worker):
+    if preload_app:
+        gc.enable()
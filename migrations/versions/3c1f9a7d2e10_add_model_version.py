@@ -0,0 +1,40 @@
+"""record the model release on diagnosis and test results
+
+Revision ID: 3c1f9a7d2e10
+Revises: eb5f4416bda3
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f9a7d2e10'
+down_revision = 'eb5f4416bda3'
+branch_labels = None
+depends_on = None
+
+TABLES = ['self_diagnosis', 'diabetes_test', 'heart_test', 'kidney_test']
+
+
+def _has_column(table, column):
+    inspector = sa.inspect(op.get_bind())
+    return column in [col['name'] for col in inspector.get_columns(table)]
+
+
+def upgrade():
+    # db.create_all() already adds the column to tables it creates
+    for table in TABLES:
+        if _has_column(table, 'model_version'):
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('model_version', sa.String(length=64), nullable=True))
+            batch_op.create_index(f'ix_{table}_model_version', ['model_version'], unique=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_model_version')
+            batch_op.drop_column('model_version')
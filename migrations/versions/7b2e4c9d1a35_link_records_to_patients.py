@@ -0,0 +1,106 @@
+"""link diagnosis, test and appointment records to patients
+
+Revision ID: 7b2e4c9d1a35
+Revises: 3c1f9a7d2e10
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2e4c9d1a35'
+down_revision = '3c1f9a7d2e10'
+branch_labels = None
+depends_on = None
+
+# table -> (timestamp column of the history index, email column or None, name column)
+TABLES = {
+    'self_diagnosis': ('time', 'email', 'name'),
+    'diabetes_test': ('created_at', None, 'name'),
+    'heart_test': ('created_at', None, 'name'),
+    'kidney_test': ('created_at', None, 'name'),
+    'booked_appointments': ('created_at', 'email', 'patient'),
+}
+
+# rows updated (and committed) per statement
+BATCH_SIZE = 5000
+
+patients = sa.table(
+    'patient_register',
+    sa.column('id', sa.Integer),
+    sa.column('email', sa.String),
+    sa.column('username', sa.String),
+    sa.column('fname', sa.String),
+    sa.column('lname', sa.String),
+)
+
+
+def _has_column(table, column):
+    inspector = sa.inspect(op.get_bind())
+    return column in [col['name'] for col in inspector.get_columns(table)]
+
+
+def _has_index(table, name):
+    inspector = sa.inspect(op.get_bind())
+    return name in [index['name'] for index in inspector.get_indexes(table)]
+
+
+def _patient_id(records, email_column, name_column):
+    # the account with the same email, else the one patient whose full name or username is the record's name;
+    # values are trimmed as services/patient_links.py trims them for new records
+    name = sa.func.lower(sa.func.trim(records.c[name_column]))
+    by_name = sa.select(sa.func.min(patients.c.id)).where(sa.or_(
+        sa.func.lower(patients.c.fname + ' ' + patients.c.lname) == name,
+        sa.func.lower(patients.c.username) == name,
+    )).having(sa.func.count(sa.distinct(patients.c.id)) == 1).scalar_subquery()
+    if email_column is None:
+        return by_name
+    by_email = sa.select(patients.c.id).where(patients.c.email == sa.func.trim(records.c[email_column])).scalar_subquery()
+    return sa.func.coalesce(by_email, by_name)
+
+
+def _backfill(bind, table, email_column, name_column):
+    records = sa.table(table, sa.column('id', sa.Integer), sa.column('patient_id', sa.Integer),
+                       *[sa.column(column, sa.String) for column in {email_column, name_column} if column])
+    last_id = bind.execute(sa.select(sa.func.max(records.c.id))).scalar() or 0
+    patient_id = _patient_id(records, email_column, name_column)
+
+    # primary key ranges keep each UPDATE (and its locks) small on tables of any size
+    for low in range(0, last_id, BATCH_SIZE):
+        bind.execute(
+            records.update()
+            .where(records.c.id > low, records.c.id <= low + BATCH_SIZE, records.c.patient_id.is_(None))
+            .values(patient_id=patient_id)
+        )
+
+
+def upgrade():
+    # db.create_all() already adds the column and index to tables it creates
+    for table in TABLES:
+        if _has_column(table, 'patient_id'):
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('patient_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(f'fk_{table}_patient_id', 'patient_register', ['patient_id'], ['id'])
+
+    # each batch commits on its own instead of holding one transaction over every row
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        for table, (_, email_column, name_column) in TABLES.items():
+            _backfill(bind, table, email_column, name_column)
+
+    # built once over the filled column rather than updated row by row during the backfill
+    for table, (timestamp, _, _) in TABLES.items():
+        name = f'ix_{table}_patient_id_{timestamp}'
+        if not _has_index(table, name):
+            op.create_index(name, table, ['patient_id', timestamp], unique=False)
+
+
+def downgrade():
+    for table, (timestamp, _, _) in TABLES.items():
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_patient_id_{timestamp}')
+            batch_op.drop_constraint(f'fk_{table}_patient_id', type_='foreignkey')
+            batch_op.drop_column('patient_id')
@@ -0,0 +1,41 @@
+"""index doctor and patient names for the alphabetical admin listings
+
+Revision ID: 9d4e2a6b8c17
+Revises: 7b2e4c9d1a35
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4e2a6b8c17'
+down_revision = '7b2e4c9d1a35'
+branch_labels = None
+depends_on = None
+
+# index name -> (table, columns), in the order the listings page through them; names can be NULL,
+# so the listings sort (and these indexes hold) them as ''
+INDEXES = {
+    'ix_register_full_names_id': ('register', [sa.text("coalesce(full_names, '')"), 'id']),
+    'ix_patient_register_fname_lname_id': ('patient_register', [sa.text("coalesce(fname, '')"),
+                                                                sa.text("coalesce(lname, '')"), 'id']),
+}
+
+
+def _has_index(table, name):
+    inspector = sa.inspect(op.get_bind())
+    return name in [index['name'] for index in inspector.get_indexes(table)]
+
+
+def upgrade():
+    # db.create_all() already adds the index to tables it creates
+    for name, (table, columns) in INDEXES.items():
+        if not _has_index(table, name):
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, (table, _) in INDEXES.items():
+        op.drop_index(name, table_name=table)
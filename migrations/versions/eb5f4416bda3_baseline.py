@@ -0,0 +1,26 @@
+"""baseline schema created by db.create_all()
+
+Revision ID: eb5f4416bda3
+Revises: 
+Create Date: 2025-11-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'eb5f4416bda3'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Tables are created by db.create_all() in create_app(); existing
+    # databases are already stamped with this revision.
+    pass
+
+
+def downgrade():
+    pass
@@ -0,0 +1,29 @@
+import warnings
+
+import pytest
+
+from app import create_app
+
+
+@pytest.fixture(scope='session')
+def app():
+    with warnings.catch_warnings():
+        #the pickled models were saved with an older scikit-learn
+        warnings.simplefilter('ignore')
+        return create_app('testing')
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(role) signs the test client in as user 1 with that role"""
+    def sign_in(role, user_id=1):
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['user_role'] = role
+            session['username'] = role
+    return sign_in
@@ -0,0 +1,67 @@
+"""Models served over the inference socket answer like the local ones."""
+import threading
+
+import numpy as np
+import pytest
+
+from app.ml_models.inference import InferenceClient, InferenceServer, RemoteModel, UnsupportedOperation
+from app.ml_models.loader import registry
+from app.ml_models.schemas import SCHEMAS
+from app.ml_models.sensitivity import sensitivity_curve
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    registry.preload(['model', 'classifier', 'kidney_model', 'svc_native'], background=False)
+    path = str(tmp_path_factory.mktemp('inference') / 'server.sock')
+    server = InferenceServer(path, registry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield InferenceClient(path)
+    server.shutdown()
+    server.server_close()
+
+
+def dataset_rows(test):
+    schema = SCHEMAS[test]
+    return registry.get(schema.dataset)[schema.names].to_numpy(np.float64)
+
+
+@pytest.fixture(scope='module')
+def heart_rows():
+    return dataset_rows('heart')
+
+
+def test_batches_beyond_65535_rows(client, heart_rows):
+    X = np.resize(heart_rows, (70000, heart_rows.shape[1]))
+    assert (client.predict('model', X) == registry.get('model').predict(X)).all()
+
+
+def test_predict_proba(client, heart_rows):
+    remote = RemoteModel(client, 'model')
+    local = registry.get('model')
+    assert np.allclose(remote.predict_proba(heart_rows), local.predict_proba(heart_rows))
+    assert list(remote.classes_) == list(local.classes_)
+
+
+def test_what_if_curve_keeps_its_probabilities(client, heart_rows):
+    remote = sensitivity_curve('heart', heart_rows[0], 'age', model=RemoteModel(client, 'model'))
+    local = sensitivity_curve('heart', heart_rows[0], 'age')
+    assert remote.probabilities is not None
+    assert np.allclose(remote.probabilities, local.probabilities)
+    assert list(remote.labels) == list(local.labels)
+
+
+def test_model_without_probabilities_is_unsupported(client):
+    with pytest.raises(UnsupportedOperation):
+        client.predict_proba('svc_native', np.zeros((2, 132)))
+
+
+@pytest.mark.parametrize('test,feature', [('diabetes', 'Glucose'), ('kidney', 'Blood Pressure')])
+def test_what_if_curve_without_probabilities(client, test, feature):
+    #the diabetes and kidney SVCs have no predict_proba; their curves carry labels only
+    row = dataset_rows(test)[0]
+    schema = SCHEMAS[test]
+    remote = sensitivity_curve(test, row, feature, model=RemoteModel(client, schema.model))
+    local = sensitivity_curve(test, row, feature)
+    assert remote.probabilities is None and local.probabilities is None
+    assert list(remote.labels) == list(local.labels)
@@ -0,0 +1,91 @@
+"""NativeSVC has to vote exactly like the sklearn SVC it was converted from."""
+import os
+import pickle
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.ml_models.artifacts import load_artifact, save_artifact
+from app.ml_models.loader import project_root
+from app.ml_models.native import NativeSVC, check_parity
+
+
+@pytest.fixture(scope='module')
+def svc():
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        with open(os.path.join(project_root, "models", "svc.pkl"), 'rb') as f:
+            return pickle.load(f)
+
+
+@pytest.fixture(scope='module')
+def native(svc):
+    return NativeSVC.from_svc(svc)
+
+
+@pytest.fixture(scope='module')
+def training_rows():
+    training = pd.read_csv(os.path.join(project_root, "datasets", "Training.csv"))
+    return training.drop(columns=['prognosis']).values.astype(np.float64)
+
+
+def symptom_rows(k, n=5000, seed=0):
+    #n random combinations of exactly k symptoms, nearly all of them absent from Training.csv
+    rng = np.random.default_rng(seed + k)
+    X = np.zeros((n, 132))
+    for row in X:
+        row[rng.choice(132, k, replace=False)] = 1
+    return X
+
+
+def assert_parity(native, svc, X):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        mismatches = check_parity(native, svc, X)
+    assert not len(mismatches), f"{len(mismatches)} of {len(X)} rows disagree, e.g. {mismatches[:5]}"
+
+
+def test_every_training_row(native, svc, training_rows):
+    assert_parity(native, svc, training_rows)
+
+
+@pytest.mark.parametrize('k', [1, 2, 3, 4, 5, 8])
+def test_unseen_rows_with_k_symptoms(native, svc, k):
+    assert_parity(native, svc, symptom_rows(k))
+
+
+def test_unseen_sparse_rows(native, svc):
+    X = (np.random.default_rng(3).random((20000, 132)) < 0.03).astype(np.float64)
+    assert_parity(native, svc, X)
+
+
+def test_single_rows(native, svc):
+    #1-d input goes through the same tie handling as a batch
+    for x in symptom_rows(5, n=200):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            assert native.predict(x) == svc.predict(x[np.newaxis])[0]
+
+
+def test_batches_settle_like_single_rows(native, training_rows):
+    #batches leave the near-zero pairs a row never touches as they are; single rows recompute every one
+    X = np.vstack([training_rows[::25], symptom_rows(3, n=200), np.random.default_rng(5).random((50, 132))])
+    batch = native.decision_function(X)
+    single = np.vstack([native.decision_function(x) for x in X])
+    assert ((batch > 0) == (single > 0)).all()
+
+
+def test_rank_starts_with_the_prediction(native, svc):
+    X = symptom_rows(4)
+    labels, scores, votes = native.rank(X, 5)
+    assert (labels[:, 0] == native.predict(X)).all()
+    assert (np.diff(votes, axis=1) <= 0).all()
+
+
+def test_artifact_round_trip(native, svc, tmp_path):
+    save_artifact(native, str(tmp_path / 'svc'))
+    loaded = load_artifact(str(tmp_path / 'svc'))
+    assert loaded.support_vectors is not None
+    assert_parity(loaded, svc, symptom_rows(5))
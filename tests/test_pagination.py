@@ -0,0 +1,153 @@
+"""Keyset pagination: every row exactly once, whatever the page size, in both directions."""
+import re
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import db, Doctor, HeartTest
+from app.utils.pagination import encode_cursor, keyset_page, sort_key
+
+KEYS = (HeartTest.created_at, HeartTest.id)
+
+
+@pytest.fixture
+def heart_tests(app):
+    """heart_tests(n) stores n results, three to a timestamp, and returns their ids newest first"""
+    def make(n):
+        base = datetime(2026, 1, 1)
+        db.session.add_all([HeartTest(name=f'p{i}', age=50, cholestral=200, heart_diagnosis='d', doctor='doc',
+                                      created_at=base + timedelta(minutes=i // 3)) for i in range(n)])
+        db.session.commit()
+        return [test.id for test in HeartTest.query.order_by(HeartTest.created_at.desc(), HeartTest.id.desc())]
+
+    with app.app_context():
+        HeartTest.query.delete()
+        yield make
+        HeartTest.query.delete()
+        db.session.commit()
+
+
+def walk(query, keys, limit, descending=True):
+    #follow next cursors from the first page to the last
+    pages, page = [], keyset_page(query, keys, limit=limit, descending=descending)
+    pages.append(page)
+    while page.next_cursor:
+        page = keyset_page(query, keys, after=page.next_cursor, limit=limit, descending=descending)
+        pages.append(page)
+    return pages
+
+
+def ids(page):
+    return [row.id for row in page.items]
+
+
+def test_empty_listing(heart_tests):
+    heart_tests(0)
+    page = keyset_page(HeartTest.query, KEYS, limit=5)
+    assert page.items == [] and page.next_cursor is None and page.prev_cursor is None
+
+
+@pytest.mark.parametrize('n,limit', [(5, 5), (6, 5), (4, 5), (1, 1), (30, 7), (30, 3)])
+def test_every_row_once(heart_tests, n, limit):
+    expected = heart_tests(n)
+    pages = walk(HeartTest.query, KEYS, limit)
+
+    assert [row_id for page in pages for row_id in ids(page)] == expected
+    assert len(pages) == max(1, -(-n // limit))
+    assert pages[0].prev_cursor is None
+    assert pages[-1].next_cursor is None
+    #a full last page must not promise an empty one after it
+    assert all(ids(page) for page in pages)
+
+
+def test_back_from_every_page(heart_tests):
+    heart_tests(30)
+    pages = walk(HeartTest.query, KEYS, 7)
+    for earlier, later in zip(pages, pages[1:]):
+        back = keyset_page(HeartTest.query, KEYS, before=later.prev_cursor, limit=7)
+        assert ids(back) == ids(earlier)
+        assert (back.prev_cursor is None) == (earlier is pages[0])
+
+
+def test_seek_skips_rows_added_above_the_cursor(heart_tests):
+    expected = heart_tests(10)
+    first = keyset_page(HeartTest.query, KEYS, limit=4)
+    db.session.add(HeartTest(name='new', age=1, cholestral=1, heart_diagnosis='d', created_at=datetime(2027, 1, 1)))
+    db.session.commit()
+    assert ids(keyset_page(HeartTest.query, KEYS, after=first.next_cursor, limit=4)) == expected[4:8]
+
+
+@pytest.fixture
+def doctors(app):
+    """doctors(names) stores a doctor per name (None for none) and returns their query"""
+    def make(names):
+        for i, name in enumerate(names):
+            doctor = Doctor(username=f'page{i}', email=f'page{i}@example.com', full_names=name, national_id=f'page{i}')
+            doctor.set_password('x')
+            db.session.add(doctor)
+        db.session.commit()
+        return Doctor.query.filter(Doctor.username.like('page%'))
+
+    with app.app_context():
+        yield make
+        Doctor.query.filter(Doctor.username.like('page%')).delete(synchronize_session=False)
+        db.session.commit()
+
+
+#the profile form can clear a name, so some rows have NULL where the listing sorts
+NAMES = ['Zed', 'Bob', None, 'Amy', 'Bob', None, 'Bob', 'Carl', 'Amy']
+
+
+def test_ascending_names_with_ties_and_nulls(doctors):
+    name = sort_key(Doctor.full_names, 'name_key')
+    keys = (name, Doctor.id)
+    query = doctors(NAMES).add_columns(*keys)
+    pages = walk(query, keys, 2, descending=False)
+
+    #no name sorts first, as ''
+    expected = sorted(query, key=lambda row: (row.Doctor.full_names or '', row.Doctor.id))
+    assert [row.Doctor.id for page in pages for row in page.items] == [row.Doctor.id for row in expected]
+    assert pages[0].items[0].name_key == '' and pages[1].items[0].name_key == 'Amy'
+
+    for earlier, later in zip(pages, pages[1:]):
+        back = keyset_page(query, keys, before=later.prev_cursor, limit=2, descending=False)
+        assert [row.Doctor.id for row in back.items] == [row.Doctor.id for row in earlier.items]
+
+
+def test_null_cursor_is_rejected(doctors):
+    name = sort_key(Doctor.full_names, 'name_key')
+    with pytest.raises(ValueError):
+        keyset_page(doctors(NAMES).add_columns(name, Doctor.id), (name, Doctor.id), after=encode_cursor([None, 3]))
+
+
+def test_doctor_listing_pages_past_missing_names(client, login, doctors):
+    expected = [doctor.id for doctor in doctors(NAMES)]
+    login('admin')
+    seen, url = [], '/admin/view_doctors?limit=2'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += [int(row_id) for row_id in re.findall(r'<td>(\d+)</td>', html)]
+        link = re.search(r'href="([^"]+)">Next', html)
+        url = link.group(1).replace('&amp;', '&') if link else None
+    assert sorted(seen) == sorted(expected) and len(seen) == len(expected)
+
+
+def test_route_walks_the_pages(client, login, heart_tests):
+    expected = heart_tests(12)
+    login('doctor')
+    seen, url = [], '/doctor/heartresults?limit=5'
+    while url:
+        html = client.get(url).get_data(as_text=True)
+        seen += [int(row_id) for row_id in re.findall(r'<td>(\d+)</td>', html)]
+        link = re.search(r'href="([^"]+)">Older', html)
+        url = link.group(1).replace('&amp;', '&') if link else None
+    assert seen == expected
+
+
+@pytest.mark.parametrize('query,rows', [('after=not-a-cursor', 5), ('limit=0', 1), ('limit=-3', 1), ('limit=x', 12)])
+def test_route_falls_back_on_bad_arguments(client, login, heart_tests, query, rows):
+    heart_tests(12)
+    login('doctor')
+    response = client.get(f'/doctor/heartresults?{query}' + ('&limit=5' if 'after' in query else ''))
+    assert response.status_code == 200
+    assert len(re.findall(r'<td>(\d+)</td>', response.get_data(as_text=True))) == rows
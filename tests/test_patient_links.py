@@ -0,0 +1,66 @@
+"""Records made before a patient registered join their history when they do."""
+import pytest
+
+from app.models import db, Patient, SelfDiagnosis, HeartTest
+from app.services.patient_links import link_records
+
+
+def patient(username, email, fname, lname):
+    account = Patient(username=username, email=email, fname=fname, lname=lname)
+    account.set_password('x')
+    db.session.add(account)
+    db.session.flush()
+    return account
+
+
+@pytest.fixture
+def records(app):
+    with app.app_context():
+        db.session.add_all([
+            SelfDiagnosis(name='someone', email=' new@example.com', diagnosis='by email'),
+            SelfDiagnosis(name='new PERSON ', email='other@example.com', diagnosis='by name'),
+            SelfDiagnosis(name='Shared Name', email='other@example.com', diagnosis='shared name'),
+            SelfDiagnosis(name='stranger', email='other@example.com', diagnosis='unrelated'),
+            HeartTest(name='newbie', age=50, cholestral=200, heart_diagnosis='by username'),
+        ])
+        patient('shared1', 'shared1@example.com', 'Shared', 'Name')
+        db.session.commit()
+        yield
+        db.session.rollback()
+        SelfDiagnosis.query.delete()
+        HeartTest.query.delete()
+        Patient.query.filter(Patient.email.in_(['new@example.com', 'shared1@example.com',
+                                                'shared2@example.com'])).delete()
+        db.session.commit()
+
+
+def register(client):
+    response = client.post('/auth/register/patient', data={
+        'username': 'newbie', 'email': 'new@example.com', 'fname': 'New', 'lname': 'Person',
+        'password': 'secret', 'password_confirm': 'secret',
+    })
+    assert response.status_code == 302
+    return Patient.query.filter_by(email='new@example.com').one()
+
+
+def test_registration_links_earlier_records(records, client):
+    account = register(client)
+
+    linked = {row.diagnosis for row in SelfDiagnosis.query.filter_by(patient_id=account.id)}
+    assert linked == {'by email', 'by name'}
+    assert HeartTest.query.filter_by(name='newbie').one().patient_id == account.id
+    #records under someone else's email and name stay unlinked
+    assert SelfDiagnosis.query.filter_by(diagnosis='unrelated').one().patient_id is None
+
+
+def test_shared_names_stay_unlinked(records):
+    account = patient('shared2', 'shared2@example.com', 'Shared', 'Name')
+    assert link_records(account) == 0
+    assert SelfDiagnosis.query.filter_by(diagnosis='shared name').one().patient_id is None
+
+
+def test_history_shows_linked_records(records, client, login):
+    account = register(client)
+    login('patient', user_id=account.id)
+    html = client.get('/medical_test/mine').get_data(as_text=True)
+    assert 'by email' in html and 'by name' in html and 'unrelated' not in html
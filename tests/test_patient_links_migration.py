@@ -0,0 +1,85 @@
+"""The 7b2e4c9d1a35 migration links existing records to patients while upgrading a baseline database."""
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from app.ml_models.loader import project_root
+
+PATIENTS = [
+    #id, username, email, fname, lname
+    (1, 'jdoe', 'jane@example.com', 'Jane', 'Doe'),
+    (2, 'asmith', 'alex@example.com', 'Alex', 'Smith'),
+    (3, 'asmith2', 'alex2@example.com', 'Alex', 'Smith'),
+]
+
+#self_diagnosis rows past the migration's 5000-row batches, each linked by email, name or neither
+BACKFILL_ROWS = 12001
+
+
+def upgrade(database):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', FLASK_APP='run.py', MODEL_PRELOAD='')
+    subprocess.run([sys.executable, '-m', 'flask', 'db', 'upgrade'], cwd=project_root, env=env,
+                   check=True, capture_output=True, timeout=300)
+
+
+@pytest.fixture(scope='module')
+def upgraded(tmp_path_factory):
+    database = str(tmp_path_factory.mktemp('migration') / 'records.db')
+    shutil.copy(os.path.join(project_root, 'medical_records.db'), database)
+
+    with sqlite3.connect(database) as conn:
+        assert conn.execute('select version_num from alembic_version').fetchone() == ('eb5f4416bda3',)
+        for table in ('self_diagnosis', 'heart_test', 'diabetes_test', 'kidney_test', 'booked_appointments',
+                      'patient_register'):
+            conn.execute(f'delete from {table}')
+        conn.executemany("insert into patient_register (id, username, email, fname, lname, password, role) "
+                         "values (?, ?, ?, ?, ?, 'x', 'patient')", PATIENTS)
+
+        diagnoses = []
+        for i in range(1, BACKFILL_ROWS + 1):
+            name, email = [('someone', 'jane@example.com'), ('JANE DOE', 'nobody@example.com'),
+                           ('Alex Smith', 'nobody@example.com'), ('stranger', 'nobody@example.com')][i % 4]
+            diagnoses.append((i, name, email))
+        conn.executemany("insert into self_diagnosis (id, name, email, diagnosis) values (?, ?, ?, 'x')", diagnoses)
+
+        conn.executemany("insert into heart_test (id, name) values (?, ?)",
+                         [(1, 'jdoe'), (2, ' Jane Doe'), (3, 'alex smith'), (4, 'asmith2')])
+        conn.executemany("insert into booked_appointments (id, patient, email) values (?, ?, ?)",
+                         [(1, 'whoever', ' alex2@example.com '), (2, 'Jane Doe', 'unknown@example.com')])
+
+    upgrade(database)
+    conn = sqlite3.connect(database)
+    yield conn
+    conn.close()
+
+
+def test_reaches_head(upgraded):
+    assert upgraded.execute('select version_num from alembic_version').fetchone() == ('9d4e2a6b8c17',)
+
+
+def test_self_diagnosis_links_by_email_then_unique_name(upgraded):
+    linked = dict(upgraded.execute('select id, patient_id from self_diagnosis'))
+    assert len(linked) == BACKFILL_ROWS
+    for row_id, patient_id in linked.items():
+        #email match, case-insensitive full name, a name two patients share, no match
+        assert patient_id == [1, 1, None, None][row_id % 4], row_id
+
+
+def test_tests_link_by_full_name_or_username(upgraded):
+    linked = dict(upgraded.execute('select id, patient_id from heart_test'))
+    #names are trimmed and compared case-insensitively, as patient_links does for new records
+    assert linked == {1: 1, 2: 1, 3: None, 4: 3}
+
+
+def test_appointments_prefer_the_email(upgraded):
+    assert dict(upgraded.execute('select id, patient_id from booked_appointments')) == {1: 3, 2: 1}
+
+
+def test_history_indexes_exist(upgraded):
+    indexes = {row[1] for row in upgraded.execute("select type, name from sqlite_master where type = 'index'")}
+    assert {'ix_self_diagnosis_patient_id_time', 'ix_heart_test_patient_id_created_at',
+            'ix_booked_appointments_patient_id_created_at'} <= indexes
@@ -0,0 +1,59 @@
+"""POST /medical_test/predict_batch scores many symptom lists in one model call."""
+import pytest
+
+from app.ml_models.predictor import get_prediction
+
+URL = '/medical_test/predict_batch'
+
+#a training combination, an unseen one and a single symptom
+SYMPTOM_LISTS = [
+    ['itching', 'skin_rash', 'nodal_skin_eruptions', 'dischromic _patches'],
+    ['high_fever', 'headache', 'skin_rash', 'joint_pain'],
+    ['cough'],
+]
+
+
+def test_predictions_match_the_single_route(client):
+    response = client.post(URL, json=SYMPTOM_LISTS)
+    assert response.status_code == 200
+
+    results = response.get_json()['results']
+    assert [result['disease'] for result in results] == [get_prediction(symptoms) for symptoms in SYMPTOM_LISTS]
+    for result in results:
+        assert result['description']
+        assert isinstance(result['precautions'], list)
+
+
+def test_entries_fail_on_their_own(client):
+    response = client.post(URL, json={'symptoms': [SYMPTOM_LISTS[0], 42, ['not_a_symptom_at_all'], 'itching, skin rash']})
+    assert response.status_code == 200
+
+    ok, wrong_type, unknown, text = response.get_json()['results']
+    assert ok['disease'] == get_prediction(SYMPTOM_LISTS[0])
+    assert wrong_type == {'error': 'Expected a list of symptoms'}
+    assert unknown['error'] == 'No valid symptoms provided'
+    assert 'disease' not in unknown
+    #comma separated strings go through the same symptom resolver as the form
+    assert text['disease'] == get_prediction(['itching', 'skin_rash'])
+
+
+def test_empty_batch(client):
+    response = client.post(URL, json=[])
+    assert response.status_code == 200
+    assert response.get_json() == {'results': []}
+
+
+@pytest.mark.parametrize('payload', [None, {'symptoms': 'cough'}, 'cough', {'other': []}])
+def test_rejects_anything_but_a_list(client, payload):
+    response = client.post(URL, json=payload) if payload is not None else client.post(URL, data='not json')
+    assert response.status_code == 400
+
+
+def test_batch_limit(app, client):
+    limit = app.config['PREDICT_BATCH_LIMIT']
+    app.config['PREDICT_BATCH_LIMIT'] = 2
+    try:
+        assert client.post(URL, json=SYMPTOM_LISTS[:2]).status_code == 200
+        assert client.post(URL, json=SYMPTOM_LISTS).status_code == 413
+    finally:
+        app.config['PREDICT_BATCH_LIMIT'] = limit
@@ -0,0 +1,99 @@
+"""A new model release goes live in one swap, together with everything computed from the old model."""
+import json
+import os
+
+import pytest
+
+from app.ml_models import predictor
+from app.ml_models.cache import PredictionCache
+from app.ml_models.loader import load_release, models_dir, registry
+from app.ml_models.registry import ModelRegistry
+from app.ml_models.releases import ModelWatcher
+
+SWAPPED = ['model_release', 'svc', 'svc_native', 'exact_matches', 'known_differentials']
+
+
+@pytest.fixture
+def serving():
+    registry.preload(predictor.SERVING_SET + ['model_release'], background=False)
+    before = {name: registry.get(name) for name in SWAPPED}
+    yield before
+    registry.put_many(before)
+    predictor.prediction_cache.clear()
+
+
+def manifest_dir(tmp_path, version):
+    #a release named `version` serving the models/ directory itself
+    release = {'path': os.path.abspath(models_dir), 'created': '2026-10-18T00:00:00', 'models': {}}
+    with open(tmp_path / 'manifest.json', 'w') as f:
+        json.dump({'active': version, 'releases': {version: release}}, f)
+    return str(tmp_path)
+
+
+class RemoteStandIn:
+    """svc_native as served by an inference server, whose version changes under the web worker"""
+
+    def __init__(self, model, version):
+        self.model = model
+        self.version = version
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+    def rank(self, X, k=5):
+        return self.model.rank(X, k)
+
+    def model_version(self):
+        return self.version
+
+
+def test_put_many_replaces_entries_together():
+    models = ModelRegistry()
+    models.put_many({'a': 1, 'b': 1})
+    snapshot = models._values
+    models.put_many({'a': 2, 'b': 2})
+    assert (snapshot['a'], snapshot['b']) == (1, 1)
+    assert (models.get('a'), models.get('b')) == (2, 2)
+
+
+def test_watcher_swaps_the_release_and_its_dependents(serving, tmp_path):
+    predictor.diagnose(['itching', 'skin_rash'])
+    watcher = ModelWatcher(registry, manifest_dir(tmp_path, 'test-2'), load_release)
+
+    assert watcher.check()
+    assert registry.get('model_release').version == 'test-2'
+    for name in SWAPPED:
+        assert registry.get(name) is not serving[name], name
+
+    assert predictor.diagnose(['itching', 'skin_rash'])[0] == 'Fungal infection'
+    assert predictor.prediction_cache.version == 'test-2'
+
+
+def test_exact_matches_come_from_the_model(serving):
+    table = predictor._exact_matches(serving['svc_native'])
+    rows = predictor._known_rows()
+    labels = serving['svc_native'].predict(rows)
+    masks = [predictor.encode_indices(map(int, row.nonzero()[0])) for row in rows]
+    assert [table.get(mask) for mask in masks] == list(labels)
+
+
+def test_remote_release_rebuilds_dependents_before_the_cache_moves_on(serving):
+    remote = RemoteStandIn(serving['svc_native'], 'remote-1')
+    registry.put('svc_native', remote)
+    predictor.diagnose(['itching', 'skin_rash'])
+    exact_matches = registry.get('exact_matches')
+
+    remote.version = 'remote-2'
+    predictor.diagnose(['itching', 'skin_rash'])
+    assert registry.get('exact_matches') is not exact_matches
+    assert predictor.prediction_cache.version == 'remote-2'
+
+
+def test_cache_drops_bundles_computed_for_an_older_version():
+    cache = PredictionCache()
+    cache.validate('v1')
+    cache.validate('v2')
+    cache.put(('cough',), 'stale', 'v1')
+    cache.put(('fatigue',), 'fresh', 'v2')
+    assert cache.get(('cough',)) is None
+    assert cache.get(('fatigue',)) == 'fresh'
@@ -0,0 +1,115 @@
+"""MicroBatcher: concurrent single-row callers share one predict call and each get their own row back."""
+import os
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from app.ml_models.scheduler import MicroBatcher
+
+
+def double(X):
+    return X.sum(axis=1) * 2
+
+
+def settled(batcher, rows):
+    #futures resolve before the worker records the batch in its stats
+    deadline = time.monotonic() + 5
+    while batcher.stats()['rows'] < rows and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return batcher.stats()
+
+
+def test_concurrent_callers_get_their_own_rows():
+    calls = []
+
+    def record(X):
+        calls.append(len(X))
+        return double(X)
+
+    batcher = MicroBatcher(record, window=0.05)
+    callers = 16
+    barrier = threading.Barrier(callers)
+    answers = [None] * callers
+
+    def call(i):
+        barrier.wait()
+        answers[i] = batcher.predict(np.array([i, 0.5]), timeout=5)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert answers == [2 * i + 1 for i in range(callers)]
+    #the window gathers callers into shared predict calls
+    assert sum(calls) == callers and len(calls) < callers
+
+    stats = settled(batcher, callers)
+    assert stats['batches'] == len(calls)
+    assert stats['batch_sizes'] == dict(sorted(Counter(calls).items()))
+    assert stats['largest_batch'] == max(calls)
+    assert stats['mean_batch_size'] == callers / len(calls)
+
+
+def test_queue_depth_and_batch_sizes():
+    started, release = threading.Event(), threading.Event()
+
+    def slow(X):
+        started.set()
+        release.wait(5)
+        return double(X)
+
+    batcher = MicroBatcher(slow, window=0, max_batch=2)
+    first = batcher.submit(np.array([1.0, 1.0]))
+    assert started.wait(5)
+
+    #the worker is busy, so these wait in the queue
+    waiting = [batcher.submit(np.array([i, 0.0])) for i in range(5)]
+    assert batcher.stats()['queue_depth'] == 5
+    release.set()
+
+    assert first.result(5) == 4.0
+    assert [future.result(5) for future in waiting] == [0, 2, 4, 6, 8]
+    stats = settled(batcher, 6)
+    #one single row, then the queue drained two at a time: [0, 1], [2, 3], [4]
+    assert stats == {'queue_depth': 0, 'batches': 4, 'rows': 6, 'errors': 0, 'mean_batch_size': 1.5,
+                     'largest_batch': 2, 'batch_sizes': {1: 2, 2: 2}}
+
+
+def test_errors_reach_every_caller_in_the_batch():
+    def fail(X):
+        raise ValueError(f'{len(X)} rows')
+
+    batcher = MicroBatcher(fail, window=0.05)
+    futures = [batcher.submit(np.array([i])) for i in range(3)]
+    for future in futures:
+        with pytest.raises(ValueError, match='3 rows'):
+            future.result(5)
+    assert batcher.stats()['errors'] == 1 and batcher.stats()['rows'] == 0
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+def test_forked_child_gets_its_own_thread():
+    #gunicorn's preload_app creates the batcher in the master and forks the workers from it
+    batcher = MicroBatcher(double, window=0.001)
+    assert batcher.predict(np.array([1.0, 2.0]), timeout=5) == 6.0
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            answer = batcher.predict(np.array([2.0, 3.0]), timeout=5)
+            os.write(write, f"{answer:g} {batcher.stats()['rows']}".encode())
+        finally:
+            os._exit(0)
+
+    os.close(write)
+    _, status = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(status) == 0
+    #the child counts only its own rows
+    assert os.read(read, 64).decode() == '10 1'
+    assert batcher.predict(np.array([0.5, 0.5]), timeout=5) == 2.0
@@ -0,0 +1,129 @@
+"""One schema-driven builder encodes forms, JSON and CSV rows the same way."""
+import csv
+import io
+
+import numpy as np
+import pytest
+
+from app.ml_models.schemas import SCHEMAS, SchemaError
+from app.utils.formatters import sex_to_binary, yes_no_into_binary
+
+#one complete kidney form, as the doctor page submits it
+KIDNEY_FORM = {
+    'age': '48', 'blood_pressure': '80', 'specific_gravity': '1.02', 'albumin': '1', 'sugar': '0',
+    'blood_glucose': '121', 'blood_urea': '36', 'serum_creatinine': '1.2', 'sodium': '136', 'potassium': '4.7',
+    'hemoglobin': '15.4', 'packed_cell_volume': '44', 'white_bc': '7800', 'red_bc': '5.2', 'rbc': '1',
+    'pus_cells_normal': 'yes', 'puss_cell_clumps_present': 'no', 'Bacteria_present': 'no', 'hypertension': 'yes',
+    'diabetes_mellitus': 'Yes', 'coronary_artery_disease': 'no', 'appetite': 'no', 'radal_edema': 'no',
+    'anaemia': 'no',
+}
+#the same patient as Kidney Dataset.csv's first row
+KIDNEY_ROW = [48.0, 80.0, 1.02, 1.0, 0.0, 121.0, 36.0, 1.2, 136.0, 4.7, 15.4, 44.0, 7800.0, 5.2,
+              1.0, 1.0, 0.0, 0.0, 1.0, 1.0, 0.0, 0.0, 0.0, 0.0]
+
+HEART_FORM = {'age': '63', 'sex': 'male', 'cp': '3', 'rbp': '145', 'chol': '233', 'fbs': 'yes', 'rer': '0',
+              'mhr': '150', 'eia': 'no', 'st': '2.3', 'slope': '0', 'vessels': '0', 'defects': '1'}
+
+
+def feature(test, field):
+    schema = SCHEMAS[test]
+    return [f.field for f in schema.features].index(field)
+
+
+def test_kidney_form_encodes_like_the_dataset():
+    assert SCHEMAS['kidney'].from_form(KIDNEY_FORM).tolist() == [KIDNEY_ROW]
+
+
+@pytest.mark.parametrize('value,code', [('yes', 1), ('YES ', 1), ('y', 1), ('true', 1), ('1', 1),
+                                        ('no', 0), ('No', 0), ('false', 0), ('0', 0)])
+def test_yes_no(value, code):
+    #every yes used to encode as 0: the old helper compared against value.lower without calling it
+    X = SCHEMAS['kidney'].from_form(dict(KIDNEY_FORM, hypertension=value))
+    assert X[0, feature('kidney', 'hypertension')] == code
+
+
+def test_form_helpers():
+    assert [yes_no_into_binary(value) for value in ('yes', 'YES ', 'no', '', None)] == [1, 1, 0, 0, 0]
+    assert [sex_to_binary(value) for value in ('male', ' Male', 'female', None)] == [1, 1, 0, 0]
+
+
+def test_column_words_stay_on_their_column():
+    schema = SCHEMAS['kidney']
+    X = schema.from_form(dict(KIDNEY_FORM, rbc='abnormal', appetite='poor', Bacteria_present='present'))
+    assert X[0, feature('kidney', 'rbc')] == 0
+    assert X[0, feature('kidney', 'appetite')] == 1
+    assert X[0, feature('kidney', 'Bacteria_present')] == 1
+
+    #'normal' describes red blood cells, not blood pressure or sugar
+    with pytest.raises(SchemaError, match='hypertension must be'):
+        schema.from_form(dict(KIDNEY_FORM, hypertension='normal'))
+    with pytest.raises(SchemaError, match='fbs must be'):
+        SCHEMAS['heart'].from_form(dict(HEART_FORM, fbs='normal'))
+
+
+@pytest.mark.parametrize('value,code', [('male', 1), ('M', 1), ('Female', 0), ('f', 0), ('1', 1), ('0', 0)])
+def test_sex(value, code):
+    X = SCHEMAS['heart'].from_form(dict(HEART_FORM, sex=value))
+    assert X[0, feature('heart', 'sex')] == code
+
+
+def test_defaults_and_required_fields():
+    schema = SCHEMAS['kidney']
+    #blank measurements count as 0, as the kidney form always treated them
+    X = schema.from_form(dict(KIDNEY_FORM, sodium='', anaemia='  '))
+    assert X[0, feature('kidney', 'sodium')] == 0 and X[0, feature('kidney', 'anaemia')] == 0
+    missing = {key: value for key, value in KIDNEY_FORM.items() if key != 'potassium'}
+    assert schema.from_form(missing)[0, feature('kidney', 'potassium')] == 0
+
+    #blood urea and hemoglobin have no default
+    with pytest.raises(SchemaError) as err:
+        schema.from_form(dict(KIDNEY_FORM, blood_urea='', hemoglobin=None))
+    assert err.value.errors == ['blood_urea is required', 'hemoglobin is required']
+
+
+def test_invalid_values_and_ranges():
+    matrix = SCHEMAS['heart'].from_records([
+        dict(HEART_FORM, age='-1'),
+        dict(HEART_FORM, chol='lots', cp='7', sex='other'),
+        HEART_FORM,
+    ])
+    assert matrix.errors[0] == ['age must be between 0 and 120']
+    assert sorted(matrix.errors[1]) == sorted([
+        'cp must be between 0 and 3',
+        "chol must be a number, got 'lots'",
+        "sex must be male/female or 1/0, got 'other'",
+    ])
+    assert matrix.errors[2] == []
+    assert matrix.valid.tolist() == [False, False, True]
+
+
+def test_form_json_and_csv_agree():
+    schema = SCHEMAS['kidney']
+    form = schema.from_form(KIDNEY_FORM)
+
+    #JSON objects may use dataset headers and aliases instead of form fields
+    record = {('Anemia' if key == 'anaemia' else key): value for key, value in KIDNEY_FORM.items()}
+    json_matrix = schema.from_records([record, KIDNEY_FORM])
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(schema.names)
+    writer.writerow([KIDNEY_FORM[f.field] for f in schema.features])
+    header, *rows = csv.reader(io.StringIO(out.getvalue()))
+    csv_matrix = schema.from_rows(header, rows)
+
+    assert np.array_equal(json_matrix.X, np.vstack([form, form]))
+    assert np.array_equal(csv_matrix.X, form)
+    assert json_matrix.valid.all() and csv_matrix.valid.all()
+
+
+def test_csv_short_rows_and_missing_columns():
+    schema = SCHEMAS['kidney']
+    with pytest.raises(ValueError, match='missing columns'):
+        schema.column_mapping(['Age (yrs)'])
+
+    header = schema.names
+    matrix = schema.from_rows(header, [[str(v) for v in KIDNEY_ROW[:11]]])
+    #columns past the short row are blank: defaults where there are some
+    assert matrix.errors == [[]]
+    assert matrix.X[0, 11:].tolist() == [0.0] * 13
@@ -0,0 +1,39 @@
+"""Bulk CSV scoring keeps one output row per input record, whatever the chunking."""
+import csv
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from app.ml_models.loader import project_root
+from app.ml_models.scoring import read_chunks, read_records, score_file
+
+
+@pytest.fixture(scope='module')
+def heart_csv():
+    frame = pd.read_csv(os.path.join(project_root, "datasets", "heart_disease_data.csv")).head(40)
+    #every seventh name spans lines and carries escaped quotes
+    frame.insert(0, 'name', [f'p{i}' if i % 7 else f'line one\nline "two" {i}' for i in range(40)])
+    return frame.to_csv(index=False)
+
+
+def test_quoted_newlines_stay_in_their_record():
+    text = 'a,b\n"one\ntwo",1\n"say ""hi""\n",2\n3,4\n'
+    assert list(read_records(io.StringIO(text))) == ['a,b\n', '"one\ntwo",1\n', '"say ""hi""\n",2\n', '3,4\n']
+
+
+def test_chunks_count_records(heart_csv):
+    body = heart_csv.split('\n', 1)[1]
+    assert [first for first, _ in read_chunks(io.StringIO(body), 6)] == [1, 7, 13, 19, 25, 31, 37]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_rows_are_numbered_by_record(heart_csv, workers):
+    out = io.StringIO()
+    totals = score_file('heart', io.StringIO(heart_csv), out, chunk_size=6, workers=workers)
+    rows = list(csv.DictReader(io.StringIO(out.getvalue())))
+
+    assert totals == {'rows': 40, 'invalid': 0}
+    assert [row['row'] for row in rows] == [str(i) for i in range(1, 41)]
+    assert rows[7]['name'] == 'line one\nline "two" 7'